@@ -1,16 +1,29 @@
 # app.py
 import os
-import json
 import uuid
 import datetime
+import threading
 
 import dash
-from dash import Dash, html, dcc, Input, Output, State, no_update
+import flask
+from dash import Dash, html, dcc, Input, Output, State, MATCH, ClientsideFunction, Patch, no_update
 import dash_bootstrap_components as dbc
+from flask_compress import Compress
 
-from predict import classify_text
-from drawings import perform_drawing
+from predict import classify_scene, scene_label, start_model_watcher
+from drawings import plan_quality, scene_objects, PREWARM, SHAPE_FUNCS
+from scheduler import DrawScheduler, SchedulerBusy, SchedulerTimeout
 from paint_driver import get_saved_root
+from input_sim import install_backend_from_env
+from stroke_program import program_for, render_png
+from svg_export import svg_from_program, write_svg
+from history_store import HistoryStore, SESSION_COOKIE, SESSION_MAX_AGE, new_session_id, valid_session_id
+from history_compactor import Compactor, RetentionPolicy
+from history_index import HistoryIndex
+from gallery import GalleryIndex, PAGE_SIZE as GALLERY_PAGE_SIZE
+from speculate import Speculator
+from preview import board as preview_board, preview_key, PREVIEW_ENABLED, PREVIEW_INTERVAL_S
+from metrics import span, begin_request, end_request, render_prometheus, PROMETHEUS_CONTENT_TYPE
 
 # -----------------------
 # Paths / setup
@@ -22,45 +35,87 @@ SAVED_DIR = get_saved_root()  # assets/saved_drawings from paint_driver
 os.makedirs(ASSETS_DIR, exist_ok=True)
 os.makedirs(SAVED_DIR, exist_ok=True)
 
-CHAT_HISTORY_FILE = os.path.join(BASE_DIR, "chat_history.json")
+# one history per browser session (paint_sid cookie), sharded on disk;
+# PAINT_HISTORY_DIR moves it (default history/)
+history_store = HistoryStore()
+# word / label / outcome / time indexes over it, for the search box
+history_index = HistoryIndex(history_store)
+# manifest of every saved drawing, for the gallery page; drawings saved
+# before it existed are scanned into it once, in the background
+gallery = GalleryIndex(SAVED_DIR)
 APP_TITLE = "MS Paint Agent"
 
+# PAINT_BACKEND=dryrun / dryrun-realtime: draw into input_sim's recorder
+# instead of the real mouse (load tests, demos without Paint)
+install_backend_from_env()
 
-def _ensure_chat_history_file():
+# every drawing goes through one queue: identical requests are merged,
+# and a full queue answers "busy" (PAINT_DRAW_WORKERS, PAINT_DRAW_QUEUE)
+draw_scheduler = DrawScheduler.from_env()
+
+# classify what is being typed before Send, and have Paint ready
+# (PAINT_SPECULATE=0 to disable, see speculate.py)
+speculator = Speculator.from_env()
+
+# move old turns into compressed archive segments every few minutes
+# (PAINT_HISTORY_KEEP, PAINT_HISTORY_MAX_AGE_DAYS, PAINT_HISTORY_COMPACT=0 to disable)
+compactor = Compactor(history_store, RetentionPolicy.from_env())
+
+_background_pid = None
+
+
+def start_background():
     """
-    Make sure chat_history.json exists and is a JSON list.
-    If invalid, reset to [].
+    Start the app's background threads in this process: the model
+    watcher (a retrained model/intent_classifier.joblib is picked up
+    without a restart), the history compactor and the gallery's
+    one-time manifest scan. Threads don't survive fork(), so this runs
+    in every serving process - from gunicorn.conf.py's post_fork and
+    from __main__ below - rather than at import. Repeated calls in one
+    process do nothing.
     """
-    if not os.path.exists(CHAT_HISTORY_FILE):
-        with open(CHAT_HISTORY_FILE, "w", encoding="utf-8") as f:
-            json.dump([], f)
+    global _background_pid
+    if _background_pid == os.getpid():
         return
+    _background_pid = os.getpid()
+    if os.environ.get("PAINT_MODEL_WATCH", "1") != "0":
+        start_model_watcher()
+    if os.environ.get("PAINT_HISTORY_COMPACT", "1") != "0":
+        compactor.start()
+    threading.Thread(target=gallery.ensure_manifest, name="gallery-manifest", daemon=True).start()
 
-    try:
-        with open(CHAT_HISTORY_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if not isinstance(data, list):
-            raise ValueError("chat_history.json not list")
-    except Exception:
-        with open(CHAT_HISTORY_FILE, "w", encoding="utf-8") as f:
-            json.dump([], f)
+
+def _session_id():
+    """
+    This browser's session id, from the paint_sid cookie. A new one is
+    made for requests without it and set by _set_session_cookie.
+    """
+    sid = flask.request.cookies.get(SESSION_COOKIE)
+    if valid_session_id(sid):
+        return sid
+    sid = getattr(flask.g, "paint_sid", None)
+    if sid is None:
+        sid = flask.g.paint_sid = new_session_id()
+    return sid
 
 
-def _load_chat_history():
-    _ensure_chat_history_file()
-    with open(CHAT_HISTORY_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+def _load_chat_history(session_id):
+    return history_store.load(session_id)
 
 
-def _append_chat_entry(user_text, predicted_label, status_text, image_web_path):
+def _append_chat_entry(session_id, user_text, predicted_label, status_text, image_web_path,
+                       model_version=None, strokes=None, svg_web_path=None, outcome=None):
     """
+    Append one turn to this session's history; returns the session's
+    whole history.
     image_web_path is what <img src> will point to, e.g.
     "assets/saved_drawings/20251027_164512_flower.png"
+    model_version is the classifier bundle that produced predicted_label.
+    strokes is the drawing's stroke program (stroke_program.py), which
+    the browser renders instead of fetching the PNG.
+    svg_web_path is the vector copy next to the PNG (svg_export.py).
+    outcome is "drawn", "failed", "busy" or "unknown" (searchable).
     """
-    _ensure_chat_history_file()
-    with open(CHAT_HISTORY_FILE, "r", encoding="utf-8") as f:
-        hist = json.load(f)
-
     entry = {
         "id": str(uuid.uuid4()),
         "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
@@ -68,100 +123,89 @@ def _append_chat_entry(user_text, predicted_label, status_text, image_web_path):
         "predicted_label": predicted_label,
         "status_text": status_text,
         "image_path": image_web_path,  # can be None
+        "model_version": model_version,
+        "strokes": strokes,  # can be None
+        "svg_path": svg_web_path,  # can be None
+        "outcome": outcome,
     }
 
-    hist.append(entry)
-
-    with open(CHAT_HISTORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(hist, f, indent=2)
+    history_store.append(session_id, entry)
+    history_index.add(session_id, entry)
+    return history_store.load(session_id)
 
-    return hist
 
-
-def _message_bubble(sender, text, image_src=None):
+def _message_bubble(sender, text, image_src=None, strokes=None, entry_id=None, animate=False,
+                    svg_src=None):
     """
     sender: "You" or "Agent"
     text: string
     image_src: optional (browser path "assets/saved_drawings/...png")
-    returns a styled Div
+    strokes: optional stroke program, drawn on a <canvas> in the browser
+             (preferred over image_src); animate replays it stroke by stroke
+    svg_src: optional vector copy ("assets/saved_drawings/...svg"), shown
+             instead of the PNG when there are no strokes
+    returns a Div styled by assets/chat.css
     """
     is_user = (sender == "You")
 
-    bubble_bg = "#334155" if is_user else "#1e293b"
-    border_col = "#475569"
-    header_color = "#94a3b8"
-
     body_children = [
-        html.Div(
-            sender,
-            style={
-                "fontWeight": 600,
-                "fontSize": "0.7rem",
-                "color": header_color,
-                "marginBottom": "2px",
-            },
-        ),
-        html.Div(
-            text,
-            style={
-                "whiteSpace": "pre-wrap",
-                "color": "#e2e8f0",
-                "fontSize": "0.9rem",
-                "lineHeight": "1.4rem",
-            },
-        ),
+        html.Div(sender, className="bubble-sender"),
+        html.Div(text, className="bubble-text"),
     ]
 
-    if image_src:
+    if strokes and entry_id:
+        body_children.extend([
+            html.Canvas(
+                id={"type": "stroke-canvas", "index": entry_id},
+                className="bubble-canvas",
+            ),
+            dcc.Store(
+                id={"type": "stroke-data", "index": entry_id},
+                data={"p": strokes, "animate": animate},
+            ),
+        ])
+        body_children.append(_download_links(entry_id, svg_src))
+    elif image_src or svg_src:
         body_children.append(
-            html.Img(
-                src="/" + image_src.lstrip("/"),
-                style={
-                    "maxWidth": "260px",
-                    "border": f"1px solid {border_col}",
-                    "borderRadius": "6px",
-                    "marginTop": "8px",
-                    "backgroundColor": "#0f172a",
-                },
-            )
+            html.Img(src="/" + (svg_src or image_src).lstrip("/"), className="bubble-img")
         )
 
     return html.Div(
-        style={
-            "alignSelf": "flex-start",
-            "backgroundColor": bubble_bg,
-            "borderRadius": "12px",
-            "padding": "10px 12px",
-            "maxWidth": "80%",
-            "border": f"1px solid {border_col}",
-            "boxShadow": "0 8px 24px rgba(0,0,0,0.4)",
-        },
+        className="bubble bubble-user" if is_user else "bubble",
         children=body_children,
     )
 
 
-def _chat_history_to_components(chat_items):
+def _download_links(entry_id, svg_src):
+    links = [html.A("Download PNG", href=f"/drawing/{entry_id}.png")]
+    if svg_src:
+        links.append(html.A("SVG", href="/" + svg_src.lstrip("/"), download=""))
+    return html.Div(links, className="bubble-links")
+
+
+def _chat_history_to_components(chat_items, animate_last=False):
     """
     Render full chat log with (You -> Agent) pairs.
+    animate_last: replay the newest drawing stroke by stroke.
     """
     rows = []
-    for msg in chat_items:
+    last = len(chat_items) - 1
+    for i, msg in enumerate(chat_items):
         user_bubble = _message_bubble("You", msg["user_text"], image_src=None)
 
         agent_bubble = _message_bubble(
             "Agent",
             msg["status_text"],
             image_src=msg.get("image_path"),
+            strokes=msg.get("strokes"),
+            entry_id=msg.get("id"),
+            animate=animate_last and i == last,
+            svg_src=msg.get("svg_path"),
         )
 
         rows.append(
             html.Div(
-                style={
-                    "display": "flex",
-                    "flexDirection": "column",
-                    "gap": "6px",
-                    "marginBottom": "20px",
-                },
+                className="chat-turn",
                 children=[
                     user_bubble,
                     agent_bubble,
@@ -178,147 +222,454 @@ external_stylesheets = [dbc.themes.DARKLY]
 app = Dash(__name__, external_stylesheets=external_stylesheets, suppress_callback_exceptions=True)
 server = app.server
 
-app.layout = html.Div(
-    style={
-        "height": "100vh",
-        "display": "flex",
-        "flexDirection": "column",
-        "backgroundColor": "#0f172a",
-        "color": "#f8fafc",
-        "fontFamily": "system-ui, -apple-system, BlinkMacSystemFont, 'Inter', sans-serif",
-    },
-    children=[
-
-        # ----- Top Nav / Header -----
-        html.Div(
-            style={
-                "flexShrink": 0,
-                "padding": "12px 16px",
-                "borderBottom": "1px solid #1e293b",
-                "backgroundColor": "#0f172a",
-                "display": "flex",
-                "alignItems": "center",
-                "justifyContent": "space-between",
-            },
-            children=[
-                html.Div(
-                    children=[
-                        html.Div(
-                            APP_TITLE,
-                            style={
-                                "fontSize": "0.95rem",
-                                "fontWeight": "600",
-                                "color": "#e2e8f0",
-                                "letterSpacing": "-0.03em",
-                            },
-                        ),
-                        html.Div(
-                            "Draw with pyautogui in MS Paint",
-                            style={
-                                "fontSize": "0.7rem",
-                                "color": "#64748b",
-                                "marginTop": "2px",
-                            },
-                        ),
-                    ],
-                ),
-                html.Div(
-                    "Chat History",
-                    style={
-                        "fontSize": "0.7rem",
-                        "lineHeight": "1rem",
-                        "color": "#475569",
-                        "backgroundColor": "#1e293b",
-                        "border": "1px solid #334155",
-                        "borderRadius": "6px",
-                        "padding": "4px 8px",
-                        "fontWeight": "500",
-                    },
-                ),
-            ],
-        ),
-
-        # ----- Chat Scroll Area -----
-        html.Div(
-            id="chat-scroll-wrapper",
-            style={
-                "flex": "1 1 auto",
-                "overflowY": "auto",
-                "backgroundColor": "#0f172a",
-                "padding": "16px",
-                "display": "flex",
-                "flexDirection": "column",
-            },
-            children=_chat_history_to_components(_load_chat_history()),
-        ),
-
-        # Divider line above input
-        html.Div(
-            style={
-                "flexShrink": 0,
-                "height": "1px",
-                "background": "linear-gradient(to right, rgba(51,65,85,0), #334155 20%, #334155 80%, rgba(51,65,85,0))",
-            }
-        ),
-
-        # ----- Bottom Input Bar -----
-        html.Div(
-            style={
-                "flexShrink": 0,
-                "padding": "12px 16px",
-                "backgroundColor": "#0f172a",
-                "display": "flex",
-                "gap": "8px",
-                "alignItems": "center",
-            },
+# brotli (or gzip for clients without it) for the layout, callback
+# responses and assets; PAINT_COMPRESS=0 when a proxy in front does it.
+# Not Dash(compress=True): that one pins gzip only.
+if os.environ.get("PAINT_COMPRESS", "1") != "0":
+    server.config.update(COMPRESS_ALGORITHM=["br", "gzip"], COMPRESS_BR_LEVEL=4)
+    Compress(server)
+
+
+@server.after_request
+def _set_session_cookie(response):
+    sid = getattr(flask.g, "paint_sid", None)
+    if sid is not None:
+        response.set_cookie(SESSION_COOKIE, sid, max_age=SESSION_MAX_AGE, httponly=True, samesite="Lax")
+    return response
+
+
+@server.route("/metrics")
+def metrics_endpoint():
+    """
+    Prometheus text exposition of per-stage latency histograms.
+    """
+    return flask.Response(render_prometheus(), mimetype=PROMETHEUS_CONTENT_TYPE)
+
+
+@server.route("/scheduler")
+def scheduler_endpoint():
+    """
+    Queue depth, merge / reject counts and queue-wait percentiles.
+    """
+    return flask.jsonify(draw_scheduler.stats())
+
+
+@server.route("/speculation")
+def speculation_endpoint():
+    """
+    Speculation hit rate and wasted work, plus what became of the Paint
+    canvases opened ahead of time.
+    """
+    stats = speculator.stats() if speculator is not None else {"enabled": False}
+    stats["prewarm"] = {r: PREWARM.value(result=r) for r in ("used", "expired", "skipped")}
+    return flask.jsonify(stats)
+
+
+@server.route("/history/archive")
+def archive_index_endpoint():
+    """
+    This session's archive segments, oldest first.
+    """
+    return flask.jsonify(history_store.archive_index(_session_id()))
+
+
+@server.route("/history/archive/<int:seg>")
+def archive_segment_endpoint(seg):
+    try:
+        return flask.jsonify(history_store.load_segment(_session_id(), seg))
+    except KeyError:
+        flask.abort(404)
+
+
+@server.route("/history/search")
+def history_search_endpoint():
+    """
+    Search this session's history, live and archived:
+    ?q=train outcome:failed since:7d, or label= / outcome= / since= /
+    until= as separate parameters; limit= (default 50, at most 500).
+    """
+    args = flask.request.args
+    try:
+        res = history_index.search(
+            _session_id(),
+            args.get("q", ""),
+            limit=min(500, args.get("limit", 50, type=int)),
+            label=args.get("label"),
+            outcome=args.get("outcome"),
+            since=args.get("since"),
+            until=args.get("until"),
+        )
+    except ValueError as e:
+        return flask.jsonify({"error": str(e)}), 400
+    return flask.jsonify(res)
+
+
+@server.route("/gallery/page")
+def gallery_page_endpoint():
+    """
+    One page of the gallery, newest first: ?label= (a shape), cursor=
+    (the previous page's "next"), limit= (default 48, at most 500).
+    """
+    args = flask.request.args
+    try:
+        res = gallery.page(
+            args.get("cursor", type=int),
+            label=args.get("label"),
+            limit=min(500, args.get("limit", GALLERY_PAGE_SIZE, type=int)),
+        )
+    except ValueError as e:
+        return flask.jsonify({"error": str(e)}), 400
+    return flask.jsonify(res)
+
+
+@server.route("/drawing/<entry_id>.png")
+def drawing_png(entry_id):
+    """
+    PNG download for one of this session's chat entries: Paint's own
+    file when it is on disk, otherwise rasterized from the stroke program.
+    """
+    sid = _session_id()
+    entry = history_store.find(sid, entry_id)
+    if entry is None:
+        # an archived turn
+        entry = next((e for e in history_store.load_archive(sid) if e.get("id") == entry_id), None)
+    if entry is None:
+        flask.abort(404)
+    image_path = entry.get("image_path")
+    if image_path:
+        abs_path = os.path.join(BASE_DIR, image_path)
+        if os.path.isfile(abs_path):
+            return flask.send_file(abs_path, mimetype="image/png", as_attachment=True)
+    if not entry.get("strokes"):
+        flask.abort(404)
+    name = f"{entry.get('predicted_label') or 'drawing'}.png".replace("+", "_").replace(" ", "")
+    return flask.Response(
+        render_png(entry["strokes"]),
+        mimetype="image/png",
+        headers={"Content-Disposition": f"attachment; filename={name}"},
+    )
+
+
+def _classes(base, visible=True):
+    # .is-hidden (assets/chat.css) hides an element without restyling it
+    return base if visible else base + " is-hidden"
+
+
+def _gallery_cards(entries):
+    """
+    gallery.page() entries -> cards of the gallery grid.
+    """
+    cards = []
+    for e in entries:
+        meta = [e["timestamp"].replace("T", " ")]
+        if e.get("width"):
+            meta.append(f"{e['width']}\u00d7{e['height']}")
+        if e.get("bytes") is not None:
+            meta.append(f"{e['bytes'] / 1024:.0f} KB")
+        if e.get("thumb"):
+            thumb = html.Img(src="/" + e["thumb"], className="gallery-thumb")
+        else:
+            thumb = html.Div("no preview", className="gallery-meta gallery-empty")
+        cards.append(html.A(
+            href="/" + e["path"] if e.get("path") else None,
+            target="_blank",
+            className="gallery-card",
             children=[
-                dcc.Input(
-                    id="user-input",
-                    type="text",
-                    placeholder="Ask me to draw something... try 'draw a flower'",
-                    style={
-                        "flex": "1 1 auto",
-                        "backgroundColor": "#1e293b",
-                        "border": "1px solid #334155",
-                        "borderRadius": "10px",
-                        "padding": "12px 14px",
-                        "color": "#e2e8f0",
-                        "fontSize": "0.9rem",
-                        "lineHeight": "1.2rem",
-                        "outline": "none",
-                        "width": "100%",
-                        "boxShadow": "0 8px 24px rgba(0,0,0,0.6)",
-                    },
-                    # n_submit will fire on Enter (we'll capture this in JS -> clicks Send)
-                    n_submit=0,
-                ),
-                html.Button(
-                    "Send",
-                    id="send-btn",
-                    n_clicks=0,
-                    style={
-                        "backgroundColor": "#3b82f6",
-                        "color": "#fff",
-                        "border": "0",
-                        "borderRadius": "10px",
-                        "fontSize": "0.9rem",
-                        "fontWeight": "600",
-                        "padding": "12px 16px",
-                        "cursor": "pointer",
-                        "lineHeight": "1rem",
-                        "whiteSpace": "nowrap",
-                        "boxShadow": "0 12px 32px rgba(59,130,246,0.4)",
-                    },
-                ),
+                thumb,
+                html.Div(e["label"], className="gallery-label"),
+                html.Div(" \u00b7 ".join(meta), className="gallery-meta"),
             ],
-        ),
+        ))
+    return cards
 
-        # ----- hidden stores / triggers -----
-        dcc.Store(id="scroll-token", data=str(uuid.uuid4())),
-        # we need a dummy output for clientside scroll callback
-        dcc.Store(id="scroll-dummy"),
-    ],
-)
+
+def _search_results(res):
+    """
+    history_index.search() result -> rows of the search panel.
+    """
+    shown = len(res["results"])
+    rows = [html.Div(
+        f"{res['total']} match{'es' if res['total'] != 1 else ''}"
+        + (f", newest {shown} shown" if shown < res["total"] else "")
+        + f" ({res['took_ms']:.1f} ms)",
+        style={"color": "#94a3b8", "marginBottom": "6px"},
+    )]
+    for hit in res["results"]:
+        cells = [
+            html.Span(hit["timestamp"].replace("T", " "), className="search-muted"),
+            html.Span(hit["outcome"], className="search-muted"),
+            html.Span(hit["user_text"], className="search-text"),
+        ]
+        if hit["has_drawing"]:
+            cells.append(html.A("PNG", href=f"/drawing/{hit['id']}.png"))
+        rows.append(html.Div(cells, className="search-row"))
+    return rows
+
+
+def serve_layout():
+    # a function, so every page load shows the visitor's own history
+    sid = _session_id()
+    archived_segments = len(history_store.archive_index(sid))
+    return html.Div(
+        style={
+            "height": "100vh",
+            "display": "flex",
+            "flexDirection": "column",
+            "backgroundColor": "#0f172a",
+            "color": "#f8fafc",
+            "fontFamily": "system-ui, -apple-system, BlinkMacSystemFont, 'Inter', sans-serif",
+        },
+        children=[
+
+            # ----- Top Nav / Header -----
+            html.Div(
+                style={
+                    "flexShrink": 0,
+                    "padding": "12px 16px",
+                    "borderBottom": "1px solid #1e293b",
+                    "backgroundColor": "#0f172a",
+                    "display": "flex",
+                    "alignItems": "center",
+                    "justifyContent": "space-between",
+                },
+                children=[
+                    html.Div(
+                        children=[
+                            html.Div(
+                                APP_TITLE,
+                                style={
+                                    "fontSize": "0.95rem",
+                                    "fontWeight": "600",
+                                    "color": "#e2e8f0",
+                                    "letterSpacing": "-0.03em",
+                                },
+                            ),
+                            html.Div(
+                                "Draw with pyautogui in MS Paint",
+                                style={
+                                    "fontSize": "0.7rem",
+                                    "color": "#64748b",
+                                    "marginTop": "2px",
+                                },
+                            ),
+                        ],
+                    ),
+                    html.Div(
+                        style={"display": "flex", "alignItems": "center", "gap": "8px"},
+                        children=[
+                            dcc.Link("Chat", id="nav-chat", href="/", className="nav-tab nav-tab-active"),
+                            dcc.Link("Gallery", id="nav-gallery", href="/gallery", className="nav-tab"),
+                            # searched on Enter / blur
+                            dcc.Input(
+                                id="history-search",
+                                type="search",
+                                debounce=True,
+                                placeholder="Search history... train outcome:failed since:7d",
+                                style={
+                                    "width": "300px",
+                                    "backgroundColor": "#1e293b",
+                                    "border": "1px solid #334155",
+                                    "borderRadius": "6px",
+                                    "padding": "4px 8px",
+                                    "color": "#e2e8f0",
+                                    "fontSize": "0.7rem",
+                                    "lineHeight": "1rem",
+                                    "outline": "none",
+                                },
+                            ),
+                            html.Div(
+                                "Chat History",
+                                style={
+                                    "fontSize": "0.7rem",
+                                    "lineHeight": "1rem",
+                                    "color": "#475569",
+                                    "backgroundColor": "#1e293b",
+                                    "border": "1px solid #334155",
+                                    "borderRadius": "6px",
+                                    "padding": "4px 8px",
+                                    "fontWeight": "500",
+                                },
+                            ),
+                        ],
+                    ),
+                ],
+            ),
+
+            # ----- Chat page -----
+            html.Div(
+                id="chat-page",
+                className="page",
+                children=[
+                    # ----- Search results (hidden until something is searched) -----
+                    html.Div(id="search-results", className=_classes("search-panel", False)),
+
+                    # ----- Chat Scroll Area -----
+                    html.Div(
+                        id="chat-scroll-wrapper",
+                        style={
+                            "flex": "1 1 auto",
+                            "overflowY": "auto",
+                            "backgroundColor": "#0f172a",
+                            "padding": "16px",
+                            "display": "flex",
+                            "flexDirection": "column",
+                        },
+                        children=[
+                            html.Button(
+                                "Show earlier messages",
+                                id="archive-btn",
+                                n_clicks=0,
+                                className=_classes("more-btn", archived_segments > 0),
+                            ),
+                            # archived turns, one segment per click, oldest on top
+                            html.Div(id="archived-turns", children=[]),
+                            html.Div(
+                                id="chat-log",
+                                children=_chat_history_to_components(_load_chat_history(sid)),
+                            ),
+                            # the drawing in progress, shown while a reply is pending
+                            html.Div(
+                                id="draw-preview",
+                                className=_classes("preview-bubble", False),
+                                children=[
+                                    html.Div(id="preview-stage", style={"fontSize": "0.8rem", "color": "#94a3b8"}),
+                                    html.Img(
+                                        id="preview-img",
+                                        style={
+                                            "display": "block",
+                                            "width": "260px",
+                                            "maxWidth": "100%",
+                                            "border": "1px solid #475569",
+                                            "borderRadius": "6px",
+                                            "marginTop": "8px",
+                                            "backgroundColor": "#ffffff",
+                                        },
+                                    ),
+                                ],
+                            ),
+                        ],
+                    ),
+
+                    # Divider line above input
+                    html.Div(
+                        style={
+                            "flexShrink": 0,
+                            "height": "1px",
+                            "background": "linear-gradient(to right, rgba(51,65,85,0), #334155 20%, #334155 80%, rgba(51,65,85,0))",
+                        }
+                    ),
+
+                    # ----- Bottom Input Bar -----
+                    html.Div(
+                        style={
+                            "flexShrink": 0,
+                            "padding": "12px 16px",
+                            "backgroundColor": "#0f172a",
+                            "display": "flex",
+                            "gap": "8px",
+                            "alignItems": "center",
+                        },
+                        children=[
+                            dcc.Input(
+                                id="user-input",
+                                type="text",
+                                placeholder="Ask me to draw something... try 'draw a flower'",
+                                style={
+                                    "flex": "1 1 auto",
+                                    "backgroundColor": "#1e293b",
+                                    "border": "1px solid #334155",
+                                    "borderRadius": "10px",
+                                    "padding": "12px 14px",
+                                    "color": "#e2e8f0",
+                                    "fontSize": "0.9rem",
+                                    "lineHeight": "1.2rem",
+                                    "outline": "none",
+                                    "width": "100%",
+                                    "boxShadow": "0 8px 24px rgba(0,0,0,0.6)",
+                                },
+                                # n_submit will fire on Enter (we'll capture this in JS -> clicks Send)
+                                n_submit=0,
+                            ),
+                            html.Button(
+                                "Send",
+                                id="send-btn",
+                                n_clicks=0,
+                                style={
+                                    "backgroundColor": "#3b82f6",
+                                    "color": "#fff",
+                                    "border": "0",
+                                    "borderRadius": "10px",
+                                    "fontSize": "0.9rem",
+                                    "fontWeight": "600",
+                                    "padding": "12px 16px",
+                                    "cursor": "pointer",
+                                    "lineHeight": "1rem",
+                                    "whiteSpace": "nowrap",
+                                    "boxShadow": "0 12px 32px rgba(59,130,246,0.4)",
+                                },
+                            ),
+                        ],
+                    ),
+                ],
+            ),
+
+            # ----- Gallery page (/gallery) -----
+            html.Div(
+                id="gallery-page",
+                className=_classes("page page-scroll", False),
+                children=[
+                    html.Div(
+                        style={"display": "flex", "alignItems": "center", "gap": "12px",
+                               "marginBottom": "12px"},
+                        children=[
+                            dbc.Select(
+                                id="gallery-label",
+                                options=[{"label": "All shapes", "value": ""}],
+                                value="",
+                                size="sm",
+                                style={"width": "220px"},
+                            ),
+                            html.Div(id="gallery-count", style={"fontSize": "0.75rem", "color": "#94a3b8"}),
+                        ],
+                    ),
+                    html.Div(
+                        id="gallery-grid",
+                        style={
+                            "display": "grid",
+                            "gridTemplateColumns": "repeat(auto-fill, minmax(220px, 1fr))",
+                            "gap": "12px",
+                            "marginBottom": "16px",
+                        },
+                    ),
+                    html.Button(
+                        "Load more",
+                        id="gallery-more",
+                        n_clicks=0,
+                        className=_classes("more-btn", False),
+                    ),
+                    # where the next page starts (gallery.page()'s "next")
+                    dcc.Store(id="gallery-cursor"),
+                ],
+            ),
+
+            # ----- hidden stores / triggers -----
+            dcc.Location(id="url"),
+            dcc.Store(id="scroll-token", data=str(uuid.uuid4())),
+            # we need a dummy output for clientside scroll callback
+            dcc.Store(id="scroll-dummy"),
+            # next archive segment to show (0 = none left)
+            dcc.Store(id="archive-cursor", data=archived_segments),
+            # what is being typed, once typing pauses (assets/speculate.js)
+            dcc.Store(id="typing-text"),
+            dcc.Store(id="speculation-dummy"),
+            # progress of the drawing this session waits for (preview.py)
+            dcc.Interval(id="preview-poll", interval=int(PREVIEW_INTERVAL_S * 1000), disabled=True),
+            dcc.Store(id="preview-frame"),
+        ],
+    )
+
+
+app.layout = serve_layout
 
 # ---------------------------------
 # Clientside callbacks (JS in browser)
@@ -343,6 +694,35 @@ app.clientside_callback(
     Input("scroll-token", "data"),
 )
 
+# 3. Draw each agent bubble's stroke program on its <canvas>
+#    (assets/strokes.js), animated for the newest reply.
+app.clientside_callback(
+    ClientsideFunction(namespace="strokes", function_name="render"),
+    Output({"type": "stroke-canvas", "index": MATCH}, "title"),
+    Input({"type": "stroke-data", "index": MATCH}, "data"),
+    State({"type": "stroke-canvas", "index": MATCH}, "id"),
+)
+
+# 4. Live preview while a drawing is made (assets/preview.js): polling
+#    starts with Send and stops when the reply arrives.
+if PREVIEW_ENABLED:
+    app.clientside_callback(
+        ClientsideFunction(namespace="preview", function_name="start"),
+        Output("preview-poll", "disabled", allow_duplicate=True),
+        Input("send-btn", "n_clicks"),
+        State("user-input", "value"),
+        prevent_initial_call=True,
+    )
+    app.clientside_callback(
+        ClientsideFunction(namespace="preview", function_name="show"),
+        Output("draw-preview", "className", allow_duplicate=True),
+        Output("preview-stage", "children"),
+        Output("preview-img", "src"),
+        Input("preview-frame", "data"),
+        State("preview-poll", "disabled"),
+        prevent_initial_call=True,
+    )
+
 # 2. Make Enter trigger the Send button click reliably.
 # We'll listen for n_submit in Python side, BUT we'll also
 # add JS in assets/autoscroll.js to synthesize a click.
@@ -361,13 +741,151 @@ app.clientside_callback(
 # Result: exactly one path, no duplication.
 
 
+def _scene_phrase(scene):
+    """
+    [("house", 1), ("tree", 2), ("star", 1)] -> "house, 2 trees and star"
+    """
+    parts = [label if n == 1 else f"{n} {label}s" for label, n in scene]
+    if len(parts) == 1:
+        return parts[0]
+    return ", ".join(parts[:-1]) + " and " + parts[-1]
+
+
 # ---------------------------------
 # Server callback for sending messages
 # ---------------------------------
 @app.callback(
-    Output("chat-scroll-wrapper", "children"),
+    Output("archived-turns", "children"),
+    Output("archive-cursor", "data"),
+    Output("archive-btn", "className"),
+    Input("archive-btn", "n_clicks"),
+    State("archived-turns", "children"),
+    State("archive-cursor", "data"),
+    prevent_initial_call=True,
+)
+def show_archived_turns(n_clicks, shown, cursor):
+    """
+    Prepend the next older archive segment to the chat.
+    """
+    if not cursor:
+        raise dash.exceptions.PreventUpdate
+    entries = history_store.load_segment(_session_id(), cursor)
+    cursor -= 1
+    return (_chat_history_to_components(entries) + (shown or []),
+            cursor, _classes("more-btn", cursor > 0))
+
+
+@app.callback(
+    Output("speculation-dummy", "data"),
+    Input("typing-text", "data"),
+    prevent_initial_call=True,
+)
+def speculate_on_typing(text):
+    """
+    Start classifying the half-typed message in the background.
+    """
+    if speculator is not None and text:
+        speculator.submit(_session_id(), text)
+    raise dash.exceptions.PreventUpdate
+
+
+@app.callback(
+    Output("preview-frame", "data"),
+    Input("preview-poll", "n_intervals"),
+    State("preview-frame", "data"),
+    prevent_initial_call=True,
+)
+def poll_preview(n_intervals, shown):
+    """
+    Newest progress frame of the drawing this session waits for.
+    """
+    sid = _session_id()
+    frame = preview_board.frame_for(sid)
+    if frame is None:
+        # queued behind other drawings, or still classifying
+        stage = "Waiting for Paint" if preview_board.is_watching(sid) else "Thinking"
+        frame = {"seq": 0, "stage": stage, "image": None}
+    if shown and (shown.get("seq"), shown.get("stage")) == (frame["seq"], frame["stage"]):
+        raise dash.exceptions.PreventUpdate
+    return {"seq": frame["seq"], "stage": frame["stage"], "image": frame["image"]}
+
+
+@app.callback(
+    Output("chat-page", "className"),
+    Output("gallery-page", "className"),
+    Output("nav-chat", "className"),
+    Output("nav-gallery", "className"),
+    Input("url", "pathname"),
+)
+def switch_page(pathname):
+    on_gallery = pathname == "/gallery"
+    return (_classes("page", not on_gallery), _classes("page page-scroll", on_gallery),
+            "nav-tab" if on_gallery else "nav-tab nav-tab-active",
+            "nav-tab nav-tab-active" if on_gallery else "nav-tab")
+
+
+@app.callback(
+    Output("gallery-grid", "children"),
+    Output("gallery-cursor", "data"),
+    Output("gallery-more", "className"),
+    Output("gallery-count", "children"),
+    Output("gallery-label", "options"),
+    Input("url", "pathname"),
+    Input("gallery-label", "value"),
+    Input("gallery-more", "n_clicks"),
+    State("gallery-cursor", "data"),
+)
+def show_gallery(pathname, label, more_clicks, cursor):
+    """
+    The newest page of saved drawings (of one shape, if chosen); "Load
+    more" appends the page after `cursor`.
+    """
+    if pathname != "/gallery":
+        raise dash.exceptions.PreventUpdate
+    more = dash.ctx.triggered_id == "gallery-more"
+    if more and cursor is None:
+        raise dash.exceptions.PreventUpdate
+    res = gallery.page(cursor if more else None, label=label or None, limit=GALLERY_PAGE_SIZE)
+    cards = _gallery_cards(res["entries"])
+    if more:
+        # only the new cards go to the browser
+        grid = Patch()
+        grid.extend(cards)
+        options = no_update
+    else:
+        grid = cards
+        options = [{"label": "All shapes", "value": ""}] + [
+            {"label": f"{shape} ({n})", "value": shape} for shape, n in gallery.label_counts().items()
+        ]
+    count = f"{res['total']} drawing{'s' if res['total'] != 1 else ''} ({res['took_ms']:.1f} ms)"
+    return grid, res["next"], _classes("more-btn", res["next"] is not None), count, options
+
+
+@app.callback(
+    Output("search-results", "children"),
+    Output("search-results", "className"),
+    Input("history-search", "value"),
+    prevent_initial_call=True,
+)
+def search_history(query):
+    """
+    Indexed search over this session's turns, live and archived.
+    """
+    if not query or not query.strip():
+        return [], _classes("search-panel", False)
+    try:
+        res = history_index.search(_session_id(), query, limit=50)
+    except ValueError as e:
+        return [html.Div(str(e), style={"color": "#f87171"})], _classes("search-panel")
+    return _search_results(res), _classes("search-panel")
+
+
+@app.callback(
+    Output("chat-log", "children"),
     Output("user-input", "value"),
     Output("scroll-token", "data"),
+    Output("preview-poll", "disabled"),
+    Output("draw-preview", "className"),
     Input("send-btn", "n_clicks"),
     State("user-input", "value"),
     prevent_initial_call=True,
@@ -378,8 +896,8 @@ def handle_user_message(n_clicks, user_text):
     (or by JS simulating a click on Enter keypress).
 
     Flow:
-    1. classify user text
-    2. if known -> perform_drawing() => PNG path
+    1. classify user text into a scene (one or more shapes)
+    2. if known -> perform_drawing() via draw_scheduler => PNG path
     3. else -> fallback
     4. append to chat_history.json
     5. redraw UI, clear input, update scroll-token
@@ -390,46 +908,122 @@ def handle_user_message(n_clicks, user_text):
         raise dash.exceptions.PreventUpdate
 
     user_msg = user_text.strip()
+    begin_request()
 
     # classification
-    predicted_label = classify_text(user_msg)  # e.g. "tree", "flower", or "unknown"
+    # e.g. ([("house", 1), ("tree", 2)], "20251028-3fa91c0e");
+    # version is pinned for this request. Usually already done while the
+    # message was typed.
+    spec = speculator.take(_session_id(), user_msg) if speculator is not None else None
+    if spec is not None:
+        scene, model_version = spec.scene, spec.model_version
+    else:
+        with span("classify_text"):
+            scene, model_version = classify_scene(user_msg)
+    predicted_label = scene_label(scene)  # "tree", "house+2 tree", "unknown"
+
+    strokes = None
+    svg_web_path = None
 
-    # known shape => draw with pyautogui
-    if predicted_label != "unknown":
-        abs_png_path = perform_drawing(predicted_label)
+    # known shape(s) => draw with pyautogui, all in one Paint session
+    if scene:
+        # detail tier from PAINT_QUALITY / PAINT_LATENCY_BUDGET
+        quality, _ = plan_quality(scene)
+        # the browser polls this job's progress frames meanwhile
+        preview_board.watch(_session_id(), preview_key(*scene_objects(scene), quality))
+        try:
+            abs_png_path = draw_scheduler.submit(scene, quality=quality, priority="interactive")
+            busy = False
+        except SchedulerBusy:
+            abs_png_path, busy = None, True
+        except SchedulerTimeout as e:
+            # answered as a failed drawing rather than hanging the request
+            print(f"[scheduler] {predicted_label}: {e}")
+            abs_png_path, busy = None, False
+        except Exception as e:
+            # scheduler.DrawingFailed (or worse): still a "failed" turn,
+            # and end_request() below still closes this request's spans
+            print(f"[draw] {predicted_label}: {e}")
+            abs_png_path, busy = None, False
+        finally:
+            preview_board.unwatch(_session_id())
         if abs_png_path:
             # assets/saved_drawings/...png relative path for browser
             rel_from_base = os.path.relpath(abs_png_path, BASE_DIR).replace("\\", "/")
             image_web_path = rel_from_base  # "assets/saved_drawings/xxx.png"
-            status_text = f"Here is your {predicted_label}!"
+            status_text = f"Here is your {_scene_phrase(scene)}!"
+            if quality != "full":
+                status_text += f" (a {quality} sketch, to keep it quick)"
+            outcome = "drawn"
+            # a few hundred bytes of geometry instead of the PNG
+            if spec is not None and spec.strokes and spec.quality == quality:
+                strokes = spec.strokes
+            else:
+                with span("stroke_program"):
+                    strokes = program_for(scene, quality)
+            # vector copy next to the PNG, from the same geometry (once:
+            # requests merged into one job share its PNG)
+            if strokes:
+                svg_web_path = os.path.splitext(image_web_path)[0] + ".svg"
+                svg_abs_path = os.path.join(BASE_DIR, svg_web_path)
+                if not os.path.exists(svg_abs_path):
+                    write_svg(svg_from_program(strokes), svg_abs_path)
+            # manifest entry and thumbnail for the gallery page (skipped
+            # when a merged request recorded the drawing already)
+            with span("gallery"):
+                gallery.record(abs_png_path, predicted_label, strokes=strokes,
+                               svg_path=os.path.join(BASE_DIR, svg_web_path) if svg_web_path else None)
+        elif busy:
+            image_web_path = None
+            status_text = (
+                f"I'm busy with other drawings right now, so I couldn't start your "
+                f"{_scene_phrase(scene)}. Please try again in a moment."
+            )
+            outcome = "busy"
         else:
             image_web_path = None
             status_text = (
                 f"I tried to draw '{predicted_label}', "
                 "but something went wrong while using Paint."
             )
+            outcome = "failed"
     else:
         image_web_path = None
         status_text = (
             "I don't know that drawing yet.\n"
-            "I can do things like tree, house, windmill, train, star, flower."
+            f"I can do things like {', '.join(SHAPE_FUNCS)}."
         )
+        outcome = "unknown"
 
     # persist in chat_history.json
-    full_history = _append_chat_entry(
-        user_text=user_msg,
-        predicted_label=predicted_label,
-        status_text=status_text,
-        image_web_path=image_web_path,
-    )
+    with span("_append_chat_entry"):
+        full_history = _append_chat_entry(
+            _session_id(),
+            user_text=user_msg,
+            predicted_label=predicted_label,
+            status_text=status_text,
+            image_web_path=image_web_path,
+            model_version=model_version,
+            strokes=strokes,
+            svg_web_path=svg_web_path,
+            outcome=outcome,
+        )
+
+    end_request(outcome, label=predicted_label, model_version=model_version,
+                speculated=spec is not None)
 
     # update chat UI
-    chat_children = _chat_history_to_components(full_history)
+    chat_children = _chat_history_to_components(full_history, animate_last=True)
 
-    # clear input + trigger scroll
-    return chat_children, "", str(uuid.uuid4())
+    # clear input + trigger scroll, stop the progress preview
+    return chat_children, "", str(uuid.uuid4()), True, _classes("preview-bubble", False)
 
 
 if __name__ == "__main__":
+    start_background()
     # by default Dash serves /assets automatically
-    app.run_server(host="0.0.0.0", port=8050, debug=False)
+    app.run_server(
+        host=os.environ.get("PAINT_HOST", "0.0.0.0"),
+        port=int(os.environ.get("PAINT_PORT", "8050")),
+        debug=False,
+    )
@@ -0,0 +1,22 @@
+// assets/preview.js
+
+// Live preview of a drawing in progress (see preview.py). "start" turns
+// on polling when a message is sent; "show" puts the newest frame in the
+// preview bubble, unless the reply has arrived and polling stopped.
+window.dash_clientside = window.dash_clientside || {};
+
+(function () {
+    const noUpdate = function () { return window.dash_clientside.no_update; };
+
+    window.dash_clientside.preview = {
+        start: function (nClicks, text) {
+            if (!text || !text.trim()) return noUpdate();
+            return false;
+        },
+
+        show: function (frame, disabled) {
+            if (disabled || !frame) return ["preview-bubble is-hidden", noUpdate(), noUpdate()];
+            return ["preview-bubble", frame.stage + "...", frame.image || ""];
+        }
+    };
+})();
@@ -0,0 +1,27 @@
+// assets/speculate.js
+
+// Report what is typed in #user-input to the server once typing pauses,
+// so it can classify it (and get Paint ready) before Send is clicked.
+// The text goes into the "typing-text" store; see speculate.py.
+(function () {
+    const PAUSE_MS = 400;
+    const MIN_CHARS = 4;
+    let timer = null;
+    let lastSent = "";
+
+    function report() {
+        const inputEl = document.getElementById("user-input");
+        const setProps = window.dash_clientside && window.dash_clientside.set_props;
+        if (!inputEl || !setProps) return;
+        const text = inputEl.value.trim();
+        if (text.length < MIN_CHARS || text === lastSent) return;
+        lastSent = text;
+        setProps("typing-text", {data: text});
+    }
+
+    document.addEventListener("input", function (e) {
+        if (!e.target || e.target.id !== "user-input") return;
+        clearTimeout(timer);
+        timer = setTimeout(report, PAUSE_MS);
+    }, true);
+})();
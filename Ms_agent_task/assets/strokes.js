@@ -0,0 +1,89 @@
+// assets/strokes.js
+
+// Renders stroke programs (see stroke_program.py) onto the <canvas>
+// in an agent bubble. Used by the clientside callback in app.py.
+window.dash_clientside = window.dash_clientside || {};
+
+(function () {
+    // same id string Dash gives a pattern-matching component
+    function domId(id) {
+        return "{" + Object.keys(id).sort().map(function (k) {
+            return JSON.stringify(k) + ":" + JSON.stringify(id[k]);
+        }).join(",") + "}";
+    }
+
+    function decode(prog) {
+        const bin = atob(prog.d);
+        const view = new DataView(new ArrayBuffer(bin.length));
+        for (let i = 0; i < bin.length; i++) view.setUint8(i, bin.charCodeAt(i));
+
+        const lines = [];
+        let i = 0, x = 0, y = 0;
+        prog.n.forEach(function (n) {
+            const line = [];
+            for (let k = 0; k < n; k++) {
+                x += view.getInt16(i, true);
+                y += view.getInt16(i + 2, true);
+                i += 4;
+                line.push([x, y]);
+            }
+            lines.push(line);
+        });
+        return lines;
+    }
+
+    function strokeLine(ctx, line) {
+        ctx.beginPath();
+        ctx.moveTo(line[0][0], line[0][1]);
+        if (line.length === 1) {
+            ctx.lineTo(line[0][0] + 0.01, line[0][1]);
+        }
+        for (let k = 1; k < line.length; k++) ctx.lineTo(line[k][0], line[k][1]);
+        ctx.stroke();
+    }
+
+    function render(canvas, prog, animate) {
+        if (canvas._strokeAnim) cancelAnimationFrame(canvas._strokeAnim);
+        canvas.width = prog.w;
+        canvas.height = prog.h;
+
+        const ctx = canvas.getContext("2d");
+        ctx.fillStyle = "#ffffff";
+        ctx.fillRect(0, 0, prog.w, prog.h);
+        ctx.strokeStyle = "#000000";
+        ctx.lineWidth = prog.brush || 3;
+        ctx.lineCap = "round";
+        ctx.lineJoin = "round";
+
+        const lines = decode(prog);
+        if (!animate) {
+            lines.forEach(function (line) { strokeLine(ctx, line); });
+            return;
+        }
+        // about one second, one or more strokes per frame
+        const perFrame = Math.max(1, Math.ceil(lines.length / 60));
+        let next = 0;
+        function frame() {
+            const end = Math.min(lines.length, next + perFrame);
+            for (; next < end; next++) strokeLine(ctx, lines[next]);
+            if (next < lines.length) canvas._strokeAnim = requestAnimationFrame(frame);
+        }
+        frame();
+    }
+
+    window.dash_clientside.strokes = {
+        render: function (data, id) {
+            if (!data || !data.p) return window.dash_clientside.no_update;
+            function draw(retry) {
+                const canvas = document.getElementById(domId(id));
+                if (canvas) {
+                    render(canvas, data.p, data.animate);
+                } else if (retry) {
+                    requestAnimationFrame(function () { draw(false); });
+                }
+            }
+            draw(true);
+            return window.dash_clientside.no_update;
+        }
+    };
+})();
@@ -0,0 +1,257 @@
+# batch_render.py
+#
+# Bulk, Paint-free rendering of labeled drawings (gallery thumbnails,
+# test fixtures, datasets). Every shape x scale x count combination is
+# rendered from the draw_*_at geometry by raster.py, fanned out over a
+# process pool, and streamed to disk as PNGs plus a JSONL manifest.
+#
+#   python batch_render.py --count 50 --scales 0.6,0.9,1.2 --jitter 40
+#   python batch_render.py --spec jobs.json --sprites
+#   python batch_render.py --count 20 --scaling     # throughput vs workers
+#   python batch_render.py --count 20 --scaling --sprites
+#
+# A spec file holds the same keys as the flags:
+#   {"shapes": ["tree", "star"], "scales": [0.8, 1.2], "count": 100,
+#    "jitter": 30, "size": [512, 512], "seed": 1, "brush": 3}
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from PIL import Image
+
+from drawings import SHAPE_FUNCS
+from raster import BRUSH_PX, render_shape
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUT = os.path.join(BASE_DIR, "renders")
+
+DEFAULT_SPEC = {
+    "shapes": list(SHAPE_FUNCS),
+    "scales": [0.6, 0.9, 1.2],
+    "count": 10,
+    "jitter": 0,
+    "size": [512, 512],
+    "seed": 0,
+    "brush": BRUSH_PX,
+}
+
+# sprite sheets: SHEET_COLS x SHEET_ROWS thumbnails of THUMB px
+THUMB = 128
+SHEET_COLS = 16
+SHEET_ROWS = 16
+
+
+def expand_jobs(spec):
+    """
+    One job per image, in a fixed order with per-job seeds, so the
+    output doesn't depend on the number of workers.
+    """
+    jobs = []
+    jitter = spec["jitter"]
+    for label in spec["shapes"]:
+        if label not in SHAPE_FUNCS:
+            raise ValueError(f"unknown shape {label!r}; known: {', '.join(SHAPE_FUNCS)}")
+        for scale in spec["scales"]:
+            for k in range(spec["count"]):
+                rng = random.Random(f"{spec['seed']}:{label}:{scale}:{k}")
+                dx = rng.randint(-jitter, jitter) if jitter else 0
+                dy = rng.randint(-jitter, jitter) if jitter else 0
+                jobs.append({
+                    "id": f"{label}_{scale:g}_{k:05d}",
+                    "label": label,
+                    "scale": scale,
+                    "offset": [dx, dy],
+                })
+    return jobs
+
+
+def _render_chunk(chunk, out_dir, size, brush, thumbs=False):
+    """
+    Worker: render and save every job in `chunk`. Returns the manifest
+    rows and, with `thumbs`, one THUMB px thumbnail per row (the parent
+    packs them into sprite sheets).
+    """
+    rows, small = [], []
+    for job in chunk:
+        img, bbox = render_shape(job["label"], size, job["scale"], job["offset"], width=brush)
+        rel = os.path.join("images", job["label"], job["id"] + ".png")
+        img.save(os.path.join(out_dir, rel), optimize=False)
+        rows.append(dict(job, file=rel.replace("\\", "/"), width=size[0], height=size[1],
+                         bbox=list(bbox)))
+        if thumbs:
+            img.thumbnail((THUMB, THUMB))
+            small.append(img)
+    return rows, small
+
+
+class _SpriteSheets:
+    """
+    Parent side of --sprites: job i goes to sheet i // per_sheet, in
+    row-major order, whatever order the chunks finish in. A sheet is
+    saved once its last thumbnail is in.
+    """
+
+    def __init__(self, out_dir, n_jobs):
+        self.dir = os.path.join(out_dir, "sprites")
+        self.per_sheet = SHEET_COLS * SHEET_ROWS
+        self.n_jobs = n_jobs
+        self.open = {}  # sheet number -> [image, thumbnails still missing]
+        self.count = -(-n_jobs // self.per_sheet)
+        os.makedirs(self.dir, exist_ok=True)
+
+    def add(self, i, thumb):
+        """
+        Paste job i's thumbnail; returns its manifest "sprite" entry.
+        """
+        n, slot = divmod(i, self.per_sheet)
+        if n not in self.open:
+            size = (SHEET_COLS * THUMB, SHEET_ROWS * THUMB)
+            self.open[n] = [Image.new("RGB", size, (255, 255, 255)),
+                            min(self.per_sheet, self.n_jobs - n * self.per_sheet)]
+        sheet = self.open[n]
+        x, y = (slot % SHEET_COLS) * THUMB, (slot // SHEET_COLS) * THUMB
+        sheet[0].paste(thumb, (x, y))
+        sheet[1] -= 1
+        name = f"sheet_{n:04d}.png"
+        if not sheet[1]:
+            sheet[0].save(os.path.join(self.dir, name), optimize=True)
+            del self.open[n]
+        return {"sheet": f"sprites/{name}", "x": x, "y": y, "w": thumb.width, "h": thumb.height}
+
+
+def render_batch(spec, out_dir, workers=None, chunk_size=32, sprites=False, quiet=False):
+    """
+    Render every job in `spec` into out_dir:
+        images/<label>/<id>.png, manifest.jsonl, summary.json
+        sprites/sheet_NNNN.png with --sprites
+    The manifest is appended as chunks finish, so a partial run leaves
+    a usable manifest behind.
+    """
+    workers = workers or os.cpu_count() or 1
+    size = tuple(spec["size"])
+    jobs = expand_jobs(spec)
+
+    for label in spec["shapes"]:
+        os.makedirs(os.path.join(out_dir, "images", label), exist_ok=True)
+    # sheets are packed here, from the workers' thumbnails, so --sprites
+    # keeps the small chunks that spread the work over every worker
+    sheets = _SpriteSheets(out_dir, len(jobs)) if sprites else None
+    starts = range(0, len(jobs), chunk_size)
+
+    t0 = time.perf_counter()
+    done = 0
+    manifest_path = os.path.join(out_dir, "manifest.jsonl")
+    with open(manifest_path, "w", encoding="utf-8") as manifest, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_render_chunk, jobs[start:start + chunk_size], out_dir, size,
+                        spec["brush"], sprites): start
+            for start in starts
+        }
+        for fut in as_completed(futures):
+            rows, thumbs = fut.result()
+            start = futures[fut]
+            for k, thumb in enumerate(thumbs):
+                rows[k]["sprite"] = sheets.add(start + k, thumb)
+            for row in rows:
+                manifest.write(json.dumps(row) + "\n")
+            manifest.flush()
+            done += len(rows)
+            if not quiet:
+                print(f"\r{done}/{len(jobs)} images", end="", flush=True)
+    elapsed = time.perf_counter() - t0
+    if not quiet:
+        print()
+
+    summary = {
+        "spec": spec,
+        "images": len(jobs),
+        "workers": workers,
+        "chunks": len(starts),
+        "elapsed_s": round(elapsed, 3),
+        "images_per_s": round(len(jobs) / elapsed, 1) if elapsed else 0.0,
+        "sprite_sheets": sheets.count if sprites else 0,
+    }
+    with open(os.path.join(out_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def scaling_report(spec, max_workers=None, sprites=False):
+    """
+    Same spec at 1, 2, 4, ... workers; images/s and speedup over 1.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    counts, n = [], 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+
+    rows, base = [], None
+    for w in counts:
+        tmp = tempfile.mkdtemp(prefix="paint-render-")
+        try:
+            s = render_batch(spec, tmp, workers=w, sprites=sprites, quiet=True)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        base = base or s["images_per_s"]
+        rows.append({"workers": w, "images_per_s": s["images_per_s"],
+                     "speedup": round(s["images_per_s"] / base, 2),
+                     "efficiency": round(s["images_per_s"] / base / w, 2)})
+    return rows
+
+
+def _floats(s):
+    return [float(x) for x in s.split(",") if x.strip()]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Render labeled drawings without Paint.")
+    ap.add_argument("--spec", help="JSON job spec; flags below override it")
+    ap.add_argument("--shapes", help="comma-separated labels (default: all)")
+    ap.add_argument("--scales", help="comma-separated scales, e.g. 0.6,0.9,1.2")
+    ap.add_argument("--count", type=int, help="images per shape and scale")
+    ap.add_argument("--jitter", type=int, help="max random offset in px")
+    ap.add_argument("--size", help="WxH of each image, e.g. 512x512")
+    ap.add_argument("--seed", type=int)
+    ap.add_argument("--out", default=DEFAULT_OUT)
+    ap.add_argument("--workers", type=int, default=0, help="default: one per core")
+    ap.add_argument("--sprites", action="store_true", help="also pack thumbnails into sprite sheets")
+    ap.add_argument("--scaling", action="store_true", help="measure throughput at 1..N workers")
+    args = ap.parse_args(argv)
+
+    spec = dict(DEFAULT_SPEC)
+    if args.spec:
+        with open(args.spec, "r", encoding="utf-8") as f:
+            spec.update(json.load(f))
+    if args.shapes:
+        spec["shapes"] = [s.strip().lower() for s in args.shapes.split(",") if s.strip()]
+    if args.scales:
+        spec["scales"] = _floats(args.scales)
+    if args.size:
+        spec["size"] = [int(v) for v in args.size.lower().split("x")]
+    for key in ("count", "jitter", "seed"):
+        if getattr(args, key) is not None:
+            spec[key] = getattr(args, key)
+
+    if args.scaling:
+        for row in scaling_report(spec, args.workers or None, args.sprites):
+            print(f"{row['workers']:>3} workers  {row['images_per_s']:>8.1f} img/s  "
+                  f"x{row['speedup']:<5}  efficiency {row['efficiency']:.2f}")
+        return 0
+
+    summary = render_batch(spec, args.out, workers=args.workers or None, sprites=args.sprites)
+    print(f"{summary['images']} images in {summary['elapsed_s']} s "
+          f"({summary['images_per_s']} img/s, {summary['workers']} workers) -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,10 @@
+# benchmarks/__init__.py
+#
+# Offline performance baseline for the project:
+#
+#   python -m benchmarks                     # run all, save results/<stamp>.json
+#   python -m benchmarks --only history,geometry --quick
+#   python -m benchmarks --update-baseline   # store as perf_baselines/benchmarks.json
+#
+# Every run is compared against the baseline and metrics that got worse
+# by more than --threshold percent are flagged (exit code 1).
@@ -0,0 +1,112 @@
+# benchmarks/__main__.py
+import os
+import sys
+import json
+import time
+import argparse
+
+from benchmarks.common import BENCH_DIR, PROJECT_DIR, Skip, machine_info, offline_env
+
+offline_env()
+
+from benchmarks import bench_classify, bench_history, bench_geometry  # noqa: E402
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+BASELINE_FILE = os.path.join(PROJECT_DIR, "perf_baselines", "benchmarks.json")
+
+BENCHES = {
+    "classify": bench_classify.run,
+    "history": bench_history.run_history,
+    "layout": bench_history.run_layout,
+    "search": bench_history.run_search,
+    "gallery": bench_history.run_gallery,
+    "geometry": bench_geometry.run,
+}
+
+
+def compare(current, baseline, threshold):
+    """
+    Percentage delta of every metric present in both runs. All metrics
+    are "lower is better" (latencies, bytes).
+    Returns (rows, regressions).
+    """
+    rows, regressions = [], []
+    for bench, res in current["benchmarks"].items():
+        base = baseline.get("benchmarks", {}).get(bench, {})
+        for name, value in res.get("metrics", {}).items():
+            old = base.get("metrics", {}).get(name)
+            if old is None or not old:
+                continue
+            delta = 100.0 * (value - old) / old
+            row = (bench, name, old, value, delta)
+            rows.append(row)
+            if delta > threshold:
+                regressions.append(row)
+    return rows, regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m benchmarks")
+    ap.add_argument("--only", help="comma-separated subset of: " + ",".join(BENCHES))
+    ap.add_argument("--quick", action="store_true", help="smaller sizes / fewer repeats")
+    ap.add_argument("--out", help="results file (default benchmarks/results/<stamp>.json)")
+    ap.add_argument("--baseline", default=BASELINE_FILE)
+    ap.add_argument("--update-baseline", action="store_true")
+    ap.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    args = ap.parse_args(argv)
+
+    names = args.only.split(",") if args.only else list(BENCHES)
+    results = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "quick": args.quick,
+               "machine": machine_info(), "benchmarks": {}, "skipped": {}}
+
+    for name in names:
+        print(f"[bench] {name} ...", flush=True)
+        t0 = time.perf_counter()
+        try:
+            results["benchmarks"][name] = BENCHES[name](quick=args.quick)
+        except Skip as e:
+            print(f"[bench] {name} skipped: {e}")
+            results["skipped"][name] = str(e)
+            continue
+        print(f"[bench] {name} done in {time.perf_counter() - t0:.1f}s")
+        for k, v in results["benchmarks"][name]["metrics"].items():
+            print(f"    {k:<32}{v}")
+
+    out = args.out
+    if not out:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, time.strftime("%Y%m%d_%H%M%S") + ".json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nresults: {out}")
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("no baseline yet (run with --update-baseline to create one)")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("quick") != args.quick:
+        print("warning: baseline and this run differ in --quick; sizes may not line up")
+
+    rows, regressions = compare(results, baseline, args.threshold)
+    print(f"\n{'benchmark':<10}{'metric':<32}{'baseline':>12}{'now':>12}{'delta':>9}")
+    for bench, name, old, new, delta in rows:
+        flag = "  <-- REGRESSION" if delta > args.threshold else ""
+        print(f"{bench:<10}{name:<32}{old:>12}{new:>12}{delta:>+8.1f}%{flag}")
+
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) regressed by more than {args.threshold}%")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
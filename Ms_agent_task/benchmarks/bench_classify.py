@@ -0,0 +1,63 @@
+# benchmarks/bench_classify.py
+#
+# classify_text latency: cold = fresh interpreter, import predict and
+# classify once (model load + first forward pass); warm = repeated calls
+# in an already-loaded process.
+import os
+import sys
+import json
+import subprocess
+
+from benchmarks.common import PROJECT_DIR, Skip, percentiles, time_calls
+
+PROMPTS = [
+    "draw a flower",
+    "can you make a house",
+    "please show me a windmill",
+    "i want a train drawing",
+    "can you draw a star for me",
+    "hello",
+]
+
+_COLD_SCRIPT = r"""
+import json, time
+t0 = time.perf_counter()
+import predict
+t1 = time.perf_counter()
+predict.classify_text("draw a tree")
+t2 = time.perf_counter()
+print(json.dumps({"import_s": t1 - t0, "first_call_s": t2 - t1}))
+"""
+
+
+def _cold_run():
+    env = dict(os.environ)
+    env.pop("PAINT_LAZY_MODEL", None)
+    env.pop("PAINT_SIDECAR_URL", None)
+    proc = subprocess.run(
+        [sys.executable, "-c", _COLD_SCRIPT],
+        cwd=PROJECT_DIR, env=env, capture_output=True, text=True, timeout=600,
+    )
+    if proc.returncode != 0:
+        raise Skip("cannot load the intent model offline: " + proc.stderr.strip().splitlines()[-1])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run(quick=False):
+    cold_runs = 1 if quick else 3
+    warm_runs = 20 if quick else 200
+
+    cold = [_cold_run() for _ in range(cold_runs)]
+    cold_total = [c["import_s"] + c["first_call_s"] for c in cold]
+
+    import predict
+    i = iter(range(10 ** 9))
+    warm = time_calls(lambda: predict.classify_text(PROMPTS[next(i) % len(PROMPTS)]), warm_runs, warmup=3)
+
+    metrics = {}
+    metrics.update({f"cold_{k}": v for k, v in percentiles(cold_total, ps=(50,)).items()})
+    metrics.update({f"warm_{k}": v for k, v in percentiles(warm).items()})
+    return {
+        "metrics": metrics,
+        "info": {"cold_runs": cold_runs, "warm_runs": warm_runs, "cold_detail": cold},
+    }
@@ -0,0 +1,30 @@
+# benchmarks/bench_geometry.py
+#
+# Pure stroke-generation cost of every draw_*_at, with the input layer
+# replaced by input_sim.RecordingBackend (no mouse, no sleeps).
+from benchmarks.common import percentiles, time_calls
+
+
+def run(quick=False):
+    import paint_driver
+    from drawings import SHAPE_FUNCS
+    from input_sim import RecordingBackend
+
+    reps = 50 if quick else 500
+    S = paint_driver.get_scale_fn()
+
+    metrics, info = {}, {}
+    for label, fn in SHAPE_FUNCS.items():
+        def one():
+            rec = RecordingBackend()
+            with paint_driver.use_input_backend(rec):
+                fn(1280, 720, S)
+            return rec
+
+        samples = time_calls(one, reps, warmup=5)
+        for k, v in percentiles(samples, ps=(50, 99)).items():
+            metrics[f"{label}_{k}"] = v
+        rec = one()
+        info[f"{label}_calls"] = len(rec.records)
+        info[f"{label}_segments"] = sum(len(p) - 1 for p in rec.polylines())
+    return {"metrics": metrics, "info": info}
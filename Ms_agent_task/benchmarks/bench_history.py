@@ -0,0 +1,221 @@
+# benchmarks/bench_history.py
+#
+# Chat history persistence and rendering at growing history sizes:
+#   history: _append_chat_entry / _load_chat_history for a session with
+#            n entries, and an append to another session next to it
+#   layout:  _chat_history_to_components build time + serialized size,
+#            raw and as sent with gzip / brotli
+#   search:  history_index queries (word, label + outcome, time range)
+#            against a session with n entries, after the index is built
+#   gallery: gallery pages (newest, one shape, deep cursor) over a
+#            manifest of n saved drawings
+import os
+import gzip
+import time
+import shutil
+import tempfile
+import contextlib
+
+import brotli
+
+from benchmarks.common import percentiles, time_calls
+
+SIZES = (100, 10_000, 100_000)
+QUICK_SIZES = (100, 1_000)
+
+_LABELS = ["tree", "house", "windmill", "train", "star", "flower", "unknown"]
+
+
+def synthetic_history(n):
+    out = []
+    for i in range(n):
+        label = _LABELS[i % len(_LABELS)]
+        drawn = label != "unknown"
+        out.append({
+            "id": f"00000000-0000-0000-0000-{i:012d}",
+            "timestamp": f"2025-10-{1 + i % 28:02d}T12:{i % 60:02d}:00",
+            "user_text": f"please draw a {label} number {i}",
+            "predicted_label": label,
+            "status_text": f"Here is your {label}!" if drawn else "I don't know that drawing yet.",
+            "image_path": f"assets/saved_drawings/20251028_1200{i % 60:02d}_{label}.png" if drawn else None,
+            "model_version": "20251028-00000000",
+        })
+    return out
+
+
+@contextlib.contextmanager
+def _temp_history(app, entries):
+    """
+    Point app's history store at a temp one whose session `sid` holds
+    `entries`; yields (sid, path of that session's file).
+    """
+    from history_store import HistoryStore, new_session_id
+    from history_index import HistoryIndex
+
+    tmp = tempfile.mkdtemp(prefix="paint-bench-")
+    store = HistoryStore(tmp)
+    sid = new_session_id()
+    store.rewrite(sid, entries)
+    old = app.history_store, app.history_index
+    app.history_store, app.history_index = store, HistoryIndex(store)
+    try:
+        yield sid, store.path(sid)
+    finally:
+        app.history_store, app.history_index = old
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _repeats(n, quick):
+    if n >= 100_000:
+        return 3
+    if n >= 10_000:
+        return 5 if quick else 10
+    return 10 if quick else 50
+
+
+def run_history(quick=False):
+    import app
+    from history_store import new_session_id
+
+    metrics, info = {}, {}
+    for n in (QUICK_SIZES if quick else SIZES):
+        entries = synthetic_history(n)
+        reps = _repeats(n, quick)
+        with _temp_history(app, entries) as (sid, path):
+            load = time_calls(lambda: app._load_chat_history(sid), reps)
+            append = time_calls(
+                lambda: app._append_chat_entry(sid, "draw a tree", "tree", "Here is your tree!", None),
+                reps,
+            )
+            # another user's request: should not depend on n
+            other = new_session_id()
+            append_other = time_calls(
+                lambda: app._append_chat_entry(other, "draw a tree", "tree", "Here is your tree!", None),
+                reps,
+            )
+            info[f"file_bytes_{n}"] = os.path.getsize(path)
+        for k, v in percentiles(load, ps=(50, 90)).items():
+            metrics[f"load_{n}_{k}"] = v
+        for k, v in percentiles(append, ps=(50, 90)).items():
+            metrics[f"append_{n}_{k}"] = v
+        for k, v in percentiles(append_other, ps=(50, 90)).items():
+            metrics[f"append_other_{n}_{k}"] = v
+    return {"metrics": metrics, "info": info}
+
+
+SEARCH_QUERIES = {
+    "word": "number 42",
+    "label_outcome": "label:train outcome:drawn",
+    "range": "since:2025-10-10 until:2025-10-12",
+}
+
+
+def run_search(quick=False):
+    import app
+
+    metrics, info = {}, {}
+    for n in (QUICK_SIZES if quick else SIZES):
+        entries = synthetic_history(n)
+        with _temp_history(app, entries) as (sid, _):
+            t0 = time.perf_counter()
+            app.history_index.search(sid, "")
+            info[f"build_{n}_ms"] = round((time.perf_counter() - t0) * 1000.0, 1)
+            for name, q in SEARCH_QUERIES.items():
+                samples = time_calls(lambda: app.history_index.search(sid, q), 20 if n >= 100_000 else 50)
+                for k, v in percentiles(samples, ps=(50, 90)).items():
+                    metrics[f"{name}_{n}_{k}"] = v
+            # a query right after another worker appended a turn: the
+            # index reads just the new line
+            turns = iter(synthetic_history(n + 200)[n:])
+            samples = time_calls(lambda: (
+                app.history_store.append(sid, next(turns)),
+                app.history_index.search(sid, "label:tree"),
+            ), 50)
+            for k, v in percentiles(samples, ps=(50, 90)).items():
+                metrics[f"append_search_{n}_{k}"] = v
+    return {"metrics": metrics, "info": info}
+
+
+def synthetic_manifest(n):
+    out = []
+    for i in range(n):
+        label = _LABELS[i % (len(_LABELS) - 1)]
+        name = f"202510{1 + i % 28:02d}_12{i % 60:02d}00_{label}"
+        out.append({
+            "name": name + ".png",
+            "label": label,
+            "timestamp": f"2025-10-{1 + i % 28:02d}T12:{i % 60:02d}:00",
+            "width": 2000,
+            "height": 800,
+            "bytes": 40_000 + i % 1000,
+            "path": f"assets/saved_drawings/{name}.png",
+            "svg": f"assets/saved_drawings/{name}.svg",
+            "thumb": f"assets/saved_drawings/gallery/thumbs/{name}.png",
+        })
+    return out
+
+
+GALLERY_PAGES = {
+    "newest": {},
+    "label": {"label": "train"},
+    "deep": {"cursor": "half"},
+    "label_deep": {"label": "train", "cursor": "half"},
+}
+
+
+def run_gallery(quick=False):
+    from gallery import GalleryIndex
+
+    metrics, info = {}, {}
+    for n in (QUICK_SIZES if quick else SIZES):
+        tmp = tempfile.mkdtemp(prefix="bench_gallery_")
+        try:
+            index = GalleryIndex(tmp)
+            index._append(synthetic_manifest(n))
+            t0 = time.perf_counter()
+            index.page()
+            info[f"build_{n}_ms"] = round((time.perf_counter() - t0) * 1000.0, 1)
+            for name, kw in GALLERY_PAGES.items():
+                kw = dict(kw, cursor=n // 2) if kw.get("cursor") else kw
+                samples = time_calls(lambda: index.page(**kw), 50)
+                for k, v in percentiles(samples, ps=(50, 90)).items():
+                    metrics[f"{name}_{n}_{k}"] = v
+            # a page right after another worker saved a drawing: the
+            # index reads just the new line
+            new = iter(synthetic_manifest(n + 200)[n:])
+            samples = time_calls(lambda: (index._append([next(new)]), index.page(label="tree")), 50)
+            for k, v in percentiles(samples, ps=(50, 90)).items():
+                metrics[f"append_page_{n}_{k}"] = v
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return {"metrics": metrics, "info": info}
+
+
+def serialized(components):
+    from plotly.io.json import to_json_plotly
+
+    return to_json_plotly(components).encode("utf-8")
+
+
+def run_layout(quick=False):
+    import app
+
+    metrics, info = {}, {}
+    for n in (QUICK_SIZES if quick else SIZES):
+        entries = synthetic_history(n)
+        reps = 3 if n >= 10_000 else 20
+        build = time_calls(lambda: app._chat_history_to_components(entries), reps)
+        components = app._chat_history_to_components(entries)
+        data = serialized(components)
+        # at the levels app.py gives flask-compress
+        sizes = {
+            "": len(data),
+            "_gzip": len(gzip.compress(data, 6)),
+            "_br": len(brotli.compress(data, quality=4)),
+        }
+        for k, v in percentiles(build, ps=(50,)).items():
+            metrics[f"build_{n}_{k}"] = v
+        for enc, size in sizes.items():
+            metrics[f"payload_{n}{enc}_bytes"] = size
+            info[f"bytes_per_turn_{n}{enc}"] = round(size / n, 1)
+    return {"metrics": metrics, "info": info}
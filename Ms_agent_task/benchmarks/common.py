@@ -0,0 +1,63 @@
+# benchmarks/common.py
+import os
+import sys
+import time
+import atexit
+import shutil
+import platform
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+
+from metrics import percentiles  # noqa: E402,F401  (shared with the app's /scheduler stats)
+
+
+def offline_env():
+    """
+    Keep every benchmark off the network and away from the real Paint /
+    history: the model loads from the local HF cache only, lazily, and
+    importing app writes its history, drawings and gallery manifest to
+    a scratch directory (removed at exit) with no background threads.
+    """
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+    os.environ.setdefault("PAINT_LAZY_MODEL", "1")
+    os.environ.setdefault("PAINT_MODEL_WATCH", "0")
+    os.environ.setdefault("PAINT_HISTORY_COMPACT", "0")
+    os.environ.setdefault("PAINT_SPECULATE", "0")
+    scratch = tempfile.mkdtemp(prefix="paint-bench-env-")
+    atexit.register(shutil.rmtree, scratch, ignore_errors=True)
+    os.environ.setdefault("PAINT_HISTORY_DIR", os.path.join(scratch, "history"))
+    os.environ.setdefault("PAINT_SAVED_DIR", os.path.join(scratch, "saved_drawings"))
+
+
+def time_calls(fn, repeat, warmup=1):
+    """
+    Run fn() warmup + repeat times; returns the `repeat` durations (s).
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def machine_info():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+class Skip(Exception):
+    """
+    Raised by a benchmark that can't run here (missing model, ...).
+    """
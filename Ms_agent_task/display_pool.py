@@ -0,0 +1,289 @@
+# display_pool.py
+#
+# Parallel drawing on Linux: one worker process per Xvfb display, each
+# with its own tk_paint.py window and its own pointer, so N drawings run
+# at once instead of queueing for the single desktop mouse.
+#
+# Workers run the unchanged perform_drawing(). Mouse calls go to
+# pyautogui bound to the worker's display; the Paint dialog choreography
+# (launch, Ctrl+E canvas size, F12 save as, Alt+F4) is turned into
+# acknowledged tk_paint commands by DisplayBackend, and the fixed waits
+# that only exist for Paint's UI are skipped.
+#
+#   python display_pool.py --displays 4 --shapes tree,star,house --count 3
+#   python display_pool.py --scene "house:1,tree:2" --count 4 --out renders/xvfb
+import os
+import sys
+import time
+import queue
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+
+from xdisplay import VirtualDisplay, DEFAULT_SCREEN
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUT = os.path.join(BASE_DIR, "renders", "xvfb")
+FIRST_DISPLAY = int(os.environ.get("PAINT_FIRST_DISPLAY", "90"))
+# --gui xtest: motion events per second. tk_paint (Tk) merges the ones
+# that queue up, so an unpaced polyline would arrive as a chord.
+XTEST_RATE_HZ = float(os.environ.get("PAINT_XTEST_RATE", "1000"))
+
+# phases whose sleeps only wait for Paint's UI to catch up
+_SETUP_PHASES = {"launch", "activate", "maximize", "zoom", "canvas_size",
+                 "save_as", "brush", "save", "save_as_final", "close"}
+
+
+class _Window:
+    isMinimized = False
+
+    def restore(self):
+        pass
+
+    def activate(self):
+        pass
+
+
+class DisplayBackend:
+    """
+    Input backend for one virtual display (see paint_driver._InputProxy).
+
+    Pointer calls are forwarded to `gui` (pyautogui, or any backend with
+    the same calls) and reach tk_paint as real X events. Keyboard calls
+    are interpreted as Paint would and sent to `app` as commands.
+    """
+
+    def __init__(self, app, gui):
+        self.app = app
+        self.gui = gui
+        self._phase = None
+        self._mode = None     # "size" or "save" while a dialog is "open"
+        self._fields = [""]
+        self._path = None
+
+    def __getattr__(self, name):
+        # moveTo, dragTo, dragRel, size, position, PAUSE ...
+        return getattr(self.gui, name)
+
+    # ---------- session ----------
+    def launch(self, args):
+        self.app.command("new")
+
+    def getWindowsWithTitle(self, title):
+        return [_Window()]
+
+    def begin_phase(self, name):
+        self._phase = name
+        begin = getattr(self.gui, "begin_phase", None)
+        if begin is not None:
+            begin(name)
+
+    def end_phase(self, name):
+        self._phase = None
+        end = getattr(self.gui, "end_phase", None)
+        if end is not None:
+            end(name)
+
+    def sleep(self, seconds):
+        if self._phase in _SETUP_PHASES:
+            return  # tk_paint acknowledges every command instead
+        sleep = getattr(self.gui, "sleep", None) or time.sleep
+        sleep(seconds)
+
+    # ---------- Paint's keyboard UI ----------
+    def hotkey(self, *keys, **kwargs):
+        keys = tuple(k.lower() for k in keys)
+        if keys == ("ctrl", "e"):
+            self._mode, self._fields = "size", [""]
+        elif keys == ("ctrl", "s") and self._path:
+            self.app.command(f"save {self._path}")
+        elif keys == ("alt", "f4"):
+            self.app.command("close")
+            self._path = None
+
+    def press(self, key, presses=1, **kwargs):
+        key = key.lower()
+        if key == "f12":
+            self._mode, self._fields = "save", [""]
+        elif key == "tab" and self._mode == "size":
+            self._fields.append("")
+        elif key == "enter" and self._mode == "size":
+            w, h = (int(v) for v in self._fields[:2])
+            self.app.command(f"size {w} {h}")
+            self._mode = None
+        elif key == "enter" and self._mode == "save":
+            self._path = self._fields[0]
+            self.app.command(f"save {self._path}")
+            self._mode = None
+
+    def typewrite(self, message, interval=0.0, **kwargs):
+        if self._mode is not None:
+            self._fields[-1] += str(message)
+
+    write = typewrite
+
+
+def _make_gui(name):
+    """
+    Pointer backend for a worker; imported only after DISPLAY is set.
+    """
+    if name == "xtest":
+        from xtest_backend import XTestBackend
+        return XTestBackend(rate_hz=XTEST_RATE_HZ)
+    import pyautogui
+    return pyautogui
+
+
+def _worker_main(index, display_num, screen, gui_name, jobs, results):
+    try:
+        with VirtualDisplay(display_num, screen) as vd:
+            # pyautogui binds to $DISPLAY when first imported
+            os.environ["DISPLAY"] = vd.name
+            import paint_driver
+            from drawings import perform_drawing
+
+            gui = _make_gui(gui_name)
+            if hasattr(gui, "FAILSAFE"):
+                gui.FAILSAFE = False  # no human on this display
+            paint_driver.set_input_backend(DisplayBackend(vd.app, gui))
+            # private save root: perform_drawing names files by the second
+            paint_driver.SAVED_ROOT = tempfile.mkdtemp(prefix=f"paint-x{display_num}-")
+
+            results.put({"ready": index, "display": vd.name})
+            while True:
+                job = jobs.get()
+                if job is None:
+                    break
+                t0 = time.perf_counter()
+                out = {"id": job["id"], "worker": index, "display": vd.name}
+                try:
+                    path = perform_drawing(job["scene"])
+                    if path is None:
+                        raise RuntimeError("nothing drawn")
+                    shutil.move(path, job["out"])
+                    out.update(ok=True, file=job["out"])
+                except Exception as e:
+                    out.update(ok=False, error=str(e))
+                out["elapsed_s"] = round(time.perf_counter() - t0, 3)
+                results.put(out)
+            shutil.rmtree(paint_driver.SAVED_ROOT, ignore_errors=True)
+    except Exception as e:
+        results.put({"ready": index, "error": str(e)})
+
+
+class DisplayPool:
+    """
+    `displays` worker processes, each on its own Xvfb display. Jobs go
+    through one shared queue, so an idle worker always takes the next.
+    """
+
+    def __init__(self, displays=None, first_display=FIRST_DISPLAY, screen=DEFAULT_SCREEN,
+                 gui="pyautogui"):
+        self.n = displays or os.cpu_count() or 1
+        self.first_display = first_display
+        self.screen = screen
+        self.gui = gui
+        # spawn: every worker imports pyautogui fresh, after setting DISPLAY
+        ctx = multiprocessing.get_context("spawn")
+        self.jobs = ctx.Queue()
+        self.results = ctx.Queue()
+        self.procs = [
+            ctx.Process(target=_worker_main,
+                        args=(i, first_display + i, screen, gui, self.jobs, self.results),
+                        daemon=True)
+            for i in range(self.n)
+        ]
+
+    def start(self, timeout=60.0):
+        for p in self.procs:
+            p.start()
+        for _ in self.procs:
+            msg = self.results.get(timeout=timeout)
+            if "error" in msg:
+                self.close()
+                raise RuntimeError(f"display worker {msg['ready']}: {msg['error']}")
+        return self
+
+    def run(self, jobs, timeout=600.0):
+        """
+        jobs: [{"id", "scene", "out"}, ...], scene as for perform_drawing.
+        Yields one result dict per job, in completion order.
+        """
+        for job in jobs:
+            self.jobs.put(job)
+        for _ in jobs:
+            try:
+                res = self.results.get(timeout=timeout)
+            except queue.Empty:
+                raise RuntimeError("display workers stopped responding")
+            if "ready" in res:
+                raise RuntimeError(f"display worker {res['ready']} died: {res.get('error')}")
+            yield res
+
+    def close(self):
+        for p in self.procs:
+            if p.is_alive():
+                self.jobs.put(None)
+        for p in self.procs:
+            p.join(timeout=10)
+            if p.is_alive():
+                p.terminate()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _parse_scene(spec):
+    scene = []
+    for part in spec.split(","):
+        label, _, n = part.partition(":")
+        scene.append((label.strip().lower(), int(n or 1)))
+    return scene
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Draw in parallel on a pool of Xvfb displays.")
+    ap.add_argument("--displays", type=int, default=0, help="default: one per core")
+    ap.add_argument("--shapes", default="tree,house,windmill,train,star,flower")
+    ap.add_argument("--scene", help="draw this scene instead, e.g. 'house:1,tree:2'")
+    ap.add_argument("--count", type=int, default=1, help="drawings per shape (or of the scene)")
+    ap.add_argument("--gui", choices=("pyautogui", "xtest"), default="pyautogui",
+                    help="xtest: batched strokes, no per-call PAUSE (xtest_backend.py)")
+    ap.add_argument("--out", default=DEFAULT_OUT)
+    args = ap.parse_args(argv)
+
+    if shutil.which("Xvfb") is None:
+        print("Xvfb not found; install xvfb (and python3-tk, python-xlib).")
+        return 2
+
+    os.makedirs(args.out, exist_ok=True)
+    if args.scene:
+        work = [("scene", _parse_scene(args.scene))]
+    else:
+        work = [(s.strip(), s.strip()) for s in args.shapes.split(",") if s.strip()]
+    jobs = [
+        {"id": f"{name}_{k:04d}", "scene": scene,
+         "out": os.path.join(args.out, f"{name}_{k:04d}.png")}
+        for name, scene in work for k in range(args.count)
+    ]
+
+    with DisplayPool(args.displays or None, gui=args.gui) as pool:
+        t0 = time.perf_counter()
+        ok = 0
+        for res in pool.run(jobs):
+            ok += bool(res.get("ok"))
+            status = res.get("file") if res.get("ok") else "FAILED: " + res.get("error", "")
+            print(f"[{res['display']}] {res['id']:<16} {res['elapsed_s']:>7.2f}s  {status}")
+        elapsed = time.perf_counter() - t0
+
+    print(f"{ok}/{len(jobs)} drawings in {elapsed:.1f} s on {pool.n} displays "
+          f"({ok / elapsed * 60:.1f} per minute)")
+    return 0 if ok == len(jobs) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
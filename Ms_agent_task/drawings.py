@@ -1,60 +1,341 @@
 # drawings.py
 import os
-import datetime
 import time
+import datetime
+import threading
+import contextlib
 
 from paint_driver import (
     open_paint_and_prepare,
     save_and_close_paint,
-    draw_tree_at,
-    draw_house_at,
-    draw_windmill_at,
-    draw_train_at,
-    draw_star_at,
-    draw_flower_at,
+    shape_drawer,
     get_scale_fn,
     get_saved_root,
+    pause,
+    input_phase,
+    session_backend,
+    has_session_backends,
+    use_input_backend,
+    use_quality,
+    record_strokes,
+    run_strokes,
+    recover_focus,
+    StrokeInterrupted,
+    QUALITY_ORDER,
+    CANVAS_W,
+    CANVAS_H,
+)
+from metrics import Counter, span, observe_job, note
+from input_trace import trace_session
+from preview import preview_session, preview_key
+from layout import plan_scene, expand_scene, scale_fn
+from shape_registry import registry as shape_registry
+
+# label -> draw_<label>_at(cx, cy, S), one per definition in shapes/
+SHAPE_FUNCS = {name: shape_drawer(shape) for name, shape in shape_registry.items()}
+
+# there is one mouse: real Paint sessions must not interleave
+_desktop_lock = threading.Lock()
+
+# wait between the last stroke and saving
+SETTLE_S = 0.5
+
+# PAINT_QUALITY=draft|standard|full: tier when no budget applies;
+# PAINT_LATENCY_BUDGET=<seconds>: pick the richest tier that fits instead
+DEFAULT_QUALITY = os.environ.get("PAINT_QUALITY", "full")
+_budget_env = os.environ.get("PAINT_LATENCY_BUDGET", "")
+DEFAULT_BUDGET_S = float(_budget_env) if _budget_env else None
+
+# PAINT_PREWARM_TTL: seconds a canvas opened ahead of time (prewarm_paint)
+# waits for a drawing before it is closed again
+PREWARM_TTL_S = float(os.environ.get("PAINT_PREWARM_TTL", "60"))
+
+PREWARM = Counter(
+    "paint_prewarm_total",
+    "Paint canvases opened ahead of a drawing, by what became of them (used, expired, skipped).",
+    labelnames=("result",),
+)
+PREWARM_SECONDS = Counter(
+    "paint_prewarm_seconds_total",
+    "Time spent opening canvases ahead of a drawing, by whether a drawing used them.",
+    labelnames=("use",),
+)
+
+
+# PAINT_MAX_RESUMES: interruptions (failsafe, Paint losing focus) a
+# drawing continues after before it is given up
+MAX_RESUMES = int(os.environ.get("PAINT_MAX_RESUMES", "3"))
+
+INTERRUPTIONS = Counter(
+    "paint_interruptions_total",
+    "Drawings interrupted mid-stroke, by cause (failsafe, focus).",
+    labelnames=("cause",),
+)
+RESUMES = Counter(
+    "paint_resumes_total",
+    "Interrupted drawings, by whether they continued from their checkpoint (resumed, gave_up).",
+    labelnames=("result",),
 )
+RESUME_SAVED_SECONDS = Counter(
+    "paint_resume_saved_seconds_total",
+    "Drawing time not repeated because interrupted drawings resumed instead of starting over.",
+)
+
+
+class _WarmCanvas:
+    def __init__(self, backend, prepared, cost_s):
+        self.backend = backend
+        self.prepared = prepared  # open_paint_and_prepare()'s result
+        self.cost_s = cost_s
+        self.timer = None
+
+
+# at most one canvas waits at a time
+_warm = None
+_warming = False
+_warm_guard = threading.Lock()
 
 def _timestamp():
     return datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
 
-def perform_drawing(label: str):
+def perform_drawing(label, quality=None, budget_s=None):
     """
     1. open Paint session (new canvas, centered)
     2. draw shape based on label
     3. save final PNG in assets/saved_drawings/<timestamp>_<label>.png
     4. return that absolute path
+    `label` may also be a scene, [(label, count), ...] as returned by
+    predict.classify_scene: every object is laid out on the one canvas
+    and saved as <timestamp>_<label>-<label>-....png.
+    quality / budget_s choose the detail tier, see plan_quality().
+    A canvas opened ahead by prewarm_paint() is used instead of step 1.
+    Progress snapshots are published under preview_key() (preview.py).
+    With PAINT_TRACE=1 the whole session is written as a Chrome trace.
+    """
+    shape_key, objects = scene_objects(label)
+    quality, estimated_s = plan_quality(label, quality, budget_s)
+    key = preview_key(shape_key, objects, quality)
+
+    if has_session_backends():
+        # each session has its own (virtual) input device
+        warm = _take_warm()
+        device = use_input_backend(warm.backend) if warm else session_backend()
+        with device, trace_session(shape_key), preview_session(key):
+            return _timed_drawing(shape_key, objects, quality, estimated_s, warm)
+    with _desktop_lock, trace_session(shape_key), preview_session(key):
+        return _timed_drawing(shape_key, objects, quality, estimated_s, _take_warm())
+
+def prewarm_paint():
+    """
+    Open and prepare a Paint canvas now, so the next perform_drawing
+    starts at its first stroke instead of waiting for Paint to boot.
+    Does nothing if a canvas is already waiting or, on the shared
+    desktop, while a drawing is running. The canvas is closed again
+    after PREWARM_TTL_S if no drawing takes it. True if one is ready.
     """
-    ok, cx, cy, session_name, first_filepath = open_paint_and_prepare()
+    global _warm, _warming
+    with _warm_guard:
+        if _warm is not None or _warming:
+            return _warm is not None
+        _warming = True
+    desktop = None if has_session_backends() else _desktop_lock
+    try:
+        if desktop is not None and not desktop.acquire(blocking=False):
+            PREWARM.inc(result="skipped")
+            return False
+        try:
+            t0 = time.perf_counter()
+            with session_backend() as backend, span("prewarm_paint"):
+                prepared = open_paint_and_prepare()
+            if not prepared[0]:
+                return False
+            warm = _WarmCanvas(backend, prepared, time.perf_counter() - t0)
+            warm.timer = threading.Timer(PREWARM_TTL_S, _expire_warm, args=(warm,))
+            warm.timer.daemon = True
+            # parked before the desktop is released, so a drawing that was
+            # waiting for it finds the canvas instead of opening another
+            with _warm_guard:
+                _warm = warm
+            warm.timer.start()
+            return True
+        finally:
+            if desktop is not None:
+                desktop.release()
+    finally:
+        with _warm_guard:
+            _warming = False
+
+def _take_warm():
+    # on the shared desktop the caller holds _desktop_lock
+    global _warm
+    with _warm_guard:
+        warm, _warm = _warm, None
+    if warm is not None:
+        warm.timer.cancel()
+        PREWARM.inc(result="used")
+        PREWARM_SECONDS.inc(warm.cost_s, use="used")
+    return warm
+
+def _expire_warm(warm):
+    global _warm
+    with _warm_guard:
+        if _warm is not warm:
+            return  # taken meanwhile
+        _warm = None
+    desktop = contextlib.nullcontext() if has_session_backends() else _desktop_lock
+    with desktop, use_input_backend(warm.backend), span("prewarm_paint"):
+        save_and_close_paint(warm.prepared[4])
+    PREWARM.inc(result="expired")
+    PREWARM_SECONDS.inc(warm.cost_s, use="wasted")
+
+def plan_quality(label, quality=None, budget_s=None):
+    """
+    (tier, estimated job seconds) for drawing `label` (or a scene).
+    An explicit quality wins; otherwise, with a latency budget (argument
+    or PAINT_LATENCY_BUDGET), the richest tier whose projected time fits,
+    or "draft" if none does; otherwise PAINT_QUALITY.
+    """
+    # imported here: input_sim imports this module
+    from input_sim import estimate_job
+
+    labels = object_labels(*scene_objects(label))
+    if budget_s is None:
+        budget_s = DEFAULT_BUDGET_S
+    if quality is None and budget_s is not None:
+        for tier in reversed(QUALITY_ORDER):
+            estimated_s = estimate_job(labels, tier)
+            if estimated_s <= budget_s:
+                return tier, estimated_s
+        return QUALITY_ORDER[0], estimated_s
+    quality = quality or DEFAULT_QUALITY
+    return quality, estimate_job(labels, quality)
+
+def object_labels(shape_key, objects):
+    """
+    The labels scene_objects() will draw, one per object.
+    """
+    if objects:
+        return list(objects)
+    return [shape_key] if shape_key in SHAPE_FUNCS else []
+
+def scene_objects(label):
+    """
+    label or scene -> (shape_key, objects): objects is None for a single
+    shape, else the scene's labels one per object in drawing order.
+    """
+    if isinstance(label, str) or label is None:
+        return (label or "").strip().lower(), None
+    scene = [(l.strip().lower(), n) for l, n in label if l.strip().lower() in SHAPE_FUNCS]
+    objects = expand_scene(scene)
+    shape_key = "-".join(l for l, _ in scene)
+    if len(objects) == 1:
+        # a lone object draws exactly like a plain label
+        return shape_key, None
+    return shape_key, objects
+
+def parse_scene_label(text: str):
+    """
+    Inverse of predict.scene_label, for labels stored in the history:
+    "house+2 tree+star" -> [("house", 1), ("tree", 2), ("star", 1)]
+    """
+    scene = []
+    for part in (text or "").split("+"):
+        count, _, label = part.strip().rpartition(" ")
+        if label and label != "unknown":
+            scene.append((label, int(count) if count.isdigit() else 1))
+    return scene
+
+def draw_on_canvas(shape_key, objects, cx, cy, session_name=None, started=None):
+    """
+    Stroke the shape (or the laid-out scene) on a canvas centered at
+    (cx, cy), through the active input backend. False if unknown.
+    With the Paint session's name, every shape is drawn from a recorded
+    plan and continued where it stopped after an interruption (see
+    _run_shape); StrokeInterrupted once that has failed MAX_RESUMES times.
+    """
+    if objects:
+        _draw_scene(objects, cx, cy, session_name, started)
+        return True
+    draw_fn = SHAPE_FUNCS.get(shape_key)
+    if draw_fn is None:
+        return False
+    with span(draw_fn.__name__), input_phase("draw"):
+        _run_shape(draw_fn, (cx, cy, get_scale_fn()), session_name, started)
+    return True
+
+def _draw_scene(objects, cx, cy, session_name=None, started=None):
+    # plan_scene works in canvas coordinates; (cx, cy) is its center on screen
+    left = cx - CANVAS_W // 2
+    top = cy - CANVAS_H // 2
+    for obj_label, x, y, scale in plan_scene(objects, SHAPE_FUNCS):
+        draw_fn = SHAPE_FUNCS[obj_label]
+        with span(draw_fn.__name__), input_phase("draw"):
+            _run_shape(draw_fn, (left + x, top + y, scale_fn(scale)), session_name, started)
+
+def _run_shape(draw_fn, args, session_name, started):
+    if session_name is None:
+        draw_fn(*args)
+        return
+    plan = record_strokes(draw_fn, *args)
+    done = resumes = 0
+    while True:
+        try:
+            run_strokes(plan, done)
+            return
+        except StrokeInterrupted as e:
+            INTERRUPTIONS.inc(cause=e.cause)
+            done, reason = e.index, str(e)
+            resumes += 1
+            note(interrupted=resumes, interrupted_cause=e.cause)
+            if resumes > MAX_RESUMES or not recover_focus(session_name):
+                RESUMES.inc(result="gave_up")
+                print(f"[paint] {draw_fn.__name__}: giving up after {e}")
+                raise
+        # starting over would repeat everything since Paint was opened
+        saved_s = time.perf_counter() - started if started is not None else 0.0
+        RESUMES.inc(result="resumed")
+        RESUME_SAVED_SECONDS.inc(saved_s)
+        note(resumed=resumes, resume_saved_s=round(saved_s, 3))
+        print(f"[paint] {draw_fn.__name__}: {reason}; resuming at {done}/{len(plan)}")
+
+def _timed_drawing(shape_key, objects, quality, estimated_s, warm=None):
+    t0 = time.perf_counter()
+    try:
+        with use_quality(quality):
+            return _perform_drawing(shape_key, objects, warm.prepared if warm else None)
+    finally:
+        observe_job(quality, estimated_s, time.perf_counter() - t0)
+
+def _perform_drawing(shape_key: str, objects=None, prepared=None):
+    # prepared: a canvas prewarm_paint() opened already
+    t0 = time.perf_counter()
+    if prepared is None:
+        with span("open_paint_and_prepare"):
+            prepared = open_paint_and_prepare()
+    ok, cx, cy, session_name, first_filepath = prepared
     if not ok:
         return None
 
-    S = get_scale_fn()
-    shape_key = (label or "").strip().lower()
-
-    if shape_key == "tree":
-        draw_tree_at(cx, cy, S)
-    elif shape_key == "house":
-        draw_house_at(cx, cy, S)
-    elif shape_key == "windmill":
-        draw_windmill_at(cx, cy, S)
-    elif shape_key == "train":
-        draw_train_at(cx, cy, S)
-    elif shape_key == "star":
-        draw_star_at(cx, cy, S)
-    elif shape_key == "flower":
-        draw_flower_at(cx, cy, S)
-    else:
+    try:
+        drawn = draw_on_canvas(shape_key, objects, cx, cy, session_name, t0)
+    except StrokeInterrupted:
+        # Paint is gone or keeps losing focus: don't save half a drawing
+        with span("save_and_close_paint"):
+            save_and_close_paint(first_filepath)
+        return None
+    if not drawn:
         # unknown: still close paint but don't produce final custom filename
-        save_and_close_paint(first_filepath)
+        with span("save_and_close_paint"):
+            save_and_close_paint(first_filepath)
         return None
 
-    time.sleep(0.5)
+    with input_phase("settle"):
+        pause(SETTLE_S)
 
     final_filename = f"{_timestamp()}_{shape_key}.png"
     final_abs_path = os.path.join(get_saved_root(), final_filename)
 
-    save_and_close_paint(final_abs_path)
+    with span("save_and_close_paint"):
+        save_and_close_paint(final_abs_path)
 
     return final_abs_path
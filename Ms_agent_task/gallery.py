@@ -0,0 +1,387 @@
+# gallery.py
+#
+# The drawings in assets/saved_drawings, for the gallery page, without
+# listing the directory. Every drawing the app saves appends one line to
+# <saved>/gallery/manifest.jsonl:
+#
+#   {"name": "20251027_164512_house-tree.png", "label": "house+2 tree",
+#    "timestamp": "2025-10-27T16:45:12", "width": 2000, "height": 800,
+#    "bytes": 48211, "path": "assets/saved_drawings/20251027_164512_house-tree.png",
+#    "svg": "assets/saved_drawings/20251027_164512_house-tree.svg",
+#    "thumb": "assets/saved_drawings/gallery/thumbs/20251027_164512_house-tree.png"}
+#
+# and its thumbnail goes to gallery/thumbs/, made from the PNG or, when
+# Paint's file is not there (dry runs), from the stroke program.
+#
+# GalleryIndex reads the manifest once and then only what was appended
+# since (by any worker process), keeping just the byte offset of every
+# line plus a list of line numbers per shape. A page is newest first:
+# its cursor is the line number of the last entry shown, so the next page
+# is the slice below it (found by bisection in a shape's list) and only
+# the lines on the page are read back from the file.
+#
+#   python gallery.py rebuild                  # manifest from a one-off directory scan
+#   python gallery.py page --label tree        # newest page, as JSON
+import os
+import re
+import sys
+import json
+import time
+import array
+import bisect
+import datetime
+import threading
+import contextlib
+import collections
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: a single server process, the thread lock is enough
+    fcntl = None
+
+from PIL import Image
+
+from drawings import parse_scene_label
+from paint_driver import get_saved_root
+from raster import rasterize
+from stroke_program import decode
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST = "manifest.jsonl"
+SCANNED = "scanned"  # marker: drawings from before the manifest are in it
+THUMB_SIZE = (250, 100)  # the 2000x800 canvas, scaled down
+PAGE_SIZE = 48
+RECENT_NAMES = 256
+
+# <timestamp>_<shape>-<shape>... as drawings._perform_drawing names them
+_SAVED_NAME_RE = re.compile(r"(\d{8}_\d{6})_([a-z0-9_-]+)")
+# svg_export's header
+_VIEWBOX_RE = re.compile(rb'viewBox="0 0 (\d+) (\d+)"')
+
+
+def _web_path(abs_path):
+    # what <img src> and the history use: relative to the app, forward slashes
+    return os.path.relpath(abs_path, BASE_DIR).replace("\\", "/")
+
+
+def _thumb_from_program(prog, size=THUMB_SIZE):
+    sx, sy = size[0] / prog["w"], size[1] / prog["h"]
+    lines = [[(int(x * sx), int(y * sy)) for x, y in line] for line in decode(prog)]
+    return rasterize(lines, size, width=1)
+
+
+class GalleryIndex:
+    def __init__(self, root=None):
+        self.root = root or get_saved_root()
+        self.dir = os.path.join(self.root, "gallery")
+        self.thumbs = os.path.join(self.dir, "thumbs")
+        self.path = os.path.join(self.dir, MANIFEST)
+        self.scanned = os.path.join(self.dir, SCANNED)
+        # line number -> byte offset of the line in the manifest
+        self.offsets = array.array("q")
+        self.labels = collections.defaultdict(lambda: array.array("l"))
+        # names of the newest entries, so a drawing is recorded once
+        self.recent = collections.deque(maxlen=RECENT_NAMES)
+        self.live_stat = None  # (inode, bytes read)
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """
+        self.lock plus, where flock exists, the manifest across worker
+        processes: a merged scan replaces the file, and a record() must
+        not land in the replaced copy.
+        """
+        with self.lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.dir, exist_ok=True)
+            with open(os.path.join(self.dir, "manifest.lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # ---------- writes ----------
+    def make_entry(self, png_path, label, strokes=None, svg_path=None, timestamp=None):
+        """
+        Manifest entry for a saved drawing; writes its thumbnail.
+        """
+        name = os.path.basename(png_path)
+        entry = {
+            "name": name,
+            "label": label,
+            "timestamp": timestamp or datetime.datetime.now().isoformat(timespec="seconds"),
+            "width": None,
+            "height": None,
+            "bytes": None,
+            "path": None,
+            "svg": _web_path(svg_path) if svg_path and os.path.isfile(svg_path) else None,
+            "thumb": None,
+        }
+        thumb = None
+        if os.path.isfile(png_path):
+            with Image.open(png_path) as img:
+                entry["width"], entry["height"] = img.size
+                thumb = img.convert("RGB")
+                thumb.thumbnail(THUMB_SIZE)
+            entry["path"], entry["bytes"] = _web_path(png_path), os.path.getsize(png_path)
+        else:
+            if strokes:
+                entry["width"], entry["height"] = strokes["w"], strokes["h"]
+                thumb = _thumb_from_program(strokes)
+            if entry["svg"]:
+                # no PNG (dry run): the SVG stands in for it
+                entry["path"], entry["bytes"] = entry["svg"], os.path.getsize(svg_path)
+                if entry["width"] is None:
+                    with open(svg_path, "rb") as f:
+                        m = _VIEWBOX_RE.search(f.read(256))
+                    if m:
+                        entry["width"], entry["height"] = int(m.group(1)), int(m.group(2))
+        if thumb is not None:
+            os.makedirs(self.thumbs, exist_ok=True)
+            thumb_path = os.path.join(self.thumbs, os.path.splitext(name)[0] + ".png")
+            thumb.save(thumb_path, format="PNG", optimize=True)
+            entry["thumb"] = _web_path(thumb_path)
+        return entry
+
+    def record(self, png_path, label, strokes=None, svg_path=None):
+        """
+        Add a drawing the app just saved; None if it is in the manifest
+        already (every request merged into one drawing job records it).
+        """
+        name = os.path.basename(png_path)
+        with self._locked():
+            self._catch_up()
+            if name in self.recent:
+                return None
+            entry = self.make_entry(png_path, label, strokes, svg_path)
+            self._append([entry])
+            self._catch_up()
+        return entry
+
+    def _append(self, entries):
+        data = "".join(json.dumps(e, separators=(",", ":")) + "\n" for e in entries)
+        os.makedirs(self.dir, exist_ok=True)
+        # one write in append mode: lines from other workers don't interleave
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(data)
+
+    def scan(self, skip=()):
+        """
+        Entries for the drawings in the directory, oldest first, except
+        the names in `skip`: one directory listing, for building the
+        manifest.
+        """
+        stems = {}
+        for name in os.listdir(self.root):
+            stem, ext = os.path.splitext(name)
+            if stem + ".png" in skip:
+                continue
+            if ext.lower() in (".png", ".svg") and _SAVED_NAME_RE.fullmatch(stem):
+                stems.setdefault(stem, set()).add(ext.lower())
+        entries = []
+        for stem in sorted(stems):
+            stamp, shapes = _SAVED_NAME_RE.fullmatch(stem).groups()
+            ts = datetime.datetime.strptime(stamp, "%Y%m%d_%H%M%S").isoformat(timespec="seconds")
+            svg = os.path.join(self.root, stem + ".svg") if ".svg" in stems[stem] else None
+            try:
+                entries.append(self.make_entry(os.path.join(self.root, stem + ".png"),
+                                               "+".join(shapes.split("-")), svg_path=svg, timestamp=ts))
+            except OSError as e:
+                print(f"[gallery] skipping {stem}: {e}")
+        return entries
+
+    def rebuild(self):
+        """
+        Replace the manifest with a scan of the directory.
+        """
+        entries = self.scan()
+        with self._locked():
+            self._replace([json.dumps(e, separators=(",", ":")) + "\n" for e in entries])
+        return len(entries)
+
+    def _replace(self, lines):
+        # caller holds self._locked()
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        os.replace(tmp, self.path)
+        open(self.scanned, "a").close()
+
+    def _manifest_lines(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = [line for line in f if line.endswith("\n")]
+        except FileNotFoundError:
+            return [], set()
+        names = set()
+        for line in lines:
+            try:
+                names.add(json.loads(line).get("name"))
+            except ValueError:
+                pass
+        return lines, names
+
+    def ensure_manifest(self):
+        """
+        Add the drawings saved before the gallery existed, once (until
+        the "scanned" marker is there), even if record() has already
+        started the manifest. The scan goes in before the recorded lines,
+        so pages stay newest first; names already listed are skipped.
+        Only one process scans.
+        """
+        if os.path.exists(self.scanned):
+            return 0
+        os.makedirs(self.dir, exist_ok=True)
+        claim = self.path + ".building"
+        try:
+            fd = os.open(claim, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return 0
+        try:
+            # the slow part (thumbnails) runs unlocked; the merge does not
+            entries = self.scan(skip=self._manifest_lines()[1])
+            with self._locked():
+                if os.path.exists(self.scanned):
+                    return 0
+                lines, names = self._manifest_lines()
+                older = [json.dumps(e, separators=(",", ":")) + "\n"
+                         for e in entries if e["name"] not in names]
+                self._replace(older + lines)
+            return len(older)
+        finally:
+            os.close(fd)
+            os.remove(claim)
+
+    # ---------- reads ----------
+    def _catch_up(self):
+        # caller holds self.lock
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        inode, offset = self.live_stat or (None, 0)
+        if st.st_ino != inode or st.st_size < offset:
+            # rebuilt: start over
+            self.offsets = array.array("q")
+            self.labels.clear()
+            self.recent.clear()
+            offset = 0
+        if st.st_size == offset:
+            self.live_stat = (st.st_ino, offset)
+            return
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        # only complete lines; a half-written one is read next time
+        end = data.rfind(b"\n") + 1
+        pos = 0
+        while pos < end:
+            nl = data.index(b"\n", pos)
+            try:
+                entry = json.loads(data[pos:nl])
+            except ValueError:
+                entry = None
+            if entry is not None:
+                n = len(self.offsets)
+                self.offsets.append(offset + pos)
+                for label, _ in parse_scene_label(entry.get("label")):
+                    self.labels[label].append(n)
+                self.recent.append(entry.get("name"))
+            pos = nl + 1
+        self.live_stat = (st.st_ino, offset + end)
+
+    def _read(self, lines):
+        out = []
+        with open(self.path, "rb") as f:
+            for n in lines:
+                f.seek(self.offsets[n])
+                out.append(dict(json.loads(f.readline()), seq=n))
+        return out
+
+    def page(self, cursor=None, label=None, limit=PAGE_SIZE):
+        """
+        Up to `limit` drawings below line `cursor` (None: the newest),
+        newest first, only those with shape `label` if given:
+        {"entries", "total", "next", "took_ms"}; "next" is the cursor of
+        the following page, None on the last one.
+        """
+        t0 = time.perf_counter()
+        limit = max(1, int(limit))
+        with self.lock:
+            self._catch_up()
+            n = len(self.offsets)
+            hi = n if cursor is None else max(0, min(int(cursor), n))
+            if label:
+                posting = self.labels.get(label.strip().lower(), ())
+                end = bisect.bisect_left(posting, hi)
+                start = max(0, end - limit)
+                lines, total = list(posting[start:end]), len(posting)
+            else:
+                start = max(0, hi - limit)
+                lines, total = list(range(start, hi)), n
+            entries = self._read(reversed(lines)) if lines else []
+        return {
+            "entries": entries,
+            "total": total,
+            "next": lines[0] if lines and start > 0 else None,
+            "took_ms": round((time.perf_counter() - t0) * 1000.0, 3),
+        }
+
+    def files(self):
+        """
+        Absolute paths of every drawing, SVG and thumbnail the manifest
+        refers to (read straight through, for cleanup jobs).
+        """
+        try:
+            f = open(self.path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                for key in ("path", "svg", "thumb"):
+                    if entry.get(key):
+                        yield os.path.abspath(os.path.join(BASE_DIR, entry[key]))
+                if entry.get("name"):
+                    yield os.path.join(os.path.abspath(self.root), entry["name"])
+
+    def label_counts(self):
+        """
+        {shape: drawings with it}, most drawn first.
+        """
+        with self.lock:
+            self._catch_up()
+            counts = {label: len(lines) for label, lines in self.labels.items()}
+        return dict(sorted(counts.items(), key=lambda kv: (-kv[1], kv[0])))
+
+
+def main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Manifest of saved drawings for the gallery page.")
+    ap.add_argument("--root", default=get_saved_root())
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("rebuild", help="rewrite the manifest from a scan of the directory")
+    p = sub.add_parser("page", help="one page of the gallery, as JSON")
+    p.add_argument("--label")
+    p.add_argument("--cursor", type=int)
+    p.add_argument("--limit", type=int, default=PAGE_SIZE)
+    args = ap.parse_args(argv)
+    index = GalleryIndex(args.root)
+    if args.cmd == "rebuild":
+        print(f"{index.rebuild()} drawings in {index.path}")
+        return 0
+    print(json.dumps(index.page(args.cursor, args.label, args.limit), indent=1))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+# gunicorn.conf.py
+#
+#   gunicorn -c gunicorn.conf.py app:server
+#
+# PAINT_PRELOAD=1 (default) imports app.py - and therefore loads the
+# intent model - once in the master before forking, so workers start
+# without a cold model load and share the weight pages copy-on-write.
+# Combine with PAINT_SHARED_WEIGHTS=1 to serve from the memory-mapped
+# export in model/shared.
+#
+# Background threads (model watcher, history compactor, gallery scan)
+# don't survive fork; post_fork starts them in each worker.
+#
+# Each worker logs its startup time and RSS/PSS/USS once it is ready;
+# `python shared_weights.py report <master pid>` prints the same table
+# for a running server.
+import os
+import gc
+import json
+import time
+
+bind = os.environ.get("PAINT_BIND", "127.0.0.1:8050")
+workers = int(os.environ.get("PAINT_WORKERS", "2"))
+threads = int(os.environ.get("PAINT_THREADS", "1"))
+timeout = int(os.environ.get("PAINT_WORKER_TIMEOUT", "180"))
+
+preload_app = os.environ.get("PAINT_PRELOAD", "1") != "0"
+
+# HF tokenizers disables its own thread pool after fork with a warning;
+# decide up front instead.
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+_fork_times = {}
+
+
+def when_ready(server):
+    from shared_weights import process_memory
+
+    server.log.info("master ready: %s", json.dumps(process_memory()))
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        # move everything allocated so far out of the GC's reach so the
+        # collector doesn't write to (and un-share) those pages in workers
+        gc.freeze()
+    _fork_times[worker.age] = time.time()
+
+
+def post_fork(server, worker):
+    worker._paint_fork_time = _fork_times.pop(worker.age, time.time())
+
+    torch_threads = os.environ.get("PAINT_TORCH_THREADS")
+    if torch_threads:
+        import torch
+        torch.set_num_threads(int(torch_threads))
+
+    # threads don't survive fork: start the app's in this worker (the
+    # draw scheduler starts its own on the first request)
+    import app
+    app.start_background()
+
+
+def post_worker_init(worker):
+    from shared_weights import process_memory
+    import predict
+
+    stats = process_memory()
+    stats["startup_s"] = round(time.time() - getattr(worker, "_paint_fork_time", time.time()), 3)
+    stats["model_load_s"] = predict.get_model_load_seconds()
+    stats["preload"] = preload_app
+    stats["shared_weights"] = predict.MODEL_SOURCE != predict.MODEL_PATH
+    worker.log.info("worker ready: %s", json.dumps(stats))
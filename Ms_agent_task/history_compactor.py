@@ -0,0 +1,309 @@
+# history_compactor.py
+#
+# Retention for the per-session chat history (history_store.py): a
+# background thread moves turns past the retention policy out of each
+# live file into gzip'd archive segments, so the files read on every
+# request stay small. Archived turns can still be read on demand
+# (HistoryStore.load_segment, "Show earlier messages" in the app).
+#
+# Every few passes it also lists drawings in assets/saved_drawings that
+# nothing refers to - no live or archived turn, no entry of the gallery
+# manifest and no turn of an old single-file chat_history.json (not read
+# by the app, but not necessarily imported either) - in
+# <history>/orphaned_drawings.json, for cleanup. Nothing is deleted
+# unless asked to.
+#
+#   python history_compactor.py compact --keep 200 --max-age-days 30
+#   python history_compactor.py orphans [--delete]
+#   python history_compactor.py archive <session id> [--segment N]
+import os
+import sys
+import json
+import time
+import datetime
+import argparse
+import threading
+
+from history_store import HistoryStore, DEFAULT_ROOT
+from paint_driver import get_saved_root
+from gallery import GalleryIndex
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ORPHANS_FILE = "orphaned_drawings.json"
+LEGACY_HISTORY = os.path.join(BASE_DIR, "chat_history.json")
+
+
+class RetentionPolicy:
+    """
+    Keep at most max_entries turns per session live (archiving only once
+    slack more have piled up, so segments are not tiny), and nothing
+    older than max_age_days (None = no age limit).
+    """
+
+    def __init__(self, max_entries=200, max_age_days=None, slack=None):
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.slack = max(1, max_entries // 4) if slack is None else slack
+
+    @classmethod
+    def from_env(cls):
+        """
+        PAINT_HISTORY_KEEP (default 200), PAINT_HISTORY_MAX_AGE_DAYS
+        (default: no limit).
+        """
+        age = os.environ.get("PAINT_HISTORY_MAX_AGE_DAYS", "")
+        return cls(
+            max_entries=int(os.environ.get("PAINT_HISTORY_KEEP", "200")),
+            max_age_days=float(age) if age else None,
+        )
+
+    def cutoff(self, now=None):
+        """
+        ISO timestamp before which turns are too old (None: no limit).
+        """
+        if self.max_age_days is None:
+            return None
+        now = now or datetime.datetime.now()
+        return (now - datetime.timedelta(days=self.max_age_days)).isoformat(timespec="seconds")
+
+    def split(self, entries, now=None):
+        """
+        How many of the oldest `entries` to archive.
+        """
+        n = 0
+        cutoff = self.cutoff(now)
+        if cutoff is not None:
+            # timestamps are ISO strings, so they sort as text
+            while n < len(entries) and (entries[n].get("timestamp") or "") < cutoff:
+                n += 1
+        if len(entries) > self.max_entries + self.slack:
+            n = max(n, len(entries) - self.max_entries)
+        return n
+
+
+class Compactor:
+    """
+    Applies a RetentionPolicy to every session of a store, once
+    (run_once) or every `interval` seconds in a daemon thread (start).
+    """
+
+    def __init__(self, store, policy, interval=300.0, orphan_every=12, saved_root=None):
+        self.store = store
+        self.policy = policy
+        self.interval = interval
+        self.orphan_every = orphan_every
+        self.saved_root = saved_root or get_saved_root()
+        # sid -> (mtime_ns, size, oldest timestamp) after its last check
+        self._seen = {}
+        self._passes = 0
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _unchanged(self, sid, st, cutoff):
+        seen = self._seen.get(sid)
+        if seen is None or seen[:2] != (st.st_mtime_ns, st.st_size):
+            return False
+        # an untouched file can still age past the cutoff
+        return cutoff is None or not seen[2] or seen[2] >= cutoff
+
+    def compact_session(self, sid, now=None):
+        oldest = []
+
+        def split(live):
+            n = self.policy.split(live, now)
+            oldest.append(live[n].get("timestamp") if n < len(live) else None)
+            return n
+
+        moved = self.store.archive_oldest(sid, split)
+        st = os.stat(self.store.path(sid))
+        self._seen[sid] = (st.st_mtime_ns, st.st_size, oldest[0] if oldest else None)
+        return moved
+
+    def run_once(self, now=None):
+        """
+        One pass over every session; returns what it did.
+        """
+        cutoff = self.policy.cutoff(now)
+        report = {"sessions": 0, "checked": 0, "compacted": 0, "archived": 0}
+        for sid in list(self.store.sessions()):
+            report["sessions"] += 1
+            try:
+                st = os.stat(self.store.path(sid))
+            except FileNotFoundError:
+                continue
+            if self._unchanged(sid, st, cutoff):
+                continue
+            report["checked"] += 1
+            moved = self.compact_session(sid, now)
+            if moved:
+                report["compacted"] += 1
+                report["archived"] += moved
+        self._passes += 1
+        if self.orphan_every and self._passes % self.orphan_every == 1:
+            report["orphans"] = flag_orphans(self.store, self.saved_root)["count"]
+        return report
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                report = self.run_once()
+            except Exception as e:
+                print(f"[history] compaction failed: {e}")
+                continue
+            if report["archived"]:
+                print(f"[history] archived {report['archived']} turns from {report['compacted']} sessions")
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="history-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+# --------------------------
+# Orphaned drawings
+# --------------------------
+def _load_legacy(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+    except FileNotFoundError:
+        return []
+    if not text.strip():
+        # the app used to create it empty; no turns, nothing referenced
+        return []
+    try:
+        entries = json.loads(text)
+        if not isinstance(entries, list):
+            raise ValueError("not a list of turns")
+    except ValueError as e:
+        # its drawings can't be told apart from orphans: don't guess
+        raise ValueError(f"{path} is not readable JSON ({e}); import or remove it first")
+    return entries
+
+
+def _referenced_paths(store, saved_root, legacy_path=None):
+    paths = set()
+
+    def add(path):
+        paths.add(os.path.normcase(os.path.abspath(os.path.join(BASE_DIR, path))))
+
+    entries = _load_legacy(legacy_path or LEGACY_HISTORY)
+    for sid in store.sessions():
+        entries += store.load_archive(sid) + store.load(sid)
+    for entry in entries:
+        for key in ("image_path", "svg_path"):
+            if entry.get(key):
+                add(entry[key])
+    for path in GalleryIndex(saved_root).files():
+        add(path)
+    return paths
+
+
+def find_orphans(store, saved_root, grace_s=3600.0, now=None, legacy_path=None):
+    """
+    Drawings in saved_root that nothing refers to (see the top of this
+    file), older than grace_s (a drawing is saved a moment before its
+    turn is appended). Paint's draw-<stamp>.png session files always end
+    up here. Raises ValueError if the old chat_history.json can't be read.
+    """
+    now = time.time() if now is None else now
+    referenced = _referenced_paths(store, saved_root, legacy_path)
+    orphans = []
+    if not os.path.isdir(saved_root):
+        return orphans
+    for name in sorted(os.listdir(saved_root)):
+        if not name.lower().endswith((".png", ".svg")):
+            continue
+        path = os.path.join(saved_root, name)
+        st = os.stat(path)
+        if now - st.st_mtime < grace_s:
+            continue
+        if os.path.normcase(os.path.abspath(path)) not in referenced:
+            orphans.append({"path": path, "bytes": st.st_size, "mtime": int(st.st_mtime)})
+    return orphans
+
+
+def flag_orphans(store, saved_root, grace_s=3600.0):
+    """
+    Write the orphan list to <store root>/orphaned_drawings.json.
+    """
+    orphans = find_orphans(store, saved_root, grace_s)
+    report = {
+        "generated": datetime.datetime.now().isoformat(timespec="seconds"),
+        "saved_root": saved_root,
+        "count": len(orphans),
+        "bytes": sum(o["bytes"] for o in orphans),
+        "files": orphans,
+    }
+    os.makedirs(store.root, exist_ok=True)
+    out = os.path.join(store.root, ORPHANS_FILE)
+    with open(out + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    os.replace(out + ".tmp", out)
+    return report
+
+
+# --------------------------
+# CLI
+# --------------------------
+def cmd_compact(store, args):
+    policy = RetentionPolicy(args.keep, args.max_age_days, slack=0)
+    report = Compactor(store, policy, orphan_every=0).run_once()
+    print(f"{report['sessions']} sessions, {report['archived']} turns archived "
+          f"from {report['compacted']}")
+    return 0
+
+
+def cmd_orphans(store, args):
+    try:
+        report = flag_orphans(store, args.saved_root, args.grace)
+    except ValueError as e:
+        print(f"error: {e}")
+        return 1
+    print(f"{report['count']} orphaned drawings, {report['bytes']} B "
+          f"(listed in {os.path.join(store.root, ORPHANS_FILE)})")
+    if args.delete:
+        for o in report["files"]:
+            os.remove(o["path"])
+        print(f"deleted {report['count']} files")
+    return 0
+
+
+def cmd_archive(store, args):
+    if args.segment is None:
+        for info in store.archive_index(args.session):
+            print(f"seg {info['seg']:>4}  {info['count']:>5} turns  {info['first_ts']} .. "
+                  f"{info['last_ts']}  {info['bytes']} B")
+        return 0
+    for entry in store.load_segment(args.session, args.segment):
+        print(json.dumps({k: entry.get(k) for k in ("timestamp", "user_text", "predicted_label")}))
+    return 0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="History retention, archives and orphaned drawings.")
+    ap.add_argument("--root", default=DEFAULT_ROOT)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("compact", help="archive turns past the retention policy, now")
+    env = RetentionPolicy.from_env()
+    p.add_argument("--keep", type=int, default=env.max_entries, help="live turns per session")
+    p.add_argument("--max-age-days", type=float, default=env.max_age_days)
+    p = sub.add_parser("orphans", help="list drawings no turn refers to")
+    p.add_argument("--saved-root", default=get_saved_root())
+    p.add_argument("--grace", type=float, default=3600.0, help="ignore files younger than this (s)")
+    p.add_argument("--delete", action="store_true", help="also delete them")
+    p = sub.add_parser("archive", help="a session's archive segments, or one segment's turns")
+    p.add_argument("session")
+    p.add_argument("--segment", type=int)
+    args = ap.parse_args(argv)
+    store = HistoryStore(args.root)
+    return {"compact": cmd_compact, "orphans": cmd_orphans, "archive": cmd_archive}[args.cmd](store, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+# history_index.py
+#
+# Search over one session's chat history, live and archived, without
+# scanning it: an inverted index from user_text tokens to turns, plus
+# secondary indexes on the drawn shapes (predicted_label), the outcome
+# (drawn / failed / busy / unknown) and the timestamp. Turns are kept in
+# time order, so a time range is a slice found by bisection and every
+# posting list is sorted; a query intersects the shortest lists first
+# and touches only the turns it returns.
+#
+# An index is built the first time a session is searched and then kept
+# up to date: the app adds each new turn as it appends it, and before a
+# query the index reads whatever other worker processes appended since
+# (from the byte offset it stopped at) and any new archive segments.
+#
+#   python history_index.py <session id> "train outcome:failed since:7d"
+import os
+import re
+import sys
+import time
+import bisect
+import datetime
+import threading
+import collections
+
+from drawings import parse_scene_label
+from history_store import HistoryStore, DEFAULT_ROOT
+
+OUTCOMES = ("drawn", "failed", "busy", "unknown")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_FILTER_RE = re.compile(r"\b(label|outcome|since|until):(\S+)")
+_AGO_RE = re.compile(r"(\d+)([hdw])")
+
+
+def _fold(word):
+    # plurals to the singular, so "trees" finds "tree" and the other way
+    # round; short words ("is", "was", "bus") and "-ss" are left alone
+    if len(word) <= 3 or not word.endswith("s") or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"  # skies, puppies
+    if word.endswith(("xes", "zes", "ches", "shes")):
+        return word[:-2]  # boxes, bushes
+    return word[:-1]  # trees, houses, cars
+
+
+def tokens(text):
+    """
+    Words of `text` as indexed and as queried: lower case, plurals folded.
+    """
+    return [_fold(w) for w in _TOKEN_RE.findall((text or "").lower())]
+
+
+def entry_outcome(entry):
+    """
+    The turn's outcome; older turns did not store one, so it is inferred
+    from what the agent answered.
+    """
+    if entry.get("outcome"):
+        return entry["outcome"]
+    if entry.get("image_path") or entry.get("strokes"):
+        return "drawn"
+    status = entry.get("status_text") or ""
+    if status.startswith("I'm busy"):
+        return "busy"
+    if status.startswith("I tried to draw"):
+        return "failed"
+    return "unknown"
+
+
+def parse_time(value, now=None):
+    """
+    "2026-10-12", "2026-10-12T08:00" or "7d" / "12h" / "2w" ago, as an
+    ISO string comparable with the stored timestamps.
+    """
+    m = _AGO_RE.fullmatch(value)
+    if m:
+        n, unit = int(m.group(1)), m.group(2)
+        delta = {"h": datetime.timedelta(hours=n), "d": datetime.timedelta(days=n),
+                 "w": datetime.timedelta(weeks=n)}[unit]
+        now = now or datetime.datetime.now()
+        return (now - delta).isoformat(timespec="seconds")
+    return datetime.datetime.fromisoformat(value).isoformat(timespec="seconds")
+
+
+def parse_query(q, now=None):
+    """
+    "failed train last week" style queries, written as words plus
+    filters:
+
+        "tall tree label:house outcome:failed since:7d until:2026-10-18"
+
+    -> {"text": "tall tree", "label": "house", "outcome": "failed",
+        "since": "...", "until": "..."}. Raises ValueError for a bad
+    outcome or date. since is inclusive, until exclusive.
+    """
+    out = {}
+    for key, value in _FILTER_RE.findall(q or ""):
+        if key in ("since", "until"):
+            try:
+                ts = parse_time(value, now)
+            except ValueError:
+                raise ValueError(f"bad date {value!r} (use 2026-10-12 or 7d / 12h / 2w)")
+            if key == "until" and len(value) == 10:
+                # a whole day: until:2026-10-18 includes the 18th
+                ts = (datetime.datetime.fromisoformat(ts) + datetime.timedelta(days=1)).isoformat()
+            value = ts
+        out[key] = value
+    if out.get("outcome") and out["outcome"] not in OUTCOMES:
+        raise ValueError(f"unknown outcome {out['outcome']!r} (expected one of {', '.join(OUTCOMES)})")
+    out["text"] = _FILTER_RE.sub(" ", q or "").strip()
+    return out
+
+
+def _intersect(spans):
+    # spans are (sorted posting list, start, end); walk the shortest and
+    # bisect the others, without copying any of them
+    spans = sorted(spans, key=lambda s: s[2] - s[1])
+    (first, start, end), others = spans[0], spans[1:]
+    out = []
+    for doc in first[start:end]:
+        for other, o_start, o_end in others:
+            i = bisect.bisect_left(other, doc, o_start, o_end)
+            if i == o_end or other[i] != doc:
+                break
+        else:
+            out.append(doc)
+    return out
+
+
+class SessionIndex:
+    """
+    The indexes for one session. Turns are numbered in the order they
+    were added, which is time order.
+    """
+
+    # what a search result carries; the full entry stays in the store
+    FIELDS = ("id", "timestamp", "user_text", "predicted_label", "status_text")
+
+    def __init__(self):
+        self.docs = []
+        self.timestamps = []
+        self.ids = set()
+        self.words = collections.defaultdict(list)
+        self.labels = collections.defaultdict(list)
+        self.outcomes = collections.defaultdict(list)
+        # (shape, outcome): "failed trains" is one list, not an intersection
+        self.label_outcomes = collections.defaultdict(list)
+        # how far into the store this index has read
+        self.live_stat = None  # (inode, bytes read)
+        self.segments = 0
+        self.lock = threading.Lock()
+
+    def add(self, entry):
+        """
+        Index one turn (once; later calls with the same id are ignored).
+        """
+        entry_id = entry.get("id")
+        if entry_id in self.ids:
+            return False
+        ts = entry.get("timestamp") or ""
+        if self.timestamps and ts < self.timestamps[-1]:
+            # clocks do go backwards; keep the time order the slices rely on
+            ts = self.timestamps[-1]
+        doc = len(self.docs)
+        outcome = entry_outcome(entry)
+        self.docs.append({
+            **{k: entry.get(k) for k in self.FIELDS},
+            "outcome": outcome,
+            "has_drawing": bool(entry.get("strokes") or entry.get("image_path")),
+        })
+        self.timestamps.append(ts)
+        self.ids.add(entry_id)
+        for word in set(tokens(entry.get("user_text"))):
+            self.words[word].append(doc)
+        for label, _ in parse_scene_label(entry.get("predicted_label")):
+            self.labels[label].append(doc)
+            self.label_outcomes[label, outcome].append(doc)
+        self.outcomes[outcome].append(doc)
+        return True
+
+    def search(self, text="", label=None, outcome=None, since=None, until=None, limit=50):
+        """
+        Turns matching every word of `text` and every given filter,
+        newest first: (total matches, up to `limit` of them). A word-only
+        or filter-only query costs the same at any history size; with
+        several, the shortest list bounds the work.
+        """
+        lo = bisect.bisect_left(self.timestamps, since) if since else 0
+        hi = bisect.bisect_left(self.timestamps, until) if until else len(self.docs)
+        lists = []
+        for word in set(tokens(text)):
+            if word not in self.words:
+                return 0, []
+            lists.append(self.words[word])
+        if label and outcome:
+            lists.append(self.label_outcomes.get((label.lower(), outcome), []))
+        elif label:
+            lists.append(self.labels.get(label.lower(), []))
+        elif outcome:
+            lists.append(self.outcomes.get(outcome, []))
+
+        # the part of every list inside the time slice
+        spans = [(l, bisect.bisect_left(l, lo), bisect.bisect_left(l, hi)) for l in lists]
+        if not spans:
+            total, newest = hi - lo, range(max(lo, hi - limit), hi)
+        elif len(spans) == 1:
+            l, start, end = spans[0]
+            total, newest = end - start, l[max(start, end - limit):end]
+        else:
+            matches = _intersect(spans)
+            total, newest = len(matches), matches[-limit:]
+        return total, [self.docs[d] for d in reversed(newest)]
+
+
+class HistoryIndex:
+    """
+    SessionIndex per session of a HistoryStore, built on first use; the
+    `max_sessions` most recently searched are kept in memory.
+    """
+
+    def __init__(self, store, max_sessions=256):
+        self.store = store
+        self.max_sessions = max_sessions
+        self._sessions = collections.OrderedDict()
+        self._guard = threading.Lock()
+
+    def _get(self, sid, create):
+        with self._guard:
+            idx = self._sessions.get(sid)
+            if idx is not None:
+                self._sessions.move_to_end(sid)
+            elif create:
+                idx = self._sessions[sid] = SessionIndex()
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            return idx
+
+    def add(self, sid, entry):
+        """
+        Index a turn just appended to the store. Sessions nobody has
+        searched yet are skipped; they are built from the store later.
+        """
+        idx = self._get(sid, create=False)
+        if idx is not None:
+            with idx.lock:
+                idx.add(entry)
+
+    def _catch_up(self, sid, idx):
+        # archive segments first: turns compacted away before this
+        # index saw them in the live file are only there
+        segments = self.store.archive_index(sid)
+        for info in segments[idx.segments:]:
+            for entry in self.store.load_segment(sid, info["seg"]):
+                idx.add(entry)
+        idx.segments = len(segments)
+
+        path = self.store.path(sid)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return
+        inode, offset = idx.live_stat or (None, 0)
+        if st.st_ino != inode or st.st_size < offset:
+            # rewritten by compaction: read it again, known ids are skipped
+            offset = 0
+        if st.st_size == offset:
+            idx.live_stat = (st.st_ino, offset)
+            return
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        # only complete lines; a half-written one is read next time
+        end = data.rfind(b"\n") + 1
+        for entry in self.store.parse_lines(data[:end].decode("utf-8").splitlines()):
+            idx.add(entry)
+        idx.live_stat = (st.st_ino, offset + end)
+
+    def search(self, sid, q="", limit=50, **filters):
+        """
+        Search one session: `q` in parse_query's syntax; keyword filters
+        (label, outcome, since, until) take the same values and win over
+        filters in `q`. Returns {"total", "results", "took_ms"}.
+        """
+        t0 = time.perf_counter()
+        limit = max(1, int(limit))
+        extra = " ".join(f"{k}:{v}" for k, v in filters.items() if v)
+        query = parse_query(f"{q or ''} {extra}")
+        idx = self._get(sid, create=True)
+        with idx.lock:
+            self._catch_up(sid, idx)
+            total, hits = idx.search(limit=limit, **query)
+        return {
+            "total": total,
+            "results": hits,
+            "took_ms": round((time.perf_counter() - t0) * 1000.0, 3),
+        }
+
+
+def main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Search one session's chat history.")
+    ap.add_argument("--root", default=DEFAULT_ROOT)
+    ap.add_argument("--limit", type=int, default=20)
+    ap.add_argument("session")
+    ap.add_argument("query", nargs="?", default="")
+    args = ap.parse_args(argv)
+    index = HistoryIndex(HistoryStore(args.root))
+    res = index.search(args.session, args.query, limit=args.limit)
+    for hit in res["results"]:
+        print(f"{hit['timestamp']}  {hit['outcome']:<8} {hit['predicted_label'] or '':<16} {hit['user_text']}")
+    print(f"{res['total']} matches in {res['took_ms']} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+# history_store.py
+#
+# Chat history, one append-only JSON-lines file per browser session,
+# spread over shard directories by the first two hex digits of the
+# session id:
+#
+#   history/3f/3fa91c0e....jsonl
+#
+# A request reads and appends only its own session's file, under that
+# session's lock, so concurrent users never wait on each other and the
+# cost of a request depends on one user's history, not the total.
+# Appends are a single write() in O_APPEND mode, which also keeps
+# separate worker processes from interleaving lines.
+#
+# Older turns are moved out of the live file into gzip'd, immutable
+# archive segments (see history_compactor.py), next to it:
+#
+#   history/3f/3fa91c0e....archive/index.json
+#   history/3f/3fa91c0e....archive/seg-000001.jsonl.gz
+#
+#   python history_store.py stats
+#   python history_store.py import chat_history.json   # old single-file history
+import os
+import re
+import sys
+import gzip
+import json
+import uuid
+import weakref
+import argparse
+import threading
+import contextlib
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: a single server process, the thread locks are enough
+    fcntl = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ROOT = os.environ.get("PAINT_HISTORY_DIR", os.path.join(BASE_DIR, "history"))
+
+SESSION_COOKIE = "paint_sid"
+SESSION_MAX_AGE = 365 * 24 * 3600  # seconds
+
+_SID_RE = re.compile(r"[0-9a-f]{32}")
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+def valid_session_id(sid) -> bool:
+    # also keeps cookie values from naming paths outside the store
+    return isinstance(sid, str) and _SID_RE.fullmatch(sid) is not None
+
+
+class HistoryStore:
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        # only sessions someone is using: a lock goes once nobody holds it
+        self._locks = weakref.WeakValueDictionary()
+        self._locks_guard = threading.Lock()
+
+    def path(self, sid):
+        if not valid_session_id(sid):
+            raise ValueError(f"invalid session id {sid!r}")
+        return os.path.join(self.root, sid[:2], f"{sid}.jsonl")
+
+    def archive_dir(self, sid):
+        return os.path.splitext(self.path(sid))[0] + ".archive"
+
+    def lock(self, sid):
+        with self._locks_guard:
+            lock = self._locks.get(sid)
+            if lock is None:
+                lock = self._locks[sid] = threading.Lock()
+            return lock
+
+    @contextlib.contextmanager
+    def _locked(self, sid):
+        """
+        Exclusive access to one session's files, across threads and, where
+        flock exists, across worker processes: compaction replaces the
+        live file, and an append must not land in the replaced copy.
+        """
+        path = self.path(sid)
+        with self.lock(sid):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if fcntl is None:
+                yield path
+                return
+            with open(os.path.splitext(path)[0] + ".lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield path
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # ---------- reads ----------
+    @staticmethod
+    def parse_lines(lines):
+        entries = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # a torn last line from a crash mid-append
+                continue
+        return entries
+
+    @classmethod
+    def _read_lines(cls, path, opener=open):
+        try:
+            with opener(path, "rt", encoding="utf-8") as f:
+                return cls.parse_lines(f)
+        except FileNotFoundError:
+            return []
+
+    def load(self, sid):
+        """
+        Every entry of one session, oldest first ([] for a new session).
+        """
+        return self._read_lines(self.path(sid))
+
+    def find(self, sid, entry_id):
+        return next((e for e in self.load(sid) if e.get("id") == entry_id), None)
+
+    def sessions(self):
+        """
+        Session ids with a history file, in no particular order.
+        """
+        if not os.path.isdir(self.root):
+            return
+        for shard in os.listdir(self.root):
+            shard_dir = os.path.join(self.root, shard)
+            if len(shard) != 2 or not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                sid, ext = os.path.splitext(name)
+                if ext == ".jsonl" and valid_session_id(sid):
+                    yield sid
+
+    # ---------- archive reads ----------
+    def _read_index(self, sid):
+        try:
+            with open(os.path.join(self.archive_dir(sid), "index.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"segments": [], "archived_through": None}
+
+    def archive_index(self, sid):
+        """
+        The session's archive segments, oldest first:
+        [{"seg", "file", "count", "first_ts", "last_ts", "bytes"}, ...]
+        """
+        return self._read_index(sid)["segments"]
+
+    def load_segment(self, sid, seg):
+        """
+        Entries of archive segment number `seg` (1 = oldest).
+        """
+        for info in self.archive_index(sid):
+            if info["seg"] == seg:
+                return self._read_lines(os.path.join(self.archive_dir(sid), info["file"]), gzip.open)
+        raise KeyError(f"session {sid} has no archive segment {seg}")
+
+    def load_archive(self, sid):
+        """
+        Every archived entry of a session, oldest first.
+        """
+        entries = []
+        for info in self.archive_index(sid):
+            entries.extend(self.load_segment(sid, info["seg"]))
+        return entries
+
+    # ---------- writes ----------
+    def append(self, sid, entry):
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._locked(sid) as path:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+        return entry
+
+    @staticmethod
+    def _write_atomic(path, data: bytes):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _jsonl(entries):
+        return "".join(json.dumps(e, separators=(",", ":")) + "\n" for e in entries).encode("utf-8")
+
+    def rewrite(self, sid, entries):
+        """
+        Replace a session's history atomically (maintenance tools only).
+        """
+        with self._locked(sid) as path:
+            self._write_atomic(path, self._jsonl(entries))
+
+    def archive_oldest(self, sid, split):
+        """
+        Move the oldest entries of a session's live file into a new
+        archive segment. split(live_entries) says how many; returns the
+        number moved.
+
+        The segment and the index are written before the live file is
+        cut, and the index remembers the last archived id, so a crash in
+        between never loses entries and the next run finishes the cut.
+        """
+        with self._locked(sid) as path:
+            live = self.load(sid)
+            index = self._read_index(sid)
+            done = index.get("archived_through")
+            ids = [e.get("id") for e in live]
+            stale = 0
+            if done is not None and done in ids:
+                stale = ids.index(done) + 1
+                live = live[stale:]
+
+            n = split(live)
+            if n == 0 and stale == 0:
+                return 0
+            if n:
+                moved = live[:n]
+                seg = len(index["segments"]) + 1
+                name = f"seg-{seg:06d}.jsonl.gz"
+                archive_dir = self.archive_dir(sid)
+                os.makedirs(archive_dir, exist_ok=True)
+                data = gzip.compress(self._jsonl(moved), mtime=0)
+                self._write_atomic(os.path.join(archive_dir, name), data)
+                index["segments"].append({
+                    "seg": seg,
+                    "file": name,
+                    "count": len(moved),
+                    "first_ts": moved[0].get("timestamp"),
+                    "last_ts": moved[-1].get("timestamp"),
+                    "bytes": len(data),
+                })
+                index["archived_through"] = moved[-1].get("id")
+                self._write_atomic(os.path.join(archive_dir, "index.json"),
+                                   json.dumps(index, indent=1).encode("utf-8"))
+            self._write_atomic(path, self._jsonl(live[n:]))
+            return n
+
+
+# --------------------------
+# CLI
+# --------------------------
+def cmd_stats(store, args):
+    sessions = entries = size = 0
+    largest = 0
+    archived = archived_size = segments = 0
+    for sid in store.sessions():
+        path = store.path(sid)
+        n = len(store.load(sid))
+        sessions += 1
+        entries += n
+        largest = max(largest, n)
+        size += os.path.getsize(path)
+        for info in store.archive_index(sid):
+            segments += 1
+            archived += info["count"]
+            archived_size += info["bytes"]
+    print(f"{store.root}: {sessions} sessions")
+    print(f"  live:     {entries} entries, {size} B, largest session {largest}")
+    print(f"  archived: {archived} entries in {segments} segments, {archived_size} B")
+    return 0
+
+
+def cmd_import(store, args):
+    """
+    Copy a single-file chat_history.json into one session.
+    """
+    sid = new_session_id() if args.session is None else args.session
+    if not valid_session_id(sid):
+        print(f"error: invalid session id {sid!r} (32 lowercase hex digits, as in the cookie)")
+        return 1
+    with open(args.file, "r", encoding="utf-8") as f:
+        text = f.read()
+    try:
+        # the app used to create the file empty
+        entries = json.loads(text) if text.strip() else []
+        if not isinstance(entries, list):
+            raise ValueError("not a list of turns")
+    except ValueError as e:
+        print(f"error: {args.file} is not readable JSON ({e})")
+        return 1
+    for entry in entries:
+        store.append(sid, entry)
+    print(f"{len(entries)} entries -> session {sid}")
+    print(f"set the '{SESSION_COOKIE}' cookie to this id to see them in the app")
+    return 0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Per-session chat history store.")
+    ap.add_argument("--root", default=DEFAULT_ROOT)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats", help="sessions, entries and bytes on disk")
+    p = sub.add_parser("import", help="load an old chat_history.json into one session")
+    p.add_argument("file")
+    p.add_argument("--session", help="target session id (default: a new one)")
+    args = ap.parse_args(argv)
+    store = HistoryStore(args.root)
+    return {"stats": cmd_stats, "import": cmd_import}[args.cmd](store, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
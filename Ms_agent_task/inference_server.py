@@ -0,0 +1,193 @@
+# inference_server.py
+#
+# Optional local inference sidecar. One process owns the encoder and
+# answers classify requests from every Dash worker:
+#
+#   python inference_server.py                      # 127.0.0.1:8765
+#   PAINT_SIDECAR_URL=http://127.0.0.1:8765 python app.py
+#
+# Requests that arrive within PAINT_BATCH_WINDOW_MS of each other are
+# encoded together in one forward pass (up to PAINT_BATCH_MAX texts).
+#
+#   POST /classify   {"text": "draw a tree"}
+#                 -> {"label": "tree", "version": "...", "batch_size": 3}
+#   POST /classify   {"texts": ["a house", "two trees"]}   (a scene's clauses)
+#                 -> {"results": [{"label": "house", ...}, {"label": "tree", ...}]}
+#   GET  /stats      batch-size histogram + counters (JSON)
+#   GET  /metrics    the same, Prometheus text format
+import os
+import json
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# the sidecar itself must never call out to a sidecar
+os.environ.pop("PAINT_SIDECAR_URL", None)
+
+import predict  # noqa: E402  (loads the model)
+from metrics import Counter, Histogram, render_prometheus  # noqa: E402
+
+HOST = os.environ.get("PAINT_SIDECAR_HOST", "127.0.0.1")
+PORT = int(os.environ.get("PAINT_SIDECAR_PORT", "8765"))
+BATCH_WINDOW_MS = float(os.environ.get("PAINT_BATCH_WINDOW_MS", "8"))
+BATCH_MAX = int(os.environ.get("PAINT_BATCH_MAX", "32"))
+
+BATCH_SIZE = Histogram(
+    "paint_sidecar_batch_size",
+    "Texts encoded together per forward pass.",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+BATCH_SECONDS = Histogram(
+    "paint_sidecar_batch_seconds",
+    "Encoder + classifier time per batch.",
+)
+ERRORS = Counter("paint_sidecar_errors_total", "Texts whose batch raised.")
+
+
+class MicroBatcher:
+    """
+    Collects texts from concurrent callers and classifies them in batches.
+
+    The worker thread blocks for the first request, then keeps collecting
+    until `window_s` has passed since that request or `max_batch` texts
+    are waiting, and answers the whole batch with one encoder call.
+    """
+
+    def __init__(self, classify_batch, window_s=0.008, max_batch=32):
+        self.classify_batch = classify_batch
+        self.window_s = window_s
+        self.max_batch = max_batch
+
+        self._queue = queue.Queue()
+
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        fut = Future()
+        self._queue.put((text, fut))
+        return fut
+
+    def submit_many(self, texts) -> list:
+        # queued back to back, so they land in the same batch unless it
+        # is already near max_batch
+        return [self.submit(t) for t in texts]
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window_s
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [t for t, _ in batch]
+            BATCH_SIZE.observe(len(batch))
+            t0 = time.perf_counter()
+            try:
+                results = self.classify_batch(texts)
+            except Exception as e:
+                ERRORS.inc(len(batch))
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            BATCH_SECONDS.observe(time.perf_counter() - t0)
+
+            for (_, fut), (label, version) in zip(batch, results):
+                fut.set_result({"label": label, "version": version, "batch_size": len(batch)})
+
+    def stats(self):
+        snap = BATCH_SIZE.snapshot()
+        return {
+            "requests": int(snap["sum"]),
+            "batches": snap["count"],
+            "errors": ERRORS.value(),
+            "mean_batch_size": round(snap["sum"] / snap["count"], 2) if snap["count"] else 0.0,
+            "batch_size_histogram": snap["buckets"],
+            "model_version": predict.get_model_version(),
+        }
+
+
+_batcher = None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def _send_json(self, code, payload):
+        self._send(code, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def _send(self, code, body, content_type):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path != "/classify":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+            body = json.loads(self.rfile.read(length).decode("utf-8"))
+            texts = body["texts"] if "texts" in body else [body["text"]]
+            if not isinstance(texts, list):
+                raise ValueError("texts must be a list")
+        except Exception:
+            self._send_json(400, {"error": "expected JSON body {\"text\": ...} or {\"texts\": [...]}"})
+            return
+        try:
+            futures = _batcher.submit_many(str(t) for t in texts)
+            results = [fut.result(timeout=30) for fut in futures]
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send_json(200, {"results": results} if "texts" in body else results[0])
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, _batcher.stats())
+        elif self.path == "/metrics":
+            self._send(200, render_prometheus().encode("utf-8"), "text/plain; version=0.0.4")
+        elif self.path == "/health":
+            self._send_json(200, {"ok": True})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def log_message(self, fmt, *args):
+        # one line per request would drown the batch stats
+        pass
+
+
+def serve(host=HOST, port=PORT):
+    global _batcher
+    _batcher = MicroBatcher(
+        predict.classify_texts_local,
+        window_s=BATCH_WINDOW_MS / 1000.0,
+        max_batch=BATCH_MAX,
+    )
+    predict.start_model_watcher()
+
+    httpd = ThreadingHTTPServer((host, port), _Handler)
+    httpd.daemon_threads = True
+    print(f"inference sidecar on http://{host}:{port} "
+          f"(window={BATCH_WINDOW_MS}ms, max_batch={BATCH_MAX})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    serve()
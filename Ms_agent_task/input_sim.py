@@ -0,0 +1,432 @@
+# input_sim.py
+#
+# Dry-run input simulator: a recording stand-in for the pyautogui calls
+# paint_driver makes. Nothing touches the mouse; every moveTo / dragTo /
+# dragRel / hotkey / press / typewrite and every sleep is captured and
+# costed with pyautogui's own timing rules.
+#
+#   python input_sim.py                  # per-shape + per-phase cost table
+#   python input_sim.py --json out.json
+#   python input_sim.py --check          # exit 1 if any shape got slower
+#   python input_sim.py --update-baseline
+#   python input_sim.py --tiers          # per-shape cost of each quality tier
+import os
+import sys
+import json
+import argparse
+import functools
+
+import paint_driver
+from paint_driver import use_input_backend, open_paint_and_prepare, save_and_close_paint
+from drawings import SHAPE_FUNCS, SETTLE_S, perform_drawing
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BASE_DIR, "perf_baselines", "dry_run_costs.json")
+
+# pyautogui constants: moves with duration <= MINIMUM_DURATION jump straight
+# to the target; longer ones are tweened with sleeps >= MINIMUM_SLEEP.
+MINIMUM_DURATION = 0.1
+MINIMUM_SLEEP = 0.05
+
+DEFAULT_SCREEN = (2560, 1440)
+
+
+class _FakeWindow:
+    isMinimized = False
+
+    def __init__(self, title):
+        self.title = title
+
+    def restore(self):
+        pass
+
+    def activate(self):
+        pass
+
+
+class RecordingBackend:
+    """
+    Drop-in for the pyautogui module (see paint_driver._InputProxy).
+
+    Each public call is stored as a record:
+        {"phase", "call", "args", "events", "motion_s", "pause_s", "sleep_s"}
+    where events = low-level mouse/key events the OS would receive,
+    motion_s = time spent tweening a move/drag, pause_s = pyautogui.PAUSE
+    after the call and sleep_s = explicit sleeps.
+
+    The cursor is tracked, so drags are also collected as polylines
+    (see polylines()).
+    """
+
+    def __init__(self, pause=None, screen=DEFAULT_SCREEN, realtime=False):
+        self.PAUSE = paint_driver.PAUSE if pause is None else pause
+        self.FAILSAFE = False
+        self.screen = tuple(screen)
+        self.realtime = realtime
+
+        self.records = []
+        self.x, self.y = self.screen[0] // 2, self.screen[1] // 2
+        self._phases = []
+        self._strokes = []
+        self._stroke = None
+
+    # ---------- phases ----------
+    def begin_phase(self, name):
+        self._phases.append(name)
+
+    def end_phase(self, name):
+        if self._phases:
+            self._phases.pop()
+
+    @property
+    def phase(self):
+        return self._phases[-1] if self._phases else "(none)"
+
+    # ---------- bookkeeping ----------
+    def _record(self, call, args, events=0, motion_s=0.0, pause=True, sleep_s=0.0):
+        rec = {
+            "phase": self.phase,
+            "call": call,
+            "args": args,
+            "events": events,
+            "motion_s": motion_s,
+            "pause_s": self.PAUSE if pause else 0.0,
+            "sleep_s": sleep_s,
+        }
+        self.records.append(rec)
+        if self.realtime:
+            import time
+            time.sleep(rec["motion_s"] + rec["pause_s"] + rec["sleep_s"])
+        return rec
+
+    def _tween(self, duration):
+        """
+        (move events, seconds) of one pyautogui move/drag, mirroring
+        pyautogui._mouseMoveDrag.
+        """
+        if duration <= MINIMUM_DURATION:
+            return 1, 0.0
+        num_steps = max(self.screen)
+        sleep_amount = duration / num_steps
+        if sleep_amount < MINIMUM_SLEEP:
+            num_steps = int(duration / MINIMUM_SLEEP)
+            sleep_amount = duration / num_steps
+        return num_steps + 1, sleep_amount * (num_steps + 1)
+
+    @staticmethod
+    def _xy(x, y):
+        if isinstance(x, (tuple, list)):
+            return int(x[0]), int(x[1])
+        return int(x), int(y)
+
+    def _end_stroke(self):
+        if self._stroke is not None and len(self._stroke) > 1:
+            self._strokes.append(self._stroke)
+        self._stroke = None
+
+    # ---------- pyautogui surface ----------
+    def size(self):
+        return self.screen
+
+    def position(self):
+        return self.x, self.y
+
+    def getWindowsWithTitle(self, title):
+        return [_FakeWindow(title)]
+
+    def sleep(self, seconds):
+        self._record("sleep", (seconds,), pause=False, sleep_s=float(seconds))
+
+    def launch(self, args):
+        self._record("launch", tuple(args), pause=False)
+
+    def moveTo(self, x=None, y=None, duration=0.0, **kwargs):
+        x, y = self._xy(x, y)
+        moves, secs = self._tween(duration)
+        self._record("moveTo", (x, y), events=moves, motion_s=secs)
+        self._end_stroke()
+        self.x, self.y = x, y
+        self._stroke = [(x, y)]
+
+    def dragTo(self, x=None, y=None, duration=0.0, button="left", **kwargs):
+        x, y = self._xy(x, y)
+        moves, secs = self._tween(duration)
+        # mouseDown + tween moves + mouseUp
+        self._record("dragTo", (x, y), events=moves + 2, motion_s=secs)
+        if self._stroke is None:
+            self._stroke = [(self.x, self.y)]
+        self._stroke.append((x, y))
+        self.x, self.y = x, y
+
+    def dragRel(self, xOffset=0, yOffset=0, duration=0.0, button="left", **kwargs):
+        x, y = self.x + int(xOffset), self.y + int(yOffset)
+        moves, secs = self._tween(duration)
+        self._record("dragRel", (int(xOffset), int(yOffset)), events=moves + 2, motion_s=secs)
+        if self._stroke is None:
+            self._stroke = [(self.x, self.y)]
+        self._stroke.append((x, y))
+        self.x, self.y = x, y
+
+    def hotkey(self, *keys, **kwargs):
+        self._end_stroke()
+        self._record("hotkey", keys, events=2 * len(keys))
+
+    def press(self, key, presses=1, **kwargs):
+        self._end_stroke()
+        self._record("press", (key,), events=2 * presses)
+
+    def typewrite(self, message, interval=0.0, **kwargs):
+        self._end_stroke()
+        n = len(message)
+        self._record("typewrite", (message,), events=2 * n, motion_s=interval * n)
+
+    write = typewrite
+
+    # ---------- results ----------
+    def polylines(self):
+        """
+        Every drawn stroke as a list of (x, y) points, in drawing order.
+        """
+        out = list(self._strokes)
+        if self._stroke is not None and len(self._stroke) > 1:
+            out.append(self._stroke)
+        return out
+
+    def summarize(self, records=None):
+        records = self.records if records is None else records
+        calls = [r for r in records if r["call"] not in ("sleep", "launch")]
+        out = {
+            "calls": len(calls),
+            "events": sum(r["events"] for r in records),
+            "motion_s": sum(r["motion_s"] for r in records),
+            "pause_s": sum(r["pause_s"] for r in records),
+            "sleep_s": sum(r["sleep_s"] for r in records),
+        }
+        out["wall_s"] = out["motion_s"] + out["pause_s"] + out["sleep_s"]
+        return {k: (round(v, 4) if isinstance(v, float) else v) for k, v in out.items()}
+
+    def by_phase(self):
+        groups = {}
+        for r in self.records:
+            groups.setdefault(r["phase"], []).append(r)
+        return {name: self.summarize(recs) for name, recs in groups.items()}
+
+
+def install_backend_from_env():
+    """
+    PAINT_BACKEND=dryrun          -> every session draws into a fresh
+                                     RecordingBackend, instantly
+    PAINT_BACKEND=dryrun-realtime -> same, but sleeping for the projected
+                                     time, so a server behaves like it is
+                                     driving Paint without touching it
+    anything else                 -> real pyautogui (default)
+    """
+    mode = os.environ.get("PAINT_BACKEND", "pyautogui")
+    if mode == "dryrun":
+        paint_driver.set_input_backend_factory(lambda: RecordingBackend())
+    elif mode == "dryrun-realtime":
+        paint_driver.set_input_backend_factory(lambda: RecordingBackend(realtime=True))
+    return mode
+
+
+# --------------------------
+# Simulations
+# --------------------------
+def simulate_shape(label, pause=None, screen=DEFAULT_SCREEN):
+    """
+    Dry-run draw_<label>_at at the canvas center; returns the backend.
+    """
+    rec = RecordingBackend(pause=pause, screen=screen)
+    with use_input_backend(rec):
+        cx, cy = paint_driver._get_canvas_center()
+        with paint_driver.input_phase("draw"):
+            SHAPE_FUNCS[label](cx, cy, paint_driver.get_scale_fn())
+    return rec
+
+
+def simulate_setup(pause=None, screen=DEFAULT_SCREEN):
+    """
+    Dry-run the Paint session around a drawing (launch ... close).
+    """
+    rec = RecordingBackend(pause=pause, screen=screen)
+    with use_input_backend(rec):
+        open_paint_and_prepare()
+        save_and_close_paint(os.path.join(paint_driver.get_saved_root(), "dry-run.png"))
+    return rec
+
+
+def simulate_job(label, pause=None, screen=DEFAULT_SCREEN):
+    """
+    Dry-run a whole perform_drawing(label) call.
+    """
+    rec = RecordingBackend(pause=pause, screen=screen)
+    with use_input_backend(rec):
+        perform_drawing(label)
+    return rec
+
+
+# --------------------------
+# Job estimates
+# --------------------------
+# Drawing time depends on the calls made, not on where they land, so a
+# shape costs the same at any position or scale and a scene costs the
+# sum of its objects.
+@functools.lru_cache(maxsize=None)
+def shape_cost(label, quality="full", pause=None):
+    """
+    Projected seconds to draw one `label` at quality tier `quality`.
+    """
+    with paint_driver.use_quality(quality):
+        return simulate_shape(label, pause=pause).summarize()["wall_s"]
+
+
+@functools.lru_cache(maxsize=None)
+def setup_cost(pause=None):
+    return simulate_setup(pause=pause).summarize()["wall_s"]
+
+
+def estimate_job(labels, quality="full", pause=None):
+    """
+    Projected wall seconds of perform_drawing for these objects (one
+    label per object) at `quality`: Paint setup + strokes + settle.
+    """
+    draw_s = sum(shape_cost(label, quality, pause) for label in labels)
+    return round(setup_cost(pause) + draw_s + SETTLE_S, 4)
+
+
+def tier_table(pause=None):
+    """
+    {label: {tier: {"wall_s", "events", "job_wall_s"}}}
+    """
+    table = {}
+    for label in SHAPE_FUNCS:
+        row = table[label] = {}
+        for tier in paint_driver.QUALITY_ORDER:
+            with paint_driver.use_quality(tier):
+                cost = simulate_shape(label, pause=pause).summarize()
+            row[tier] = {
+                "wall_s": cost["wall_s"],
+                "events": cost["events"],
+                "job_wall_s": estimate_job([label], tier, pause),
+            }
+    return table
+
+
+def print_tier_table(table):
+    tiers = paint_driver.QUALITY_ORDER
+    print(f"{'shape':<10}" + "".join(f"{t + '_s':>12}" for t in tiers)
+          + "".join(f"{t + '_job_s':>16}" for t in tiers))
+    for label, row in table.items():
+        print(f"{label:<10}" + "".join(f"{row[t]['wall_s']:>12}" for t in tiers)
+              + "".join(f"{row[t]['job_wall_s']:>16}" for t in tiers))
+
+
+def cost_table(pause=None, screen=DEFAULT_SCREEN):
+    setup = simulate_setup(pause=pause, screen=screen)
+    setup_total = setup.summarize()
+    shapes = {}
+    for label in SHAPE_FUNCS:
+        cost = simulate_shape(label, pause=pause, screen=screen).summarize()
+        # perform_drawing also waits SETTLE_S between drawing and saving
+        cost["job_wall_s"] = round(setup_total["wall_s"] + cost["wall_s"] + SETTLE_S, 4)
+        shapes[label] = cost
+    return {
+        "pause": paint_driver.PAUSE if pause is None else pause,
+        "slow_factor": paint_driver.SLOW_FACTOR,
+        "screen": list(screen),
+        "setup": {"total": setup_total, "phases": setup.by_phase()},
+        "shapes": shapes,
+    }
+
+
+# --------------------------
+# Reporting / regression check
+# --------------------------
+_COLS = ("calls", "events", "motion_s", "pause_s", "sleep_s", "wall_s")
+
+
+def _print_rows(title, rows):
+    print(f"{title:<16}" + "".join(f"{c:>11}" for c in _COLS))
+    for name, cost in rows.items():
+        print(f"{name:<16}" + "".join(f"{cost[c]:>11}" for c in _COLS))
+    print()
+
+
+def print_table(table):
+    print(f"PAUSE={table['pause']}s  PAINT_SLOW={table['slow_factor']}  screen={table['screen']}\n")
+    _print_rows("shape", table["shapes"])
+    _print_rows("setup phase", table["setup"]["phases"])
+    print(f"setup total: {table['setup']['total']['wall_s']} s")
+    for label, cost in table["shapes"].items():
+        print(f"  {label:<10} job ~ {cost['job_wall_s']} s")
+
+
+def check_regressions(table, baseline, tolerance=0.01):
+    """
+    List of human-readable regressions: any shape (or the setup) whose
+    projected wall time grew by more than `tolerance` over the baseline.
+    """
+    problems = []
+    for label, base in baseline.get("shapes", {}).items():
+        cur = table["shapes"].get(label)
+        if cur is None:
+            continue
+        if cur["wall_s"] > base["wall_s"] * (1 + tolerance) + 1e-9:
+            delta = 100.0 * (cur["wall_s"] - base["wall_s"]) / base["wall_s"]
+            problems.append(f"{label}: {base['wall_s']} s -> {cur['wall_s']} s (+{delta:.1f}%)")
+    base_setup = baseline.get("setup", {}).get("total")
+    if base_setup:
+        cur, base = table["setup"]["total"]["wall_s"], base_setup["wall_s"]
+        if cur > base * (1 + tolerance) + 1e-9:
+            problems.append(f"setup: {base} s -> {cur} s (+{100.0 * (cur - base) / base:.1f}%)")
+    return problems
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Cost out drawings without touching the mouse.")
+    ap.add_argument("--json", help="write the cost table to this file")
+    ap.add_argument("--check", action="store_true", help="fail if slower than the baseline")
+    ap.add_argument("--update-baseline", action="store_true")
+    ap.add_argument("--baseline", default=BASELINE_FILE)
+    ap.add_argument("--tolerance", type=float, default=0.01, help="allowed slowdown (fraction)")
+    ap.add_argument("--tiers", action="store_true", help="cost of every quality tier per shape")
+    args = ap.parse_args(argv)
+
+    if args.tiers:
+        table = tier_table()
+        print_tier_table(table)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(table, f, indent=2)
+        return 0
+
+    table = cost_table()
+    print_table(table)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(table, f, indent=2)
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(table, f, indent=2)
+        print(f"\nbaseline written to {args.baseline}")
+
+    if args.check:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if (baseline.get("pause"), baseline.get("slow_factor")) != (table["pause"], table["slow_factor"]):
+            print("\nwarning: baseline was recorded with different PAINT_PAUSE / PAINT_SLOW")
+        problems = check_regressions(table, baseline, args.tolerance)
+        if problems:
+            print("\nREGRESSIONS:")
+            for p in problems:
+                print("  " + p)
+            return 1
+        print("\nno regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
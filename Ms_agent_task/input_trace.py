@@ -0,0 +1,191 @@
+# input_trace.py
+#
+# Opt-in tracing of real Paint sessions. With PAINT_TRACE=1 every input
+# call, sleep, window lookup and setup phase of perform_drawing() is
+# timestamped and written as Chrome trace-event JSON
+# (open in chrome://tracing or https://ui.perfetto.dev):
+#
+#   traces/<timestamp>_<label>.trace.json
+#
+# plus a summary that attributes the session's wall time to fixed sleeps,
+# stroke motion, pyautogui.PAUSE overhead, dialogs and window waits.
+#
+# When PAINT_TRACE is unset, trace_session() is a no-op context manager:
+# the input backend isn't wrapped, so there is no per-call cost.
+import os
+import json
+import time
+import datetime
+import threading
+import contextlib
+
+from paint_driver import get_input_backend, use_input_backend
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TRACE_ENABLED = os.environ.get("PAINT_TRACE", "0") == "1"
+TRACE_DIR = os.environ.get("PAINT_TRACE_DIR", os.path.join(BASE_DIR, "traces"))
+
+# setup phases that are mostly waiting on a Paint dialog to open/close
+DIALOG_PHASES = {"canvas_size", "save_as", "save_as_final", "close"}
+WINDOW_PHASES = {"launch", "activate"}
+
+_MOTION_CALLS = {"moveTo", "dragTo", "dragRel"}
+_INPUT_CALLS = _MOTION_CALLS | {"hotkey", "press", "typewrite", "write"}
+
+
+class TracingBackend:
+    """
+    Wraps another input backend and timestamps every call made through it.
+    Anything not traced (size, PAUSE, FAILSAFE, ...) is forwarded as is.
+    """
+
+    def __init__(self, inner):
+        self._inner = inner
+        self._t0 = time.perf_counter()
+        self._pid = os.getpid()
+        self._phases = []
+        self.events = []
+
+    def __getattr__(self, name):
+        attr = getattr(self._inner, name)
+        if name in _INPUT_CALLS or name in ("getWindowsWithTitle", "launch"):
+            return self._wrap(name, attr)
+        return attr
+
+    def _us(self, t):
+        return (t - self._t0) * 1e6
+
+    @property
+    def phase(self):
+        return self._phases[-1][0] if self._phases else None
+
+    def _category(self, call):
+        phase = self.phase
+        if phase in DIALOG_PHASES:
+            return "dialog"
+        if call == "sleep":
+            return "window" if phase in WINDOW_PHASES else "fixed_sleep"
+        if call in ("getWindowsWithTitle", "launch") or phase in WINDOW_PHASES:
+            return "window"
+        if call in _MOTION_CALLS:
+            return "stroke_motion"
+        return "input"
+
+    def _emit(self, name, cat, start, end, args=None):
+        self.events.append({
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": round(self._us(start), 1),
+            "dur": round((end - start) * 1e6, 1),
+            "pid": self._pid,
+            "tid": threading.get_ident(),
+            "args": args or {},
+        })
+
+    def _wrap(self, name, fn):
+        def traced(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                end = time.perf_counter()
+                cat = self._category(name)
+                args_out = {"args": [a if isinstance(a, (int, float)) else str(a) for a in args]}
+                if "duration" in kwargs:
+                    args_out["duration"] = kwargs["duration"]
+                pause = float(getattr(self._inner, "PAUSE", 0.0) or 0.0)
+                if name in _INPUT_CALLS and pause > 0 and cat != "dialog":
+                    # pyautogui sleeps PAUSE at the end of every call; show it
+                    # as its own slice so it can be told apart from motion
+                    split = max(start, end - pause)
+                    self._emit(name, cat, start, split, args_out)
+                    self._emit("PAUSE", "pause_overhead", split, end)
+                else:
+                    self._emit(name, cat, start, end, args_out)
+        return traced
+
+    # sleep is always traced, even if the inner backend lacks it
+    def sleep(self, seconds):
+        start = time.perf_counter()
+        inner_sleep = getattr(self._inner, "sleep", None) or time.sleep
+        inner_sleep(seconds)
+        self._emit("sleep", self._category("sleep"), start, time.perf_counter(), {"seconds": seconds})
+
+    def begin_phase(self, name):
+        self._phases.append((name, time.perf_counter()))
+        begin = getattr(self._inner, "begin_phase", None)
+        if begin is not None:
+            begin(name)
+
+    def end_phase(self, name):
+        end = getattr(self._inner, "end_phase", None)
+        if end is not None:
+            end(name)
+        if self._phases:
+            pname, start = self._phases.pop()
+            self._emit(pname, "phase", start, time.perf_counter())
+
+    # ---------- output ----------
+    def summary(self):
+        """
+        Seconds per category. Phase slices are excluded (they overlap the
+        calls inside them); "untraced" is wall time spent outside any
+        input call or sleep (Python work, the draw_*_at geometry, ...).
+        """
+        totals = {}
+        for e in self.events:
+            if e["cat"] == "phase":
+                continue
+            totals[e["cat"]] = totals.get(e["cat"], 0.0) + e["dur"] / 1e6
+        wall = time.perf_counter() - self._t0
+        totals["untraced"] = max(0.0, wall - sum(totals.values()))
+        out = {k: round(v, 3) for k, v in sorted(totals.items())}
+        out["wall_s"] = round(wall, 3)
+        out["calls"] = sum(1 for e in self.events if e["cat"] not in ("phase", "pause_overhead"))
+        return out
+
+    def to_chrome_trace(self, name="paint session"):
+        meta = [
+            {"name": "process_name", "ph": "M", "pid": self._pid, "tid": 0, "args": {"name": name}},
+        ]
+        return {
+            "traceEvents": meta + sorted(self.events, key=lambda e: e["ts"]),
+            "displayTimeUnit": "ms",
+            "otherData": {"summary": self.summary()},
+        }
+
+
+@contextlib.contextmanager
+def trace_session(label: str):
+    """
+    Trace everything the current thread draws inside the block, then write
+    the trace file. Yields the TracingBackend, or None when disabled.
+    """
+    if not TRACE_ENABLED:
+        yield None
+        return
+
+    tracer = TracingBackend(get_input_backend())
+    try:
+        with use_input_backend(tracer):
+            yield tracer
+    finally:
+        os.makedirs(TRACE_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(TRACE_DIR, f"{stamp}_{label or 'session'}.trace.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(tracer.to_chrome_trace(f"perform_drawing({label})"), f)
+        print(f"[trace] {path}: {json.dumps(tracer.summary())}")
+
+
+if __name__ == "__main__":
+    # print the summary stored in one or more trace files
+    import sys
+
+    for p in sys.argv[1:]:
+        with open(p, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        print(p)
+        for k, v in data.get("otherData", {}).get("summary", {}).items():
+            print(f"  {k:<16}{v}")
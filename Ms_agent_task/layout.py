@@ -0,0 +1,106 @@
+# layout.py
+#
+# Places the objects of a multi-shape scene on the CANVAS_W x CANVAS_H
+# canvas. Each draw_*_at is measured once with the recording backend to
+# get its bounding box around the (cx, cy) anchor, then the planner picks
+# the grid that lets every object be drawn as large as possible (never
+# larger than the normal single-shape scale) and centers each object in
+# its cell.
+import math
+import functools
+
+from paint_driver import CANVAS_W, CANVAS_H
+
+# scale draw_*_at is measured at; matches paint_driver._scale_medium_large
+REF_SCALE = 1.2
+MAX_SCALE = REF_SCALE
+MIN_SCALE = 0.25
+MARGIN = 40     # px kept clear along the canvas border
+GUTTER = 0.85   # fraction of a cell an object may fill
+
+
+def scale_fn(scale):
+    def S(x):
+        return int(round(x * scale))
+    return S
+
+
+@functools.lru_cache(maxsize=None)
+def shape_extent(draw_fn):
+    """
+    (left, top, right, bottom) of everything draw_fn strokes, relative to
+    its (cx, cy) anchor, at scale 1.0. Measured at full quality, so the
+    cached box does not depend on the tier of the first caller.
+    """
+    # imported here: input_sim imports drawings, which imports us
+    from paint_driver import use_input_backend, use_quality
+    from input_sim import RecordingBackend
+
+    rec = RecordingBackend(pause=0.0)
+    ax, ay = rec.x, rec.y
+    with use_input_backend(rec), use_quality("full"):
+        draw_fn(ax, ay, scale_fn(REF_SCALE))
+    xs = [x for line in rec.polylines() for x, _ in line]
+    ys = [y for line in rec.polylines() for _, y in line]
+    if not xs:
+        return (0.0, 0.0, 0.0, 0.0)
+    return tuple(v / REF_SCALE for v in (min(xs) - ax, min(ys) - ay, max(xs) - ax, max(ys) - ay))
+
+
+def _grid_scale(extents, rows, cols, width, height):
+    cell_w = (width - 2 * MARGIN) / cols
+    cell_h = (height - 2 * MARGIN) / rows
+    worst = MAX_SCALE
+    for left, top, right, bottom in extents:
+        w, h = max(right - left, 1.0), max(bottom - top, 1.0)
+        worst = min(worst, cell_w * GUTTER / w, cell_h * GUTTER / h)
+    return worst
+
+
+def plan_scene(objects, shape_funcs, width=CANVAS_W, height=CANVAS_H):
+    """
+    objects: labels in drawing order, one per object
+        (["house", "tree", "tree", "star"]).
+    Returns [(label, x, y, scale), ...] where (x, y) is the draw_*_at
+    anchor in canvas coordinates (0, 0 = top-left of the canvas).
+
+    All objects share one scale so a scene keeps its relative sizes.
+    """
+    if not objects:
+        return []
+    extents = [shape_extent(shape_funcs[label]) for label in objects]
+    n = len(objects)
+
+    best = None
+    for rows in range(1, n + 1):
+        cols = math.ceil(n / rows)
+        if (rows - 1) * cols >= n:
+            continue  # an empty row: same as fewer rows
+        s = _grid_scale(extents, rows, cols, width, height)
+        if best is None or s > best[0]:
+            best = (s, rows, cols)
+    scale, rows, cols = best
+    scale = max(scale, MIN_SCALE)
+
+    cell_w = (width - 2 * MARGIN) / cols
+    cell_h = (height - 2 * MARGIN) / rows
+    plan = []
+    for i, (label, (left, top, right, bottom)) in enumerate(zip(objects, extents)):
+        row, col = divmod(i, cols)
+        in_row = min(cols, n - row * cols)
+        # center a short last row instead of leaving it ragged-left
+        x0 = MARGIN + (cols - in_row) * cell_w / 2
+        cell_cx = x0 + (col + 0.5) * cell_w
+        cell_cy = MARGIN + (row + 0.5) * cell_h
+        # shift the anchor so the bounding box, not the anchor, is centered
+        x = cell_cx - (left + right) / 2 * scale
+        y = cell_cy - (top + bottom) / 2 * scale
+        plan.append((label, int(round(x)), int(round(y)), scale))
+    return plan
+
+
+def expand_scene(scene):
+    """
+    [("house", 1), ("tree", 2)] -> ["house", "tree", "tree"]
+    """
+    return [label for label, n in scene for _ in range(n)]
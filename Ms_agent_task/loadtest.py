@@ -0,0 +1,312 @@
+# loadtest.py
+#
+# Concurrent-user load generator for the Dash chat endpoint. It posts the
+# same /_dash-update-component request the browser sends when Send is
+# clicked, from N simulated users with think time and a prompt mix, then
+# checks that the chat history store survived intact. Each user keeps its
+# own cookies, so it stays in one history session.
+#
+# Against a running server (any worker/thread/queue configuration):
+#   PAINT_BACKEND=dryrun-realtime PAINT_HISTORY_DIR=/tmp/h python app.py
+#   python loadtest.py --url http://127.0.0.1:8050 -c 8 -d 60 --history /tmp/h
+#
+# Or let it start `python app.py` itself with a stubbed drawing backend
+# and a throwaway history directory:
+#   python loadtest.py --serve -c 8 -d 60 --backend dryrun-realtime
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+
+from history_store import HistoryStore
+from metrics import percentiles
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_MIX = "draw a tree:3,draw a house:2,draw a star:2,please draw a flower:2,draw a train:1,hello there:1"
+
+
+def parse_mix(spec):
+    prompts, weights = [], []
+    for part in spec.split(","):
+        text, _, w = part.rpartition(":")
+        if not text:
+            text, w = w, "1"
+        prompts.append(text.strip())
+        weights.append(float(w))
+    return prompts, weights
+
+
+def _http_json(url, payload=None, timeout=30.0, opener=None):
+    data = None if payload is None else json.dumps(payload).encode("utf-8")
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    open_url = opener.open if opener is not None else urllib.request.urlopen
+    with open_url(req, timeout=timeout) as resp:
+        body = resp.read()
+        return resp.status, (json.loads(body) if body else None)
+
+
+def find_send_callback(base_url):
+    """
+    Look up the callback triggered by send-btn.n_clicks in the app's
+    /_dash-dependencies, so the request matches whatever outputs and
+    states the server currently declares.
+    """
+    _, deps = _http_json(base_url + "/_dash-dependencies")
+    for cb in deps:
+        for inp in cb.get("inputs", []):
+            if inp["id"] == "send-btn" and inp["property"] == "n_clicks":
+                return cb
+    raise RuntimeError("no callback with Input('send-btn', 'n_clicks') found")
+
+
+def _outputs_from_spec(output):
+    # "..a.children...b.value.." (multi) or "a.children" (single)
+    parts = output.strip(".").split("...") if output.startswith("..") else [output]
+    outs = []
+    for p in parts:
+        cid, _, prop = p.rpartition(".")
+        outs.append({"id": cid, "property": prop})
+    return outs if output.startswith("..") else outs[0]
+
+
+def build_payload(cb, text, n_clicks):
+    return {
+        "output": cb["output"],
+        "outputs": _outputs_from_spec(cb["output"]),
+        "inputs": [
+            {"id": i["id"], "property": i["property"],
+             "value": n_clicks if i["id"] == "send-btn" else None}
+            for i in cb["inputs"]
+        ],
+        "changedPropIds": ["send-btn.n_clicks"],
+        "state": [
+            {"id": s["id"], "property": s["property"],
+             "value": text if (s["id"], s["property"]) == ("user-input", "value") else None}
+            for s in cb.get("state", [])
+        ],
+    }
+
+
+class LoadResult:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.errors = {}
+        self.ok = 0
+        self.sent = 0
+
+    def record(self, dt, error=None):
+        with self.lock:
+            self.sent += 1
+            if error is None:
+                self.ok += 1
+                self.latencies.append(dt)
+            else:
+                self.errors[error] = self.errors.get(error, 0) + 1
+
+
+def _user(idx, base_url, cb, prompts, weights, think, deadline, max_requests, result, rng):
+    n_clicks = 0
+    # a browser of its own: the session cookie comes back on every request
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor())
+    while time.monotonic() < deadline:
+        with result.lock:
+            if max_requests and result.sent >= max_requests:
+                return
+        n_clicks += 1
+        text = rng.choices(prompts, weights)[0]
+        payload = build_payload(cb, text, n_clicks)
+        t0 = time.perf_counter()
+        err = None
+        try:
+            status, _ = _http_json(base_url + "/_dash-update-component", payload, timeout=300,
+                                   opener=opener)
+            if status not in (200, 204):
+                err = f"HTTP {status}"
+        except urllib.error.HTTPError as e:
+            err = f"HTTP {e.code}"
+        except Exception as e:
+            err = type(e).__name__
+        result.record(time.perf_counter() - t0, err)
+        if think > 0:
+            # uniform +-50% jitter so users don't march in lockstep
+            time.sleep(think * rng.uniform(0.5, 1.5))
+
+
+def _read_history(path):
+    """
+    (entries of every session, number of sessions) in a history store.
+    """
+    store = HistoryStore(path)
+    entries, sessions = [], 0
+    for sid in store.sessions():
+        entries.extend(store.load(sid))
+        sessions += 1
+    return entries, sessions
+
+
+def _count_lines(path):
+    n = 0
+    for dirpath, _, files in os.walk(path):
+        for name in files:
+            if name.endswith(".jsonl"):
+                with open(os.path.join(dirpath, name), "r", encoding="utf-8") as f:
+                    n += sum(1 for line in f if line.strip())
+    return n
+
+
+def history_integrity(path, before_count, ok_requests):
+    """
+    Every successful request should have appended exactly one entry.
+    """
+    report = {"path": path}
+    try:
+        hist, sessions = _read_history(path)
+    except Exception as e:
+        report.update(valid_json=False, error=str(e))
+        return report
+    ids = [h.get("id") for h in hist]
+    required = {"id", "timestamp", "user_text", "predicted_label", "status_text"}
+    # lines the store had to skip (torn or interleaved appends)
+    unreadable = _count_lines(path) - len(hist)
+    report.update(
+        valid_json=unreadable == 0,
+        sessions=sessions,
+        entries=len(hist),
+        added=len(hist) - before_count,
+        expected_added=ok_requests,
+        lost_entries=max(0, ok_requests - (len(hist) - before_count)),
+        duplicate_ids=len(ids) - len(set(ids)),
+        malformed=sum(1 for h in hist if not required.issubset(h)),
+    )
+    report["intact"] = (report["valid_json"] and report["lost_entries"] == 0
+                        and report["duplicate_ids"] == 0 and report["malformed"] == 0)
+    return report
+
+
+def run_load(base_url, concurrency, duration, max_requests, think, mix, history_path=None, seed=0):
+    prompts, weights = parse_mix(mix)
+    cb = find_send_callback(base_url)
+
+    before = 0
+    if history_path and os.path.exists(history_path):
+        try:
+            before = len(_read_history(history_path)[0])
+        except Exception:
+            before = 0
+
+    result = LoadResult()
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(
+            target=_user,
+            args=(i, base_url, cb, prompts, weights, think, deadline, max_requests, result,
+                  random.Random(seed + i)),
+            daemon=True,
+        )
+        for i in range(concurrency)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    report = {
+        "url": base_url,
+        "concurrency": concurrency,
+        "think_s": think,
+        "elapsed_s": round(elapsed, 2),
+        "requests": result.sent,
+        "ok": result.ok,
+        "throughput_rps": round(result.ok / elapsed, 3) if elapsed else 0.0,
+        "error_rate": round((result.sent - result.ok) / result.sent, 4) if result.sent else 0.0,
+        "errors": result.errors,
+        "latency": percentiles(result.latencies, ps=(50, 90, 95, 99)),
+    }
+    if history_path:
+        report["history"] = history_integrity(history_path, before, result.ok)
+    try:
+        # merge / reject counts and queue waits, if the server exposes them
+        _, report["scheduler"] = _http_json(base_url + "/scheduler", timeout=5)
+    except Exception:
+        pass
+    return report
+
+
+def _wait_ready(base_url, proc, timeout=120):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with code {proc.returncode}")
+        try:
+            _http_json(base_url + "/_dash-dependencies", timeout=2)
+            return
+        except Exception:
+            time.sleep(0.5)
+    raise RuntimeError("server did not become ready")
+
+
+def serve_app(port, backend, history_path):
+    env = dict(os.environ)
+    env.update({
+        "PAINT_BACKEND": backend,
+        "PAINT_HISTORY_DIR": history_path,
+        "PAINT_HOST": "127.0.0.1",
+        "PAINT_PORT": str(port),
+        "PAINT_MODEL_WATCH": "0",
+    })
+    return subprocess.Popen([sys.executable, os.path.join(BASE_DIR, "app.py")], cwd=BASE_DIR, env=env)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Load-test the Dash chat callback.")
+    ap.add_argument("--url", default="http://127.0.0.1:8050")
+    ap.add_argument("-c", "--concurrency", type=int, default=4)
+    ap.add_argument("-d", "--duration", type=float, default=30.0, help="seconds")
+    ap.add_argument("-n", "--requests", type=int, default=0, help="stop after N requests (0 = no limit)")
+    ap.add_argument("--think", type=float, default=1.0, help="mean think time per user (s)")
+    ap.add_argument("--mix", default=DEFAULT_MIX, help="'prompt:weight,prompt:weight,...'")
+    ap.add_argument("--history", help="history directory (PAINT_HISTORY_DIR) to integrity-check afterwards")
+    ap.add_argument("--serve", action="store_true", help="start app.py with a stubbed backend")
+    ap.add_argument("--backend", default="dryrun", help="PAINT_BACKEND for --serve")
+    ap.add_argument("--port", type=int, default=8071, help="port for --serve")
+    ap.add_argument("--json", help="write the report to this file")
+    args = ap.parse_args(argv)
+
+    proc = None
+    base_url = args.url.rstrip("/")
+    history = args.history
+    if args.serve:
+        history = history or os.path.join(tempfile.mkdtemp(prefix="paint-load-"), "history")
+        base_url = f"http://127.0.0.1:{args.port}"
+        proc = serve_app(args.port, args.backend, history)
+    try:
+        if proc is not None:
+            _wait_ready(base_url, proc)
+        report = run_load(base_url, args.concurrency, args.duration, args.requests,
+                          args.think, args.mix, history)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    hist = report.get("history")
+    return 1 if (hist and not hist.get("intact", False)) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
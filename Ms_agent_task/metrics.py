@@ -0,0 +1,302 @@
+# metrics.py
+#
+# Tiny in-process metrics: labelled histograms / counters rendered in the
+# Prometheus text format, plus timing spans for the stages of a chat
+# request.
+#
+#   with span("classify_text"):
+#       ...
+#
+# Every span is observed into the paint_stage_seconds{stage=...}
+# histogram. Between begin_request() and end_request() the spans of the
+# current thread are also collected, and with PAINT_JSON_LOG=1 one JSON
+# line per request is printed (or appended to PAINT_JSON_LOG_FILE).
+import os
+import json
+import math
+import time
+import bisect
+import threading
+import contextlib
+
+JSON_LOG = os.environ.get("PAINT_JSON_LOG", "0") == "1"
+JSON_LOG_FILE = os.environ.get("PAINT_JSON_LOG_FILE", "")
+
+# seconds; spans range from ~10 ms (history append) to ~1 min (Paint)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _fmt_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    inner = ",".join(f'{k}="{str(v)}"' for k, v in pairs)
+    return "{" + inner + "}"
+
+
+def _fmt_num(v):
+    if v == float("inf"):
+        return "+Inf"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+def percentiles(samples, ps=(50, 90, 99)):
+    """
+    Nearest-rank percentiles of `samples` (seconds), in milliseconds:
+    {"p50_ms": ..., "mean_ms": ...}; {} without samples.
+    """
+    if not samples:
+        return {}
+    xs = sorted(samples)
+    out = {}
+    for p in ps:
+        # the ceil(p% of n)-th smallest; rounded first so 7 * 100 / 100
+        # style products don't land a hair above a whole rank
+        k = max(0, min(len(xs) - 1, math.ceil(round(p * len(xs) / 100.0, 9)) - 1))
+        out[f"p{p}_ms"] = round(xs[k] * 1000.0, 3)
+    out["mean_ms"] = round(sum(xs) / len(xs) * 1000.0, 3)
+    return out
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _register(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        return self._values.get(key, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, v in sorted(self._values.items()):
+                lines.append(f"{self.name}{_fmt_labels(self.labelnames, key)} {_fmt_num(v)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [bucket counts..., +Inf count, sum]
+        self._series = {}
+        self._lock = threading.Lock()
+        _register(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            s[idx] += 1
+            s[-1] += value
+
+    def snapshot(self, **labels):
+        """
+        {"count", "sum", "buckets": {le: cumulative count}} for one series.
+        """
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            s = list(self._series.get(key, [0] * (len(self.buckets) + 1) + [0.0]))
+        cum, out = 0, {}
+        for le, c in zip(list(self.buckets) + [float("inf")], s[:-1]):
+            cum += c
+            out[_fmt_num(le)] = cum
+        return {"count": cum, "sum": s[-1], "buckets": out}
+
+    def quantile(self, q, **labels):
+        """
+        Upper bucket bound below which a fraction q of observations fall.
+        """
+        snap = self.snapshot(**labels)
+        if snap["count"] == 0:
+            return None
+        target = q * snap["count"]
+        for le, cum in snap["buckets"].items():
+            if cum >= target:
+                return float("inf") if le == "+Inf" else float(le)
+        return float("inf")
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((k, list(v)) for k, v in self._series.items())
+        for key, s in series:
+            cum = 0
+            for le, c in zip(list(self.buckets) + [float("inf")], s[:-1]):
+                cum += c
+                lbl = _fmt_labels(self.labelnames, key, ("le", _fmt_num(le)))
+                lines.append(f"{self.name}_bucket{lbl} {cum}")
+            lbl = _fmt_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{lbl} {_fmt_num(s[-1])}")
+            lines.append(f"{self.name}_count{lbl} {cum}")
+        return lines
+
+
+def _register(metric):
+    with _registry_lock:
+        _registry.append(metric)
+
+
+def render_prometheus() -> str:
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for m in metrics:
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# --------------------------
+# Request stages
+# --------------------------
+STAGE_SECONDS = Histogram(
+    "paint_stage_seconds",
+    "Wall time of each stage of a chat request.",
+    labelnames=("stage",),
+)
+REQUEST_SECONDS = Histogram(
+    "paint_request_seconds",
+    "Wall time of a whole chat request.",
+    labelnames=("outcome",),
+)
+JOB_SECONDS = Histogram(
+    "paint_job_seconds",
+    "Projected (kind=estimated) and measured (kind=actual) wall time of drawing jobs.",
+    labelnames=("quality", "kind"),
+)
+
+_local = threading.local()
+
+
+@contextlib.contextmanager
+def span(stage: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        STAGE_SECONDS.observe(dt, stage=stage)
+        spans = getattr(_local, "spans", None)
+        if spans is not None:
+            spans.append((stage, dt))
+
+
+def begin_request():
+    _local.spans = []
+    _local.fields = {}
+    _local.started = time.perf_counter()
+
+
+def observe_job(quality: str, estimated_s, actual_s: float):
+    """
+    One drawing job: both durations go into paint_job_seconds and, inside
+    a request, into its JSON log line.
+    """
+    if estimated_s is not None:
+        JOB_SECONDS.observe(estimated_s, quality=quality, kind="estimated")
+    JOB_SECONDS.observe(actual_s, quality=quality, kind="actual")
+    fields = getattr(_local, "fields", None)
+    if fields is not None:
+        fields.update(quality=quality, estimated_s=estimated_s, actual_s=round(actual_s, 4))
+
+
+def note(**fields):
+    """
+    Add fields to the current request's JSON log line (no-op outside a
+    request).
+    """
+    current = getattr(_local, "fields", None)
+    if current is not None:
+        current.update(fields)
+
+
+@contextlib.contextmanager
+def detached_request():
+    """
+    Collect the spans and job fields of work this thread does on behalf
+    of a request running on another thread; hand the yielded dict to
+    adopt() there.
+    """
+    report = {"spans": [], "fields": {}}
+    prev = getattr(_local, "spans", None), getattr(_local, "fields", None)
+    _local.spans, _local.fields = report["spans"], report["fields"]
+    try:
+        yield report
+    finally:
+        _local.spans, _local.fields = prev
+
+
+def adopt(report):
+    """
+    Add a detached_request() report to this thread's open request.
+    """
+    if not report:
+        return
+    spans = getattr(_local, "spans", None)
+    if spans is not None:
+        spans.extend(report["spans"])
+    fields = getattr(_local, "fields", None)
+    if fields is not None:
+        fields.update(report["fields"])
+
+
+def end_request(outcome: str, **fields):
+    """
+    Close the current request: observe its total time and, if enabled,
+    emit one JSON log line with the per-stage breakdown.
+    """
+    spans = getattr(_local, "spans", None) or []
+    started = getattr(_local, "started", None)
+    job_fields = getattr(_local, "fields", None) or {}
+    _local.spans = None
+    _local.fields = None
+    total = time.perf_counter() - started if started is not None else 0.0
+    REQUEST_SECONDS.observe(total, outcome=outcome)
+
+    if JSON_LOG:
+        record = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "outcome": outcome,
+            "total_s": round(total, 4),
+            "stages": {name: round(dt, 4) for name, dt in spans},
+        }
+        record.update(job_fields)
+        record.update(fields)
+        _write_log_line(json.dumps(record))
+
+
+_log_lock = threading.Lock()
+
+
+def _write_log_line(line: str):
+    with _log_lock:
+        if JSON_LOG_FILE:
+            with open(JSON_LOG_FILE, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        else:
+            print(line, flush=True)
@@ -0,0 +1,241 @@
+# model_registry.py
+import os
+import time
+import hashlib
+import datetime
+import threading
+
+import joblib
+import numpy as np
+
+DEFAULT_ENCODER = "sentence-transformers/all-MiniLM-L6-v2"
+
+# (text, expected drawable label) pairs every new bundle must get right
+# before it is allowed to replace the active one.
+SMOKE_SET = [
+    ("draw a tree", "tree"),
+    ("can you make a house", "house"),
+    ("please show me a windmill", "windmill"),
+    ("i want a train drawing", "train"),
+    ("can you draw a star for me", "star"),
+    ("draw a flower", "flower"),
+]
+
+
+def _file_version(path: str) -> str:
+    """
+    Short, stable id for a bundle file: modification date + content hash.
+    e.g. "20251028-3fa91c0e"
+    """
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    stamp = datetime.datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y%m%d")
+    return f"{stamp}-{h.hexdigest()[:8]}"
+
+
+class ModelBundle:
+    """
+    One loaded classifier + encoder pair. Never mutated after construction,
+    so a caller holding a reference keeps a consistent model even if the
+    registry swaps in a newer bundle meanwhile.
+    """
+
+    def __init__(self, clf, id2label, encoder_model_name, embedder, version, path):
+        self.clf = clf
+        self.id2label = id2label
+        self.encoder_model_name = encoder_model_name
+        self.embedder = embedder
+        self.version = version
+        self.path = path
+        self.loaded_at = time.time()
+
+    def predict_proba(self, texts):
+        emb = self.embedder.encode(list(texts), convert_to_numpy=True)
+        return self.clf.predict_proba(emb)
+
+    def predict_labels(self, texts):
+        """
+        Raw labels for a batch of texts; one encoder forward pass.
+        """
+        return self.predict_labels_scored(texts)[0]
+
+    def predict_labels_scored(self, texts):
+        """
+        (raw labels, probability of each) for a batch of texts.
+        """
+        texts = list(texts)
+        if self.clf is None:
+            return ["unknown"] * len(texts), [0.0] * len(texts)
+        probs = self.predict_proba(texts)
+        pred_ids = np.argmax(probs, axis=1)
+        labels = [str(self.id2label.get(int(i), "unknown")) for i in pred_ids]
+        return labels, [float(p[i]) for p, i in zip(probs, pred_ids)]
+
+    def predict_label(self, text: str) -> str:
+        return self.predict_labels([text])[0]
+
+
+def load_bundle(path: str, reuse=None) -> ModelBundle:
+    """
+    Load intent_classifier.joblib into a ModelBundle.
+    If `reuse` is a bundle built on the same encoder, its SentenceTransformer
+    is shared instead of constructing (and warming) a second copy.
+    A directory is treated as a memory-mapped export (see shared_weights.py).
+    """
+    if os.path.isdir(path):
+        from shared_weights import load_shared_bundle
+        return load_shared_bundle(path, reuse=reuse)
+
+    from sentence_transformers import SentenceTransformer
+
+    version = _file_version(path)
+    raw = joblib.load(path)
+
+    encoder_model_name = raw.get("encoder_model_name", DEFAULT_ENCODER)
+    if reuse is not None and reuse.encoder_model_name == encoder_model_name:
+        embedder = reuse.embedder
+    else:
+        embedder = SentenceTransformer(encoder_model_name)
+
+    return ModelBundle(
+        clf=raw.get("clf", None),
+        id2label=raw.get("id2label", {}),
+        encoder_model_name=encoder_model_name,
+        embedder=embedder,
+        version=version,
+        path=path,
+    )
+
+
+class ModelRegistry:
+    """
+    Holds the active ModelBundle and hot-swaps it when the bundle file on
+    disk changes.
+
+    - current() returns the active bundle; callers should grab it once per
+      request and use that reference throughout.
+    - reload() loads the file into a *new* bundle, runs `validate` on it and
+      only then replaces the active reference (a single assignment).
+    - start_watching() polls the model directory in a daemon thread and
+      calls reload() once a changed file has stopped growing.
+    """
+
+    def __init__(self, model_path: str, validate=None, poll_interval: float = 2.0):
+        self.model_path = model_path
+        self.model_dir = os.path.dirname(model_path)
+        # a shared-weights export is complete once its meta.json is written
+        if os.path.isdir(model_path):
+            self.watch_path = os.path.join(model_path, "meta.json")
+        else:
+            self.watch_path = model_path
+        self.validate = validate
+        self.poll_interval = poll_interval
+
+        self._active = None
+        self.load_seconds = None
+        self._load_lock = threading.Lock()
+        self._watch_thread = None
+        self._stop = threading.Event()
+        self._last_stat = None
+
+    # ---------- reading ----------
+    def current(self) -> ModelBundle:
+        bundle = self._active
+        if bundle is None:
+            bundle = self.load()
+        return bundle
+
+    @property
+    def version(self):
+        bundle = self._active
+        return bundle.version if bundle is not None else None
+
+    # ---------- loading ----------
+    def load(self) -> ModelBundle:
+        """
+        Initial (blocking) load. A failing smoke check is only reported here,
+        since there is no older bundle to fall back to.
+        """
+        with self._load_lock:
+            if self._active is not None:
+                return self._active
+            t0 = time.perf_counter()
+            bundle = load_bundle(self.model_path)
+            self.load_seconds = time.perf_counter() - t0
+            if self.validate is not None and not self.validate(bundle):
+                print(f"[model] warning: bundle {bundle.version} failed smoke check")
+            self._last_stat = self._stat()
+            self._active = bundle
+            print(f"[model] loaded {bundle.version} in {self.load_seconds:.2f}s")
+            return bundle
+
+    def reload(self) -> bool:
+        """
+        Build a candidate bundle from disk and swap it in if it validates.
+        Returns True when the active bundle changed.
+        """
+        with self._load_lock:
+            old = self._active
+            if old is None:
+                # never loaded (lazy mode): the first current() reads the new file
+                return False
+            try:
+                candidate = load_bundle(self.model_path, reuse=old)
+            except Exception as e:
+                print(f"[model] reload failed: {e}")
+                return False
+
+            if candidate.version == old.version:
+                # same content re-saved (or a shared export of it)
+                return False
+
+            if self.validate is not None:
+                try:
+                    ok = self.validate(candidate)
+                except Exception as e:
+                    print(f"[model] smoke check raised: {e}")
+                    ok = False
+                if not ok:
+                    print(f"[model] rejected {candidate.version}: smoke check failed")
+                    return False
+
+            self._active = candidate
+            print(f"[model] swapped {old.version} -> {candidate.version}")
+            return True
+
+    # ---------- watching ----------
+    def _stat(self):
+        try:
+            st = os.stat(self.watch_path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _watch_loop(self):
+        pending = None
+        while not self._stop.wait(self.poll_interval):
+            st = self._stat()
+            if st is None or st == self._last_stat:
+                pending = None
+                continue
+            # wait one more interval so we don't read a half-written file
+            if st != pending:
+                pending = st
+                continue
+            self._last_stat = st
+            pending = None
+            self.reload()
+
+    def start_watching(self):
+        if self._watch_thread is not None and self._watch_thread.is_alive():
+            return
+        self._stop.clear()
+        self._watch_thread = threading.Thread(
+            target=self._watch_loop, name="model-watcher", daemon=True
+        )
+        self._watch_thread.start()
+
+    def stop_watching(self):
+        self._stop.set()
@@ -1,8 +1,14 @@
 # predict.py
 import os
-import joblib
-import numpy as np
-from sentence_transformers import SentenceTransformer
+import re
+import json
+import time
+import functools
+import urllib.request
+
+from model_registry import ModelRegistry, SMOKE_SET
+from shared_weights import SHARED_DIR, has_shared_weights
+from shape_registry import registry as shape_registry
 
 # --------------------------
 # Paths / model load
@@ -11,70 +17,46 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # your model lives in model/intent_classifier.joblib
 MODEL_PATH = os.path.join(BASE_DIR, "model", "intent_classifier.joblib")
+MODEL_WATCH_INTERVAL = float(os.environ.get("PAINT_MODEL_WATCH_INTERVAL", "2.0"))
 
-# load the saved bundle
-_bundle = joblib.load(MODEL_PATH)
-
-# expected keys from your training script:
-#   "clf", "id2label", "encoder_model_name"
-_clf = _bundle.get("clf", None)
-_id2label = _bundle.get("id2label", {})
-_encoder_model_name = _bundle.get(
-    "encoder_model_name",
-    "sentence-transformers/all-MiniLM-L6-v2"
-)
+# PAINT_SHARED_WEIGHTS=1 -> serve from the memory-mapped export in
+# model/shared (python shared_weights.py export) so forked workers share
+# one copy of the encoder weights.
+USE_SHARED_WEIGHTS = os.environ.get("PAINT_SHARED_WEIGHTS", "0") == "1"
+if USE_SHARED_WEIGHTS and has_shared_weights(SHARED_DIR):
+    MODEL_SOURCE = SHARED_DIR
+else:
+    MODEL_SOURCE = MODEL_PATH
 
-# recreate the same sentence transformer encoder
-_embedder = SentenceTransformer(_encoder_model_name)
+# PAINT_SIDECAR_URL=http://127.0.0.1:8765 -> send classification to the
+# shared inference process (inference_server.py), which micro-batches
+# requests from all workers. If it can't be reached we classify
+# in-process and leave the sidecar alone for PAINT_SIDECAR_RETRY seconds.
+SIDECAR_URL = os.environ.get("PAINT_SIDECAR_URL", "").rstrip("/")
+SIDECAR_TIMEOUT = float(os.environ.get("PAINT_SIDECAR_TIMEOUT", "2.0"))
+SIDECAR_RETRY = float(os.environ.get("PAINT_SIDECAR_RETRY", "10.0"))
+_sidecar_down_until = 0.0
 
 # --------------------------
 # Known drawable shapes + aliases
 # --------------------------
-KNOWN_SHAPES = {
-    "tree",
-    "house",
-    "windmill",
-    "train",
-    "star",
-    "flower",
-}
+# one per definition in shapes/ (see shape_registry.py)
+KNOWN_SHAPES = set(shape_registry.names())
 
-# sometimes classifier may output variations / synonyms.
-ALIAS_MAP = {
-    "home": "house",
-    "building": "house",
-    "wind mill": "windmill",
-    "wind-mill": "windmill",
-    "locomotive": "train",
-    "train engine": "train",
-    "flowers": "flower",
-    "flower plant": "flower",
-    "five pointed star": "star",
-    "5-pointed star": "star",
-    "star shape": "star",
-}
+# sometimes classifier may output variations / synonyms; each shape
+# lists its own under "aliases".
+ALIAS_MAP = shape_registry.aliases()
 
 
-def _predict_intent_label(text: str) -> str:
+def _predict_intent_label(text: str, bundle=None) -> str:
     """
     Use the sentence-transformer encoder + sklearn classifier
     to return the raw string label predicted by the model.
-    This matches your uploaded inference script. :contentReference[oaicite:4]{index=4}
+    `bundle` defaults to the registry's active model.
     """
-    if _clf is None:
-        # model not loaded, safest fallback
-        return "unknown"
-
-    # 1) embed the query (shape -> (1, 384) by default for MiniLM)
-    emb = _embedder.encode([text], convert_to_numpy=True)
-
-    # 2) classifier forward
-    # clf.predict_proba(...) -> softmax probs over classes
-    probs = _clf.predict_proba(emb)[0]
-    pred_id = int(np.argmax(probs))
-    raw_label = _id2label.get(pred_id, "unknown")
-
-    return str(raw_label)
+    if bundle is None:
+        bundle = _registry.current()
+    return bundle.predict_label(text)
 
 
 def _normalize_label(raw_label: str) -> str:
@@ -105,6 +87,113 @@ def _normalize_label(raw_label: str) -> str:
     return "unknown"
 
 
+@functools.lru_cache(maxsize=4)
+def _untrained_shapes(bundle):
+    """
+    Shapes the bundle's classifier has no label for, e.g. ones added to
+    shapes/ after it was trained. They are recognized by name or alias
+    in the text instead.
+    """
+    trained = {_normalize_label(str(label)) for label in (bundle.id2label or {}).values()}
+    return tuple(name for name in shape_registry if name not in trained)
+
+
+def _text_label(raw_label, text, bundle):
+    label = _normalize_label(raw_label)
+    if label == "unknown":
+        label = shape_registry.match_text(text, _untrained_shapes(bundle)) or "unknown"
+    return label
+
+
+def classify_texts_local(texts):
+    """
+    In-process batch classification: one encoder pass for all texts,
+    all against the same bundle. Returns [(label, version), ...].
+    """
+    bundle = _registry.current()
+    texts = list(texts)
+    raw_labels = bundle.predict_labels(texts)
+    return [(_text_label(raw, text, bundle), bundle.version) for raw, text in zip(raw_labels, texts)]
+
+
+def classify_texts_scored(texts):
+    """
+    classify_texts_local plus the classifier's probability for each
+    label: [(label, version, confidence), ...]. A shape recognized by
+    name (see _untrained_shapes) has no probability: None.
+    """
+    bundle = _registry.current()
+    texts = list(texts)
+    raw_labels, confidences = bundle.predict_labels_scored(texts)
+    out = []
+    for raw, text, conf in zip(raw_labels, texts, confidences):
+        label = _normalize_label(raw)
+        if label == "unknown":
+            label = _text_label(raw, text, bundle)
+            conf = conf if label == "unknown" else None
+        out.append((label, bundle.version, conf))
+    return out
+
+
+def _sidecar_classify(payload, parse):
+    """
+    POST `payload` to the sidecar's /classify and return parse(reply),
+    or None if the sidecar is unavailable.
+    """
+    global _sidecar_down_until
+
+    if not SIDECAR_URL or time.monotonic() < _sidecar_down_until:
+        return None
+
+    req = urllib.request.Request(
+        SIDECAR_URL + "/classify",
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=SIDECAR_TIMEOUT) as resp:
+            return parse(json.loads(resp.read().decode("utf-8")))
+    except Exception as e:
+        print(f"[predict] sidecar unavailable ({e}); classifying in-process")
+        _sidecar_down_until = time.monotonic() + SIDECAR_RETRY
+        return None
+
+
+def _classify_via_sidecar(user_text: str):
+    """
+    Returns (label, version), or None if the sidecar is unavailable.
+    """
+    return _sidecar_classify({"text": user_text}, lambda out: (out["label"], out.get("version")))
+
+
+def _classify_many_via_sidecar(texts):
+    """
+    [(label, version), ...] for all texts in one request (the sidecar
+    queues them together, so they share a batch), or None if the
+    sidecar is unavailable.
+    """
+    def parse(out):
+        results = [(r["label"], r.get("version")) for r in out["results"]]
+        if len(results) != len(texts):
+            raise ValueError(f"{len(results)} results for {len(texts)} texts")
+        return results
+
+    return _sidecar_classify({"texts": texts}, parse)
+
+
+def classify_text_versioned(user_text: str):
+    """
+    Same as classify_text, but also returns the version of the model
+    bundle that produced the label. The bundle is fetched once, so a
+    hot reload mid-request can't mix two models.
+    """
+    result = _classify_via_sidecar(user_text)
+    if result is not None:
+        return result
+    return classify_texts_local([user_text])[0]
+
+
 def classify_text(user_text: str) -> str:
     """
     Public function used by app.py.
@@ -112,11 +201,150 @@ def classify_text(user_text: str) -> str:
     2. Normalize to our drawable set.
     3. Return final label or "unknown".
     """
-    raw_label = _predict_intent_label(user_text)
-    final_label = _normalize_label(raw_label)
+    final_label, _version = classify_text_versioned(user_text)
     return final_label
 
 
+# --------------------------
+# Multi-object scenes
+# --------------------------
+# "draw a house, two trees and a star" -> one clause per object
+_CLAUSE_SPLIT = re.compile(r"\s*(?:,|;|&|\+|\band then\b|\bthen\b|\band\b|\bplus\b|\bnext to\b|\bbeside\b)\s*")
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "single": 1,
+    "two": 2, "couple": 2, "pair": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+_COUNT_RE = re.compile(r"\b(\d+|" + "|".join(NUMBER_WORDS) + r")\b")
+
+# more than this many objects won't fit the canvas legibly
+MAX_SCENE_OBJECTS = 12
+
+
+def split_clauses(user_text: str):
+    parts = [p.strip() for p in _CLAUSE_SPLIT.split(user_text or "")]
+    return [p for p in parts if p]
+
+
+def _clause_count(clause: str) -> int:
+    # "a set of three stars": a real number beats the article
+    for word in _COUNT_RE.findall(clause.lower()):
+        n = int(word) if word.isdigit() else NUMBER_WORDS[word]
+        if n != 1:
+            return max(1, n)
+    return 1
+
+
+def _classify_many(texts):
+    # one encoder pass for all clauses: one sidecar request, or in-process
+    texts = list(texts)
+    if SIDECAR_URL:
+        results = _classify_many_via_sidecar(texts)
+        if results is not None:
+            return results
+    return classify_texts_local(texts)
+
+
+def classify_scene(user_text: str):
+    """
+    Split a request into clauses and classify each one.
+    Returns (scene, version), where scene is an ordered list of
+    (label, count) pairs with unknown clauses dropped, e.g.
+    "draw a house, two trees and a star" ->
+        [("house", 1), ("tree", 2), ("star", 1)]
+    A shape named twice is merged into its first position. Total
+    objects are capped at MAX_SCENE_OBJECTS.
+    """
+    clauses = split_clauses(user_text) or [user_text]
+    results = _classify_many(clauses)
+    return _build_scene(clauses, results), results[0][1]
+
+
+def classify_scene_scored(user_text: str):
+    """
+    classify_scene plus a confidence: (scene, version, confidence), the
+    confidence being the lowest classifier probability among the clauses
+    that were kept. None through the sidecar (it returns labels only)
+    or for an empty scene.
+    """
+    clauses = split_clauses(user_text) or [user_text]
+    if SIDECAR_URL:
+        results = [(label, version, None) for label, version in _classify_many(clauses)]
+    else:
+        results = classify_texts_scored(clauses)
+    scene = _build_scene(clauses, [(label, version) for label, version, _ in results])
+    kept = [conf for label, _, conf in results if label != "unknown" and conf is not None]
+    confidence = min(kept) if scene and kept else None
+    return scene, results[0][1], confidence
+
+
+def _build_scene(clauses, results):
+    counts = {}
+    for clause, (label, _version) in zip(clauses, results):
+        if label == "unknown":
+            continue
+        counts[label] = counts.get(label, 0) + _clause_count(clause)
+
+    scene, total = [], 0
+    for label, n in counts.items():
+        n = min(n, MAX_SCENE_OBJECTS - total)
+        if n <= 0:
+            break
+        scene.append((label, n))
+        total += n
+    return scene
+
+
+def scene_label(scene) -> str:
+    """
+    "house+2 tree+star" for a scene; a lone object is just its label.
+    """
+    if not scene:
+        return "unknown"
+    return "+".join(label if n == 1 else f"{n} {label}" for label, n in scene)
+
+
+def get_model_version():
+    return _registry.version
+
+
+def get_model_load_seconds():
+    return _registry.load_seconds
+
+
+def start_model_watcher():
+    """
+    Begin polling model/ for a retrained intent_classifier.joblib.
+    New bundles are loaded in the background and swapped in after
+    passing the smoke set.
+    """
+    _registry.start_watching()
+
+
+# --------------------------
+# Model registry
+# --------------------------
+def _smoke_check(bundle) -> bool:
+    for text, expected in SMOKE_SET:
+        got = _normalize_label(_predict_intent_label(text, bundle))
+        if got != expected:
+            print(f"[model] smoke: {text!r} -> {got!r}, expected {expected!r}")
+            return False
+    return True
+
+
+_registry = ModelRegistry(
+    MODEL_SOURCE,
+    validate=_smoke_check,
+    poll_interval=MODEL_WATCH_INTERVAL,
+)
+# with a sidecar the encoder is only loaded here if we ever need to fall back;
+# PAINT_LAZY_MODEL=1 defers the load to the first classify call (tools, benchmarks)
+if not SIDECAR_URL and os.environ.get("PAINT_LAZY_MODEL", "0") != "1":
+    _registry.load()
+
+
 # Optional helper if you ever want debug info in console
 def debug_predict(user_text: str):
     raw_label = _predict_intent_label(user_text)
@@ -125,6 +353,7 @@ def debug_predict(user_text: str):
         "input": user_text,
         "raw_label": raw_label,
         "mapped_label": mapped,
+        "model_version": get_model_version(),
     }
 
 
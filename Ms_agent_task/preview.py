@@ -0,0 +1,263 @@
+# preview.py
+#
+# Low-resolution snapshots of a drawing while it is being made, so the
+# chat can show progress instead of nothing for the 20-40 s a Paint
+# session takes. preview_session() wraps the session's input backend in
+# a PreviewTap, which notes every stroke as it is sent; a publisher
+# thread turns those into a small PNG every PAINT_PREVIEW_INTERVAL
+# seconds (only when something changed) and posts it on the board under
+# the job's key. The app polls the board for the job its session waits
+# on (dcc.Interval) and shows the newest frame.
+#
+# Frames are drawn from the strokes, so every backend (Paint, dry runs,
+# virtual displays) gets the same preview and each frame only adds the
+# strokes since the last one. With PAINT_PREVIEW_SOURCE=screen, a
+# backend that can take screenshots (pyautogui) is captured instead.
+#
+#   PAINT_PREVIEW=0               off
+#   PAINT_PREVIEW_INTERVAL=0.5    seconds between frames (and polls)
+#   PAINT_PREVIEW_SCALE=0.15      frame size relative to the canvas
+#   PAINT_PREVIEW_SOURCE=strokes  or "screen"
+import io
+import os
+import time
+import base64
+import threading
+import contextlib
+
+from PIL import Image, ImageDraw
+
+from paint_driver import CANVAS_W, CANVAS_H, get_input_backend, use_input_backend, get_canvas_origin
+
+PREVIEW_ENABLED = os.environ.get("PAINT_PREVIEW", "1") != "0"
+PREVIEW_INTERVAL_S = float(os.environ.get("PAINT_PREVIEW_INTERVAL", "0.5"))
+PREVIEW_SCALE = float(os.environ.get("PAINT_PREVIEW_SCALE", "0.15"))
+PREVIEW_SOURCE = os.environ.get("PAINT_PREVIEW_SOURCE", "strokes")
+
+# raster.BRUSH_PX (raster imports drawings, which imports this module)
+_BRUSH_PX = 3
+
+# input phase -> what the preview says meanwhile
+STAGE_TEXT = {
+    "launch": "Opening Paint",
+    "activate": "Opening Paint",
+    "maximize": "Opening Paint",
+    "zoom": "Setting up the canvas",
+    "canvas_size": "Setting up the canvas",
+    "save_as": "Setting up the canvas",
+    "brush": "Setting up the canvas",
+    "draw": "Drawing",
+    "settle": "Drawing",
+    "save": "Saving",
+    "save_as_final": "Saving",
+    "close": "Saving",
+}
+STAGE_ORDER = ("Starting", "Opening Paint", "Setting up the canvas", "Drawing", "Saving")
+
+
+def preview_key(shape_key, objects, quality):
+    """
+    One key per distinct drawing job (as scheduler.job_key): requests
+    merged into one job watch the same preview.
+    """
+    return f"{shape_key}|{'-'.join(objects or ())}|{quality}"
+
+
+class PreviewTap:
+    """
+    Forwards every call to `inner` and keeps the segments drawn so far,
+    in screen coordinates.
+    """
+
+    def __init__(self, inner):
+        self._inner = inner
+        self._pos = None
+        self._lock = threading.Lock()
+        self.segments = []
+        self.phase = None
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+    def begin_phase(self, name):
+        self.phase = name
+        begin = getattr(self._inner, "begin_phase", None)
+        if begin is not None:
+            begin(name)
+
+    def end_phase(self, name):
+        end = getattr(self._inner, "end_phase", None)
+        if end is not None:
+            end(name)
+
+    @staticmethod
+    def _xy(x, y):
+        if isinstance(x, (tuple, list)):
+            return int(x[0]), int(x[1])
+        return int(x), int(y)
+
+    def _line_to(self, x, y):
+        if self._pos is None:
+            self._pos = tuple(self._inner.position())
+        with self._lock:
+            self.segments.append((self._pos, (x, y)))
+        self._pos = (x, y)
+
+    def moveTo(self, x=None, y=None, *args, **kwargs):
+        self._inner.moveTo(x, y, *args, **kwargs)
+        self._pos = self._xy(x, y)
+
+    def dragTo(self, x=None, y=None, *args, **kwargs):
+        self._inner.dragTo(x, y, *args, **kwargs)
+        self._line_to(*self._xy(x, y))
+
+    def dragRel(self, xOffset=0, yOffset=0, *args, **kwargs):
+        self._inner.dragRel(xOffset, yOffset, *args, **kwargs)
+        if self._pos is None:
+            self._pos = tuple(self._inner.position())
+            x, y = self._pos
+        else:
+            x, y = self._pos
+        self._line_to(x + int(xOffset), y + int(yOffset))
+
+    def new_segments(self, start):
+        with self._lock:
+            return self.segments[start:]
+
+
+class PreviewBoard:
+    """
+    Newest frame per job key, and which key each browser session waits
+    on. Frames are {"seq", "stage", "image", "started", "updated"}.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frames = {}
+        self._watching = {}
+
+    def publish(self, key, stage, image=None):
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is None:
+                frame = self._frames[key] = {"seq": 0, "stage": None, "image": None,
+                                             "started": time.time(), "updated": None}
+            frame["seq"] += 1
+            frame["stage"] = stage
+            if image is not None:
+                frame["image"] = image
+            frame["updated"] = time.time()
+
+    def finish(self, key):
+        with self._lock:
+            self._frames.pop(key, None)
+
+    def watch(self, sid, key):
+        with self._lock:
+            self._watching[sid] = key
+
+    def unwatch(self, sid):
+        with self._lock:
+            self._watching.pop(sid, None)
+
+    def is_watching(self, sid):
+        with self._lock:
+            return sid in self._watching
+
+    def frame_for(self, sid):
+        """
+        Copy of the newest frame of the job `sid` waits on, or None.
+        """
+        with self._lock:
+            frame = self._frames.get(self._watching.get(sid))
+            return dict(frame) if frame is not None else None
+
+
+board = PreviewBoard()
+
+
+class _Publisher:
+    def __init__(self, key, tap, origin, interval_s, scale, source):
+        self.key = key
+        self.tap = tap
+        self.origin = origin
+        self.interval_s = interval_s
+        self.scale = scale
+        self.size = (max(1, int(CANVAS_W * scale)), max(1, int(CANVAS_H * scale)))
+        self.screen = source == "screen" and hasattr(tap._inner, "screenshot")
+        self.img = Image.new("L", self.size, 255)
+        self.draw = ImageDraw.Draw(self.img)
+        self.width = max(1, int(round(_BRUSH_PX * scale)))
+        self.drawn = 0
+        self.stage = None
+        self.stop = threading.Event()
+        self.frames = 0
+
+    def _to_px(self, p):
+        return (int((p[0] - self.origin[0]) * self.scale), int((p[1] - self.origin[1]) * self.scale))
+
+    def _render(self):
+        if self.screen:
+            shot = self.tap._inner.screenshot(region=(*self.origin, CANVAS_W, CANVAS_H))
+            return shot.convert("L").resize(self.size)
+        new = self.tap.new_segments(self.drawn)
+        if not new:
+            return None
+        for a, b in new:
+            self.draw.line([self._to_px(a), self._to_px(b)], fill=0, width=self.width)
+        self.drawn += len(new)
+        return self.img
+
+    def tick(self):
+        stage = STAGE_TEXT.get(self.tap.phase, self.stage)
+        if self.stage and STAGE_ORDER.index(stage) < STAGE_ORDER.index(self.stage):
+            # Paint is activated again after the first save; don't go back
+            stage = self.stage
+        img = self._render() if stage == "Drawing" or (stage == "Saving" and not self.screen) else None
+        if img is None and stage == self.stage:
+            return
+        self.stage = stage
+        image = None
+        if img is not None:
+            buf = io.BytesIO()
+            img.save(buf, format="PNG")
+            image = "data:image/png;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+            self.frames += 1
+        board.publish(self.key, stage, image)
+
+    def run(self):
+        self.stage = STAGE_TEXT.get(self.tap.phase, "Starting")
+        board.publish(self.key, self.stage)
+        while not self.stop.wait(self.interval_s):
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"[preview] {self.key}: {e}")
+                return
+
+
+@contextlib.contextmanager
+def preview_session(key, interval_s=None, scale=None, source=None):
+    """
+    Publish snapshots of what this thread draws inside the block under
+    `key`; a no-op when PAINT_PREVIEW=0 or key is None.
+    """
+    if not PREVIEW_ENABLED or key is None:
+        yield None
+        return
+    tap = PreviewTap(get_input_backend())
+    pub = _Publisher(
+        key, tap, get_canvas_origin(),
+        PREVIEW_INTERVAL_S if interval_s is None else interval_s,
+        PREVIEW_SCALE if scale is None else scale,
+        source or PREVIEW_SOURCE,
+    )
+    thread = threading.Thread(target=pub.run, name="preview", daemon=True)
+    thread.start()
+    try:
+        with use_input_backend(tap):
+            yield pub
+    finally:
+        pub.stop.set()
+        thread.join()
+        board.finish(key)
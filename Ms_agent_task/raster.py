@@ -0,0 +1,61 @@
+# raster.py
+#
+# Paint-free rendering of the draw_*_at geometry: run a shape against the
+# recording input backend and stroke the captured polylines onto a PIL
+# image. Used by batch_render.py; nothing here touches the mouse.
+from PIL import Image, ImageDraw
+
+from paint_driver import use_input_backend
+from input_sim import RecordingBackend
+from drawings import SHAPE_FUNCS
+from layout import shape_extent, scale_fn
+
+# Paint's brush at the size _force_brush_tool leaves selected
+BRUSH_PX = 3
+INK = (0, 0, 0)
+PAPER = (255, 255, 255)
+
+
+def record_shape(label, cx, cy, scale):
+    """
+    Polylines of SHAPE_FUNCS[label] drawn with its anchor at (cx, cy).
+    """
+    rec = RecordingBackend(pause=0.0)
+    with use_input_backend(rec):
+        SHAPE_FUNCS[label](cx, cy, scale_fn(scale))
+    return rec.polylines()
+
+
+def rasterize(polylines, size, origin=(0, 0), width=BRUSH_PX, ink=INK, paper=PAPER):
+    """
+    Stroke `polylines` (screen coordinates) onto a new RGB image of
+    `size`; `origin` is the screen position of the image's top-left.
+    """
+    img = Image.new("RGB", tuple(size), paper)
+    draw = ImageDraw.Draw(img)
+    ox, oy = origin
+    for line in polylines:
+        pts = [(x - ox, y - oy) for x, y in line]
+        if len(pts) == 1:
+            pts = pts * 2
+        draw.line(pts, fill=ink, width=width, joint="curve")
+    return img
+
+
+def render_shape(label, size, scale, offset=(0, 0), width=BRUSH_PX):
+    """
+    SHAPE_FUNCS[label] at `scale`, its bounding box centered on a
+    `size` image and then moved by `offset` px. Returns (image, bbox)
+    with bbox = (left, top, right, bottom) in image pixels.
+    """
+    w, h = size
+    left, top, right, bottom = shape_extent(SHAPE_FUNCS[label])
+    cx = w / 2 - (left + right) / 2 * scale + offset[0]
+    cy = h / 2 - (top + bottom) / 2 * scale + offset[1]
+    cx, cy = int(round(cx)), int(round(cy))
+    lines = record_shape(label, cx, cy, scale)
+    img = rasterize(lines, size, width=width)
+    xs = [x for line in lines for x, _ in line]
+    ys = [y for line in lines for _, y in line]
+    bbox = (min(xs), min(ys), max(xs), max(ys)) if xs else (0, 0, 0, 0)
+    return img, bbox
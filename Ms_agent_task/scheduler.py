@@ -0,0 +1,227 @@
+# scheduler.py
+#
+# Front door for drawing jobs: the app submits here instead of calling
+# perform_drawing directly.
+#   - identical requests (same scene, same quality tier) arriving while
+#     one is queued or running are merged: it runs once and every waiter
+#     gets its result
+#   - jobs wait in a priority queue, interactive before normal before
+#     batch, FIFO within a class; merging a higher-priority request into
+#     a queued job promotes the job
+#   - the queue is bounded: when it is full, submit() raises
+#     SchedulerBusy right away instead of letting latency grow
+#   - worker threads start with the first submit() in each process:
+#     threads don't survive fork(), and gunicorn forks a preloaded app
+#
+# Executed / merged / rejected counts and queue waits are exported with
+# metrics.py; stats() adds percentiles over the most recent jobs.
+import os
+import time
+import heapq
+import itertools
+import threading
+import collections
+
+from drawings import perform_drawing, scene_objects
+from metrics import Counter, Histogram, detached_request, adopt, percentiles
+
+# class -> rank; lower runs first
+PRIORITIES = {"interactive": 0, "normal": 1, "batch": 2}
+
+SCHED_REQUESTS = Counter(
+    "paint_sched_requests_total",
+    "Drawing requests by what the scheduler did with them (executed, merged, rejected).",
+    labelnames=("result",),
+)
+SCHED_QUEUE_SECONDS = Histogram(
+    "paint_sched_queue_seconds",
+    "Time a drawing job waited in the queue before a worker started it.",
+    labelnames=("priority",),
+)
+
+
+class SchedulerBusy(RuntimeError):
+    """
+    The drawing queue is full; the caller should try again later.
+    """
+
+
+class SchedulerTimeout(RuntimeError):
+    """
+    A drawing did not finish within the scheduler's timeout.
+    """
+
+
+class DrawingFailed(RuntimeError):
+    """
+    The drawing raised; what it raised is the __cause__. Every request
+    merged into the job gets its own DrawingFailed.
+    """
+
+
+def job_key(label, quality=None):
+    """
+    Requests with equal keys draw the same picture: ("house-tree",
+    ("house", "tree", "tree"), "full") for "house+2 tree" at full.
+    """
+    shape_key, objects = scene_objects(label)
+    return shape_key, tuple(objects) if objects else None, quality
+
+
+class _Job:
+    def __init__(self, key, label, quality, priority):
+        self.key = key
+        self.label = label
+        self.quality = quality
+        self.priority = priority
+        self.rank = PRIORITIES[priority]
+        self.enqueued = time.perf_counter()
+        self.started = None
+        self.waiters = 1
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.report = None
+
+
+class DrawScheduler:
+    """
+    Runs drawing jobs on `workers` threads, with at most `max_queue`
+    jobs waiting. draw(label, quality=...) does the work; a caller
+    waits at most `timeout` seconds for it.
+    """
+
+    def __init__(self, workers=1, max_queue=8, draw=perform_drawing, recent=1000, timeout=300.0):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._draw = draw
+        self._waits = collections.deque(maxlen=recent)
+        self._counts = {"executed": 0, "merged": 0, "rejected": 0}
+        self._reset()
+        if hasattr(os, "register_at_fork"):
+            # the parent's locks may be held and its jobs are not ours
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._cond = threading.Condition()
+        self._heap = []
+        self._seq = itertools.count()
+        self._inflight = {}  # key -> job, queued or running
+        self._queued = 0
+        self._threads = []
+        self._pid = os.getpid()
+
+    @classmethod
+    def from_env(cls):
+        """
+        PAINT_DRAW_WORKERS (default 1: there is one desktop),
+        PAINT_DRAW_QUEUE (default 8) and PAINT_DRAW_TIMEOUT (seconds a
+        request waits for its drawing, default 300).
+        """
+        return cls(
+            workers=int(os.environ.get("PAINT_DRAW_WORKERS", "1")),
+            max_queue=int(os.environ.get("PAINT_DRAW_QUEUE", "8")),
+            timeout=float(os.environ.get("PAINT_DRAW_TIMEOUT", "300")),
+        )
+
+    def _ensure_workers(self):
+        # caller holds self._cond
+        if self._pid != os.getpid():
+            # forked without register_at_fork: the threads are the parent's
+            self._threads, self._pid = [], os.getpid()
+        self._threads = [t for t in self._threads if t.is_alive()]
+        for i in range(len(self._threads), self.workers):
+            t = threading.Thread(target=self._worker, name=f"draw-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _count(self, result):
+        self._counts[result] += 1
+        SCHED_REQUESTS.inc(result=result)
+
+    def submit(self, label, quality=None, priority="normal"):
+        """
+        Draw `label` (or a scene) and return perform_drawing's result,
+        blocking until it is done. Raises SchedulerBusy if the queue is
+        full, SchedulerTimeout if the drawing takes longer than the
+        timeout, and DrawingFailed (from the original) if it raised.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"unknown priority {priority!r} (expected one of {', '.join(PRIORITIES)})")
+        key = job_key(label, quality)
+        with self._cond:
+            self._ensure_workers()
+            job = self._inflight.get(key)
+            if job is not None:
+                job.waiters += 1
+                self._count("merged")
+                if job.started is None and PRIORITIES[priority] < job.rank:
+                    # the old heap entry goes stale, see _next_job
+                    job.priority, job.rank = priority, PRIORITIES[priority]
+                    heapq.heappush(self._heap, (job.rank, next(self._seq), job))
+            else:
+                if self._queued >= self.max_queue:
+                    self._count("rejected")
+                    raise SchedulerBusy(f"{self._queued} drawings already queued")
+                job = _Job(key, label, quality, priority)
+                self._inflight[key] = job
+                self._queued += 1
+                heapq.heappush(self._heap, (job.rank, next(self._seq), job))
+                self._count("executed")
+                self._cond.notify()
+
+        if not job.done.wait(self.timeout):
+            raise SchedulerTimeout(f"no drawing after {self.timeout:g} s")
+        # the drawing's stage spans belong to every request it served
+        adopt(job.report)
+        if job.error is not None:
+            # not job.error itself: its traceback is shared by every waiter
+            raise DrawingFailed(f"drawing {job.key[0]!r} failed: {job.error!r}") from job.error
+        return job.result
+
+    def _next_job(self):
+        # caller holds self._cond
+        while True:
+            while not self._heap:
+                self._cond.wait()
+            rank, _, job = heapq.heappop(self._heap)
+            if job.started is None and rank == job.rank:
+                return job
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                job.started = time.perf_counter()
+                self._queued -= 1
+                wait = job.started - job.enqueued
+                self._waits.append(wait)
+            SCHED_QUEUE_SECONDS.observe(wait, priority=job.priority)
+
+            try:
+                with detached_request() as report:
+                    job.result = self._draw(job.label, quality=job.quality)
+            except Exception as e:
+                job.error = e
+            finally:
+                job.report = report
+                with self._cond:
+                    self._inflight.pop(job.key, None)
+                job.done.set()
+
+    def stats(self):
+        with self._cond:
+            waits = list(self._waits)
+            queued = self._queued
+            running = len(self._inflight) - queued
+            counts = dict(self._counts)
+        return {
+            "workers": self.workers,
+            "alive": sum(t.is_alive() for t in self._threads),
+            "max_queue": self.max_queue,
+            "queued": queued,
+            "running": running,
+            **counts,
+            "queue_wait": percentiles(waits, ps=(50, 90, 99)),
+        }
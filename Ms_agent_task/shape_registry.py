@@ -0,0 +1,470 @@
+# shape_registry.py
+#
+# The drawable shapes, as data: one JSON file per shape in shapes/ (and
+# in every directory on PAINT_SHAPES_PATH, which may also replace a
+# built-in one), loaded and compiled once at import. A definition gives
+# the shape's name and aliases, the lengths it is built from (canvas px
+# at scale 1.0, passed through the caller's S) and its strokes, in
+# coordinates relative to the (cx, cy) anchor it is drawn at:
+#
+#   {"name": "car",
+#    "aliases": ["automobile"],
+#    "params": {"body_w": 260, "body_h": 50},
+#    "let": {"left": "-(body_w // 2)", "top": "-(body_h // 2)"},
+#    "strokes": [{"rect": ["left", "top", "-left", "-top"], "dur": 0.12}]}
+#
+# Any number may also be an arithmetic expression over the params, lets
+# and loop variables (see _compile_expr). Primitives:
+#
+#   {"line": [x1, y1, x2, y2]}
+#   {"rect": [x1, y1, x2, y2]}                 outline, from bottom-left
+#   {"polyline": [[x, y], ...], "close": true}
+#   {"polyline": {"for": "i", "in": 10, "let": {...}, "point": [x, y]}}
+#   {"path": [x, y], "by": [[dx, dy], ...]}    relative drags
+#   {"circle": [x, y, r], "steps": 24, "closed": true}
+#   {"for": "i" | ["a", "b"], "in": n | [...] | "expr", "let": {...}, "do": [...]}
+#
+# each optionally with "dur" (seconds per drag), "repeat" (times to go
+# over it, capped by the quality tier) and "extras": true (skipped by
+# tiers without extras). paint_driver.shape_drawer turns a Shape into
+# the draw_<name>_at(cx, cy, S) drawings.SHAPE_FUNCS maps its name to;
+# predict maps classifier labels and aliases through the same registry.
+#
+#   python shape_registry.py                  # the shapes and their size
+#   python shape_registry.py check my.json    # validate definitions
+import os
+import re
+import ast
+import sys
+import json
+import math
+import types
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SHAPES_DIR = os.path.join(BASE_DIR, "shapes")
+
+DEFAULT_DUR = 0.1
+
+_NAME_RE = re.compile(r"[a-z][a-z0-9_]*")
+
+# what an expression may call or name besides its shape's variables
+_FUNCS = {
+    "cos": math.cos, "sin": math.sin, "radians": math.radians, "sqrt": math.sqrt,
+    "int": int, "round": round, "min": min, "max": max, "abs": abs, "range": range,
+}
+_GLOBALS = {"__builtins__": {}, "pi": math.pi, **_FUNCS}
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp,
+    ast.Call, ast.Name, ast.Load, ast.Constant,
+    ast.operator, ast.unaryop, ast.boolop, ast.cmpop,
+)
+_PRIMITIVES = ("line", "rect", "polyline", "path", "circle", "for")
+_COMMON_KEYS = {"dur", "repeat", "extras"}
+_KEYS = {
+    "line": set(), "rect": set(), "polyline": {"close"}, "path": {"by"},
+    "circle": {"steps", "closed"}, "for": {"in", "let", "do"},
+}
+
+
+class ShapeError(ValueError):
+    pass
+
+
+# ---------- expressions ----------
+def _compile_expr(src, names, where):
+    """
+    A JSON number stays as is; a string is parsed as a Python expression
+    limited to arithmetic, comparisons, "a if c else b" and calls to S
+    and _FUNCS over `names`, and compiled once.
+    """
+    if isinstance(src, bool) or not isinstance(src, (int, float, str)):
+        raise ShapeError(f"{where}: expected a number or an expression, got {src!r}")
+    if not isinstance(src, str):
+        return src
+    try:
+        tree = ast.parse(src.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ShapeError(f"{where}: bad expression {src!r} ({e.msg})")
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ShapeError(f"{where}: {type(node).__name__} is not allowed in {src!r}")
+        if isinstance(node, ast.Constant) and (isinstance(node.value, bool)
+                                               or not isinstance(node.value, (int, float))):
+            raise ShapeError(f"{where}: only numbers may appear in {src!r}")
+        if isinstance(node, ast.Call):
+            fn = node.func.id if isinstance(node.func, ast.Name) else None
+            if fn not in _FUNCS and fn != "S" or node.keywords:
+                raise ShapeError(f"{where}: can't call {ast.unparse(node.func)} in {src!r}")
+        if isinstance(node, ast.Name) and node.id not in names and node.id not in _GLOBALS:
+            raise ShapeError(f"{where}: unknown name {node.id!r} in {src!r}")
+    return compile(tree, f"<{where}>", "eval")
+
+
+def _ev(value, env):
+    return eval(value, _GLOBALS, env) if isinstance(value, types.CodeType) else value
+
+
+def _at(anchor, offset):
+    # truncated like the int(cx + r * cos(a)) of the hand-written shapes
+    p = anchor + offset
+    return p if isinstance(p, int) else int(p)
+
+
+def _iterable(value):
+    return range(value) if isinstance(value, int) else value
+
+
+# ---------- compiling ----------
+class _Compiler:
+    def __init__(self, where):
+        self.where = where
+
+    def expr(self, src, names, key):
+        return _compile_expr(src, names, f"{self.where}: {key}")
+
+    def exprs(self, srcs, n, names, key):
+        if not isinstance(srcs, list) or len(srcs) != n:
+            raise ShapeError(f"{self.where}: {key} must be a list of {n} values, got {srcs!r}")
+        return tuple(self.expr(s, names, key) for s in srcs)
+
+    def lets(self, lets, names, key):
+        if not isinstance(lets, dict):
+            raise ShapeError(f"{self.where}: {key} must be an object")
+        out = []
+        for name, src in lets.items():
+            if not _NAME_RE.fullmatch(name):
+                raise ShapeError(f"{self.where}: bad variable name {name!r}")
+            out.append((name, self.expr(src, names, f"{key}.{name}")))
+            names = names | {name}
+        return tuple(out), names
+
+    def strokes(self, strokes, names, key="strokes"):
+        if not isinstance(strokes, list):
+            raise ShapeError(f"{self.where}: {key} must be a list")
+        return tuple(self.stroke(s, names, f"{key}[{i}]") for i, s in enumerate(strokes))
+
+    def stroke(self, spec, names, key):
+        kinds = [k for k in _PRIMITIVES if k in (spec if isinstance(spec, dict) else {})]
+        if len(kinds) != 1:
+            raise ShapeError(f"{self.where}: {key} needs exactly one of {', '.join(_PRIMITIVES)}")
+        kind = kinds[0]
+        unknown = set(spec) - {kind} - _KEYS[kind] - _COMMON_KEYS
+        if unknown:
+            raise ShapeError(f"{self.where}: {key}: unknown keys {', '.join(sorted(unknown))}")
+        extras = bool(spec.get("extras", False))
+        repeat = spec.get("repeat", 1)
+        if isinstance(repeat, bool) or not isinstance(repeat, int) or repeat < 1:
+            raise ShapeError(f"{self.where}: {key}: repeat must be a positive integer")
+        dur = self.expr(spec.get("dur", DEFAULT_DUR), names, f"{key}.dur")
+        where = f"{key}.{kind}"
+        value = spec[kind]
+
+        if kind in ("line", "rect"):
+            data = self.exprs(value, 4, names, where)
+        elif kind == "circle":
+            steps = spec.get("steps", 24)
+            if isinstance(steps, bool) or not isinstance(steps, int) or steps < 3:
+                raise ShapeError(f"{self.where}: {key}: steps must be an integer >= 3")
+            data = (self.exprs(value, 3, names, where), steps, bool(spec.get("closed", True)))
+        elif kind == "path":
+            by = spec.get("by")
+            if not isinstance(by, list) or not by:
+                raise ShapeError(f"{self.where}: {key}: a path needs \"by\": [[dx, dy], ...]")
+            data = (self.exprs(value, 2, names, where),
+                    tuple(self.exprs(d, 2, names, f"{key}.by[{i}]") for i, d in enumerate(by)))
+        elif kind == "polyline":
+            close = bool(spec.get("close", False))
+            if isinstance(value, dict):
+                var, it, lets, inner = self.loop(value, names, where)
+                point = self.exprs(value.get("point"), 2, inner, f"{where}.point")
+                data = ("for", (var, it, lets, point), close)
+            else:
+                if not isinstance(value, list) or len(value) < 2:
+                    raise ShapeError(f"{self.where}: {where} needs at least two points")
+                data = ("points", tuple(self.exprs(p, 2, names, f"{where}[{i}]")
+                                        for i, p in enumerate(value)), close)
+        else:
+            var, it, lets, inner = self.loop(spec, names, key)
+            data = (var, it, lets, self.strokes(spec.get("do"), inner, f"{key}.do"))
+        return (kind, extras, repeat, dur, data)
+
+    def loop(self, spec, names, key):
+        var = spec.get("for")
+        var = tuple(var) if isinstance(var, list) else (var,)
+        if not var or not all(isinstance(v, str) and _NAME_RE.fullmatch(v) for v in var):
+            raise ShapeError(f"{self.where}: {key}: \"for\" must name a variable or a list of them")
+        it = spec.get("in")
+        if isinstance(it, list):
+            # literal values, or tuples of them for "for": ["a", "b"]
+            it = tuple(self.exprs(v, len(var), names, f"{key}.in") if len(var) > 1
+                       else self.expr(v, names, f"{key}.in") for v in it)
+        else:
+            it = self.expr(it, names, f"{key}.in")
+        lets, inner = self.lets(spec.get("let", {}), names | set(var), f"{key}.let")
+        return var, it, lets, inner
+
+
+class Shape:
+    """
+    One compiled definition. moves() yields the input it stands for.
+    """
+
+    def __init__(self, name, aliases, params, lets, strokes, source=None):
+        self.name = name
+        self.aliases = aliases
+        self.params = params
+        self.lets = lets
+        self.strokes = strokes
+        self.source = source
+        terms = sorted({name, *aliases}, key=len, reverse=True)
+        # "two cars" as well as "a car"
+        self.pattern = re.compile(r"\b(?:" + "|".join(re.escape(t) for t in terms) + r")s?\b")
+
+    @classmethod
+    def from_dict(cls, spec, source=None):
+        where = source or spec.get("name", "<shape>")
+        if not isinstance(spec, dict):
+            raise ShapeError(f"{where}: a shape definition must be a JSON object")
+        unknown = set(spec) - {"name", "aliases", "params", "let", "strokes", "description"}
+        if unknown:
+            raise ShapeError(f"{where}: unknown keys {', '.join(sorted(unknown))}")
+        name = spec.get("name")
+        if not isinstance(name, str) or not _NAME_RE.fullmatch(name):
+            raise ShapeError(f"{where}: name must be lowercase letters, digits and _, got {name!r}")
+        aliases = spec.get("aliases", [])
+        if not isinstance(aliases, list) or not all(isinstance(a, str) and a.strip() for a in aliases):
+            raise ShapeError(f"{where}: aliases must be a list of strings")
+        aliases = tuple(a.strip().lower() for a in aliases)
+
+        params = spec.get("params", {})
+        if not isinstance(params, dict):
+            raise ShapeError(f"{where}: params must be an object")
+        for key, value in params.items():
+            if not _NAME_RE.fullmatch(key) or isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ShapeError(f"{where}: params.{key} must be a number of px at scale 1.0")
+        compiler = _Compiler(where)
+        lets, names = compiler.lets(spec.get("let", {}), set(params) | {"S"}, "let")
+        strokes = compiler.strokes(spec.get("strokes"), names)
+        if not strokes:
+            raise ShapeError(f"{where}: no strokes")
+        return cls(name, aliases, dict(params), lets, strokes, source)
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                spec = json.load(f)
+        except ValueError as e:
+            raise ShapeError(f"{path}: not valid JSON ({e})")
+        return cls.from_dict(spec, source=path)
+
+    def moves(self, cx, cy, S, extras=True, steps=None, repeats=None):
+        """
+        ("moveTo", x, y, 0) / ("dragTo", x, y, dur) / ("dragRel", dx, dy,
+        dur) for the shape anchored at (cx, cy); S scales the params,
+        steps(n) and repeats(n) apply the quality tier to circles and
+        repeated strokes, extras=False skips the "extras" strokes.
+        """
+        env = {"S": S}
+        for key, value in self.params.items():
+            env[key] = S(value)
+        for key, value in self.lets:
+            env[key] = _ev(value, env)
+        tier = (extras, steps or (lambda n: n), repeats or (lambda n: n))
+        return self._run(self.strokes, env, cx, cy, tier)
+
+    def _run(self, strokes, env, cx, cy, tier):
+        extras, steps, repeats = tier
+        for kind, only_extras, repeat, dur, data in strokes:
+            if only_extras and not extras:
+                continue
+            if kind == "for":
+                var, it, lets, body = data
+                for scope in self._scopes(var, it, lets, env):
+                    yield from self._run(body, scope, cx, cy, tier)
+                continue
+            dur = _ev(dur, env)
+            for _ in range(repeats(repeat)):
+                if kind == "line":
+                    x1, y1, x2, y2 = (_ev(v, env) for v in data)
+                    yield ("moveTo", _at(cx, x1), _at(cy, y1), 0)
+                    yield ("dragTo", _at(cx, x2), _at(cy, y2), dur)
+                elif kind == "rect":
+                    x1, y1, x2, y2 = (_ev(v, env) for v in data)
+                    left, right = sorted((_at(cx, x1), _at(cx, x2)))
+                    top, bottom = sorted((_at(cy, y1), _at(cy, y2)))
+                    yield ("moveTo", left, bottom, 0)
+                    for x, y in ((right, bottom), (right, top), (left, top), (left, bottom)):
+                        yield ("dragTo", x, y, dur)
+                elif kind == "circle":
+                    (x, y, r), n, closed = data
+                    ox, oy, r = _at(cx, _ev(x, env)), _at(cy, _ev(y, env)), _ev(r, env)
+                    n = steps(n)
+                    for i in range(n + 1 if closed else n):
+                        ang = 2 * math.pi * i / n
+                        yield ("dragTo" if i else "moveTo", int(ox + r * math.cos(ang)),
+                               int(oy + r * math.sin(ang)), dur if i else 0)
+                elif kind == "path":
+                    (x, y), by = data
+                    yield ("moveTo", _at(cx, _ev(x, env)), _at(cy, _ev(y, env)), 0)
+                    for dx, dy in by:
+                        yield ("dragRel", _ev(dx, env), _ev(dy, env), dur)
+                else:
+                    pts = list(self._points(data, env, cx, cy))
+                    yield ("moveTo", pts[0][0], pts[0][1], 0)
+                    for x, y in pts[1:] + (pts[:1] if data[2] else []):
+                        yield ("dragTo", x, y, dur)
+
+    @staticmethod
+    def _scopes(var, it, lets, env):
+        values = (tuple(_ev(v, env) for v in item) if isinstance(item, tuple) else _ev(item, env)
+                  for item in it) if isinstance(it, tuple) else _iterable(_ev(it, env))
+        for value in values:
+            scope = dict(env)
+            if len(var) == 1:
+                scope[var[0]] = value
+            else:
+                scope.update(zip(var, value))
+            for key, expr in lets:
+                scope[key] = _ev(expr, scope)
+            yield scope
+
+    def _points(self, data, env, cx, cy):
+        form, spec, _close = data
+        if form == "points":
+            for x, y in spec:
+                yield _at(cx, _ev(x, env)), _at(cy, _ev(y, env))
+            return
+        var, it, lets, (x, y) = spec
+        for scope in self._scopes(var, it, lets, env):
+            yield _at(cx, _ev(x, scope)), _at(cy, _ev(y, scope))
+
+
+class ShapeRegistry:
+    """
+    The loaded shapes by name, in file name order, and their aliases.
+    """
+
+    def __init__(self, shapes=()):
+        self._shapes = {}
+        self._aliases = {}
+        for shape in shapes:
+            self.add(shape)
+
+    @classmethod
+    def load(cls, dirs):
+        """
+        Every *.json in `dirs`; a shape in a later directory replaces
+        the one of the same name in an earlier one.
+        """
+        reg = cls()
+        for d in dirs:
+            if not os.path.isdir(d):
+                continue
+            for name in sorted(os.listdir(d)):
+                if name.endswith(".json"):
+                    reg.add(Shape.load(os.path.join(d, name)), replace=True)
+        return reg
+
+    def add(self, shape, replace=False):
+        old = self._shapes.get(shape.name)
+        if old is not None and not replace:
+            raise ShapeError(f"{shape.source}: shape {shape.name!r} is already defined in {old.source}")
+        if old is not None:
+            self._aliases = {a: n for a, n in self._aliases.items() if n != shape.name}
+        for alias in shape.aliases:
+            owner = self._aliases.get(alias) or (alias if alias in self._shapes else None)
+            if owner not in (None, shape.name):
+                raise ShapeError(f"{shape.source}: alias {alias!r} already belongs to {owner!r}")
+            self._aliases[alias] = shape.name
+        if shape.name in self._aliases and self._aliases[shape.name] != shape.name:
+            raise ShapeError(f"{shape.source}: {shape.name!r} is an alias of {self._aliases[shape.name]!r}")
+        self._shapes[shape.name] = shape
+
+    def __contains__(self, name):
+        return name in self._shapes
+
+    def __iter__(self):
+        return iter(self._shapes)
+
+    def __len__(self):
+        return len(self._shapes)
+
+    def __getitem__(self, name):
+        return self._shapes[name]
+
+    def items(self):
+        return self._shapes.items()
+
+    def names(self):
+        return list(self._shapes)
+
+    def aliases(self):
+        """
+        {alias: shape name}
+        """
+        return dict(self._aliases)
+
+    def match_text(self, text, names=None):
+        """
+        The first of `names` (default: all shapes) whose name or an alias
+        appears as words in `text`, or None.
+        """
+        text = (text or "").lower()
+        for name in (self._shapes if names is None else names):
+            shape = self._shapes.get(name)
+            if shape is not None and shape.pattern.search(text):
+                return name
+        return None
+
+
+def shape_dirs():
+    """
+    shapes/ plus the directories on PAINT_SHAPES_PATH, in that order.
+    """
+    extra = os.environ.get("PAINT_SHAPES_PATH", "")
+    return [SHAPES_DIR] + [d for d in extra.split(os.pathsep) if d]
+
+
+registry = ShapeRegistry.load(shape_dirs())
+
+
+# --------------------------
+# CLI
+# --------------------------
+def _count(shape):
+    moves = list(shape.moves(0, 0, lambda x: int(round(x * 1.2))))
+    return sum(1 for m in moves if m[0] == "moveTo"), len(moves)
+
+
+def main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="List or validate shape definitions.")
+    sub = ap.add_subparsers(dest="cmd")
+    p = sub.add_parser("check", help="compile definition files and report errors")
+    p.add_argument("files", nargs="+")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "check":
+        failed = 0
+        for path in args.files:
+            try:
+                shape = Shape.load(path)
+            except (OSError, ShapeError) as e:
+                print(f"error: {e}")
+                failed += 1
+                continue
+            strokes, moves = _count(shape)
+            print(f"ok: {shape.name} ({strokes} strokes, {moves} moves at full quality)")
+        return 1 if failed else 0
+
+    print(f"{'shape':<10}{'strokes':>8}{'moves':>7}  aliases")
+    for name, shape in registry.items():
+        strokes, moves = _count(shape)
+        print(f"{name:<10}{strokes:>8}{moves:>7}  {', '.join(shape.aliases)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
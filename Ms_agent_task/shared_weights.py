@@ -0,0 +1,227 @@
+# shared_weights.py
+"""
+Memory-mapped model weights for multi-worker serving.
+
+`python shared_weights.py export` turns model/intent_classifier.joblib
+(+ its SentenceTransformer) into model/shared/:
+
+    model/shared/
+      meta.json            <- id2label, encoder name, source version
+      encoder/             <- SentenceTransformer config + tokenizer (safetensors)
+      encoder_weights/     <- one .npy per encoder tensor
+      clf_coef.npy         <- LogisticRegression coef_
+      clf_intercept.npy    <- LogisticRegression intercept_
+      clf_classes.npy      <- LogisticRegression classes_
+
+load_shared_bundle() maps every .npy copy-on-write and points the torch
+parameters at those pages, so all processes that load (or fork from a
+process that loaded) the same files share one physical copy of the
+weights via the page cache.
+
+`python shared_weights.py report [PID]` prints RSS / PSS / USS for a
+gunicorn master and its workers.
+"""
+import os
+import sys
+import json
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(BASE_DIR, "model", "intent_classifier.joblib")
+SHARED_DIR = os.path.join(BASE_DIR, "model", "shared")
+
+META_FILE = "meta.json"
+
+
+def _tensor_filename(key: str) -> str:
+    return key.replace("/", "_") + ".npy"
+
+
+# --------------------------
+# Classifier
+# --------------------------
+class MmapLinearClassifier:
+    """
+    predict_proba() of a fitted sklearn LogisticRegression, computed
+    straight from memory-mapped coef_/intercept_ arrays (no unpickling).
+    """
+
+    def __init__(self, coef, intercept, classes):
+        self.coef_ = coef
+        self.intercept_ = intercept
+        self.classes_ = classes
+
+    def predict_proba(self, X):
+        scores = np.asarray(X, dtype=np.float64) @ self.coef_.T + self.intercept_
+        if scores.shape[1] == 1:
+            # binary LogisticRegression keeps a single decision column
+            p = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return np.stack([1.0 - p, p], axis=1)
+        scores = scores - scores.max(axis=1, keepdims=True)
+        e = np.exp(scores)
+        return e / e.sum(axis=1, keepdims=True)
+
+
+# --------------------------
+# Export
+# --------------------------
+def export_shared_weights(model_path: str = MODEL_PATH, out_dir: str = SHARED_DIR):
+    import joblib
+    from sentence_transformers import SentenceTransformer
+    from model_registry import DEFAULT_ENCODER, _file_version
+
+    raw = joblib.load(model_path)
+    clf = raw["clf"]
+    encoder_model_name = raw.get("encoder_model_name", DEFAULT_ENCODER)
+
+    os.makedirs(out_dir, exist_ok=True)
+
+    np.save(os.path.join(out_dir, "clf_coef.npy"), np.ascontiguousarray(clf.coef_, dtype=np.float64))
+    np.save(os.path.join(out_dir, "clf_intercept.npy"), np.ascontiguousarray(clf.intercept_, dtype=np.float64))
+    np.save(os.path.join(out_dir, "clf_classes.npy"), np.asarray(clf.classes_))
+
+    embedder = SentenceTransformer(encoder_model_name)
+    encoder_dir = os.path.join(out_dir, "encoder")
+    embedder.save(encoder_dir, safe_serialization=True)
+
+    weights_dir = os.path.join(out_dir, "encoder_weights")
+    os.makedirs(weights_dir, exist_ok=True)
+    tensors = {}
+    for key, tensor in embedder.state_dict().items():
+        fname = _tensor_filename(key)
+        np.save(os.path.join(weights_dir, fname), tensor.detach().cpu().contiguous().numpy())
+        tensors[key] = fname
+
+    meta = {
+        "version": _file_version(model_path),
+        "encoder_model_name": encoder_model_name,
+        "id2label": {str(k): v for k, v in raw.get("id2label", {}).items()},
+        "tensors": tensors,
+        "exported_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    # meta.json goes last: its presence marks a complete export
+    with open(os.path.join(out_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    print(f"Exported {len(tensors)} encoder tensors + classifier to {out_dir}")
+    return out_dir
+
+
+# --------------------------
+# Load
+# --------------------------
+def read_meta(shared_dir: str):
+    with open(os.path.join(shared_dir, META_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _load_mmap_encoder(shared_dir: str, meta):
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    embedder = SentenceTransformer(os.path.join(shared_dir, "encoder"), device="cpu")
+
+    weights_dir = os.path.join(shared_dir, "encoder_weights")
+    state = {}
+    for key, fname in meta["tensors"].items():
+        # mode "c": private copy-on-write mapping; pages stay shared
+        # with every other process until somebody writes to them
+        arr = np.load(os.path.join(weights_dir, fname), mmap_mode="c")
+        state[key] = torch.from_numpy(arr)
+    embedder.load_state_dict(state, strict=False, assign=True)
+    embedder.eval()
+    return embedder
+
+
+def load_shared_bundle(shared_dir: str = SHARED_DIR, reuse=None):
+    from model_registry import ModelBundle
+
+    meta = read_meta(shared_dir)
+
+    def _mm(name):
+        return np.load(os.path.join(shared_dir, name), mmap_mode="r")
+
+    clf = MmapLinearClassifier(
+        coef=_mm("clf_coef.npy"),
+        intercept=_mm("clf_intercept.npy"),
+        classes=_mm("clf_classes.npy"),
+    )
+
+    encoder_model_name = meta["encoder_model_name"]
+    if reuse is not None and reuse.encoder_model_name == encoder_model_name:
+        embedder = reuse.embedder
+    else:
+        embedder = _load_mmap_encoder(shared_dir, meta)
+
+    return ModelBundle(
+        clf=clf,
+        id2label={int(k): v for k, v in meta["id2label"].items()},
+        encoder_model_name=encoder_model_name,
+        embedder=embedder,
+        version=meta["version"],
+        path=shared_dir,
+    )
+
+
+def has_shared_weights(shared_dir: str = SHARED_DIR) -> bool:
+    return os.path.exists(os.path.join(shared_dir, META_FILE))
+
+
+# --------------------------
+# Memory / startup report
+# --------------------------
+def process_memory(pid=None):
+    """
+    RSS counts shared pages in full for every process; PSS splits them
+    between sharers and USS is what the process alone would free.
+    Values in MB.
+    """
+    import psutil
+
+    p = psutil.Process(pid or os.getpid())
+    info = p.memory_full_info()
+    mb = 1024.0 * 1024.0
+    return {
+        "pid": p.pid,
+        "rss_mb": round(info.rss / mb, 1),
+        "pss_mb": round(getattr(info, "pss", 0) / mb, 1),
+        "uss_mb": round(info.uss / mb, 1),
+        "shared_mb": round(getattr(info, "shared", 0) / mb, 1),
+    }
+
+
+def memory_report(master_pid: int):
+    import psutil
+
+    master = psutil.Process(master_pid)
+    rows = [dict(process_memory(master.pid), role="master")]
+    for child in master.children():
+        rows.append(dict(process_memory(child.pid), role="worker"))
+    return rows
+
+
+def _print_report(rows):
+    print(f"{'role':<8}{'pid':>8}{'rss_mb':>10}{'pss_mb':>10}{'uss_mb':>10}")
+    for r in rows:
+        print(f"{r['role']:<8}{r['pid']:>8}{r['rss_mb']:>10}{r['pss_mb']:>10}{r['uss_mb']:>10}")
+    workers = [r for r in rows if r["role"] == "worker"]
+    if workers:
+        total_pss = sum(r["pss_mb"] for r in rows)
+        total_rss = sum(r["rss_mb"] for r in rows)
+        print(f"total: rss={total_rss:.1f} MB  pss={total_pss:.1f} MB  ({len(workers)} workers)")
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "export"
+    if cmd == "export":
+        export_shared_weights()
+    elif cmd == "report":
+        if len(sys.argv) > 2:
+            _print_report(memory_report(int(sys.argv[2])))
+        else:
+            _print_report([dict(process_memory(), role="self")])
+    else:
+        print("usage: python shared_weights.py [export | report [MASTER_PID]]")
+        sys.exit(2)
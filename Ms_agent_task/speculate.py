@@ -0,0 +1,212 @@
+# speculate.py
+#
+# Work started while the user is still typing. The browser reports the
+# input text after a short pause (assets/speculate.js); a background
+# thread classifies it and, when the scene is drawable and the
+# classifier is confident, plans its quality tier, renders its stroke
+# program and, where that steals no focus, opens a Paint canvas ahead
+# of time (prewarm_paint). When Send is clicked with the same text, the
+# app takes that result instead of classifying again.
+#
+# Only the newest text of each session is worked on; keystrokes that
+# arrive while one is being classified replace each other. Hits, misses
+# and the seconds spent on results nobody used are exported with
+# metrics.py and by stats().
+#
+#   PAINT_SPECULATE=0              off
+#   PAINT_SPECULATE_MIN_CONF=0.8   confidence needed to render / prewarm
+#   PAINT_SPECULATE_TTL=60         seconds a result stays usable
+#   PAINT_SPECULATE_PREWARM=auto   open Paint ahead of time: 1, 0, or auto
+#                                  (only with per-session backends; on the
+#                                  shared desktop Paint would pop up over
+#                                  whatever the user is doing)
+import os
+import time
+import threading
+import collections
+
+from predict import classify_scene_scored
+from drawings import plan_quality, prewarm_paint
+from paint_driver import has_session_backends
+from stroke_program import program_for
+from metrics import Counter
+
+SPECULATIONS = Counter(
+    "paint_speculation_total",
+    "Sends by whether a speculative result for their text was ready (hit, miss, none).",
+    labelnames=("result",),
+)
+SPECULATION_SECONDS = Counter(
+    "paint_speculation_seconds_total",
+    "Time spent on speculative results, by whether a send used them.",
+    labelnames=("use",),
+)
+
+
+class Speculation:
+    def __init__(self, text, scene, model_version, confidence):
+        self.text = text
+        self.scene = scene
+        self.model_version = model_version
+        self.confidence = confidence
+        self.quality = None
+        self.strokes = None  # stroke program at self.quality
+        self.cost_s = 0.0
+        self.created = time.monotonic()
+
+
+class Speculator:
+    """
+    Speculative classification per session. submit() never blocks;
+    take() hands the result for exactly this text to the send path.
+    """
+
+    def __init__(self, classify=classify_scene_scored, min_confidence=0.8, ttl=60.0,
+                 prewarm=None, max_sessions=1024):
+        self.classify = classify
+        self.min_confidence = min_confidence
+        self.ttl = ttl
+        self.prewarm = prewarm  # None: only with per-session backends
+        self.max_sessions = max_sessions
+        self._cond = threading.Condition()
+        self._pending = collections.OrderedDict()  # sid -> text
+        self._running = {}  # sid -> (text, threading.Event)
+        self._ready = collections.OrderedDict()  # sid -> Speculation
+        self._counts = {"hit": 0, "miss": 0, "none": 0}
+        self._seconds = {"used": 0.0, "wasted": 0.0}
+        self._thread = None
+
+    @classmethod
+    def from_env(cls):
+        """
+        None when PAINT_SPECULATE=0.
+        """
+        if os.environ.get("PAINT_SPECULATE", "1") == "0":
+            return None
+        prewarm = os.environ.get("PAINT_SPECULATE_PREWARM", "auto").strip().lower()
+        return cls(
+            min_confidence=float(os.environ.get("PAINT_SPECULATE_MIN_CONF", "0.8")),
+            ttl=float(os.environ.get("PAINT_SPECULATE_TTL", "60")),
+            prewarm=None if prewarm == "auto" else prewarm != "0",
+        )
+
+    def submit(self, sid, text):
+        """
+        Speculate on `text` for session `sid` in the background.
+        """
+        text = (text or "").strip()
+        if not text:
+            return
+        with self._cond:
+            ready = self._ready.get(sid)
+            running = self._running.get(sid)
+            if (ready is not None and ready.text == text) or (running and running[0] == text):
+                return
+            self._pending[sid] = text
+            self._pending.move_to_end(sid)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name="speculate", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def take(self, sid, text, wait_s=5.0):
+        """
+        The speculative result for exactly `text`, or None. A result
+        still being computed for it is waited for (up to wait_s).
+        """
+        text = (text or "").strip()
+        with self._cond:
+            if self._pending.get(sid) == text:
+                # not started: the caller classifies now anyway
+                del self._pending[sid]
+            running = self._running.get(sid)
+        if running is not None and running[0] == text:
+            running[1].wait(wait_s)
+
+        with self._cond:
+            spec = self._ready.pop(sid, None)
+            if spec is None:
+                result = "none"
+            elif spec.text == text and time.monotonic() - spec.created <= self.ttl:
+                result = "hit"
+            else:
+                result = "miss"
+            self._count(result, spec)
+        return spec if result == "hit" else None
+
+    def _count(self, result, spec):
+        # caller holds self._cond
+        self._counts[result] += 1
+        SPECULATIONS.inc(result=result)
+        if spec is not None:
+            self._spent(spec, "used" if result == "hit" else "wasted")
+
+    def _spent(self, spec, use):
+        self._seconds[use] += spec.cost_s
+        SPECULATION_SECONDS.inc(spec.cost_s, use=use)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                sid, text = self._pending.popitem(last=False)
+                done = threading.Event()
+                self._running[sid] = (text, done)
+            try:
+                spec = self._speculate(text)
+            except Exception as e:
+                print(f"[speculate] {text!r} failed: {e}")
+                spec = None
+            with self._cond:
+                del self._running[sid]
+                if spec is not None:
+                    self._keep(sid, spec)
+            done.set()
+
+    def _speculate(self, text):
+        t0 = time.perf_counter()
+        scene, model_version, confidence = self.classify(text)
+        spec = Speculation(text, scene, model_version, confidence)
+        if scene and confidence is not None and confidence >= self.min_confidence:
+            spec.quality, _ = plan_quality(scene)
+            spec.strokes = program_for(scene, spec.quality)
+            if self.prewarms():
+                # Paint boots in seconds; keep classifying meanwhile
+                threading.Thread(target=prewarm_paint, name="prewarm-paint", daemon=True).start()
+        spec.cost_s = time.perf_counter() - t0
+        return spec
+
+    def _keep(self, sid, spec):
+        # caller holds self._cond
+        old = self._ready.pop(sid, None)
+        if old is not None:
+            self._spent(old, "wasted")
+        self._ready[sid] = spec
+        while len(self._ready) > self.max_sessions:
+            _, old = self._ready.popitem(last=False)
+            self._spent(old, "wasted")
+
+    def prewarms(self):
+        """
+        Whether a confident speculation opens Paint ahead of time: by
+        default only with per-session backends. On the shared desktop
+        preparing a canvas means keystrokes into a focused Paint window,
+        so it would take the focus from the user typing in the browser.
+        """
+        return has_session_backends() if self.prewarm is None else self.prewarm
+
+    def stats(self):
+        with self._cond:
+            counts = dict(self._counts)
+            seconds = dict(self._seconds)
+            pending = len(self._pending)
+        sends = sum(counts.values())
+        return {
+            **counts,
+            "hit_rate": round(counts["hit"] / sends, 3) if sends else None,
+            "used_s": round(seconds["used"], 3),
+            "wasted_s": round(seconds["wasted"], 3),
+            "pending": pending,
+            "prewarm_enabled": self.prewarms(),
+        }
@@ -0,0 +1,128 @@
+# stroke_program.py
+#
+# Compact, lossless description of a drawing: the polylines paint_driver
+# strokes, in canvas pixels, delta-encoded as little-endian int16 and
+# base64'd into a small JSON object. The browser renders it on a
+# <canvas> (assets/strokes.js); a PNG is only rasterized on request.
+#
+#   {"v": 1, "w": 2000, "h": 800, "brush": 3,
+#    "n": [points in stroke 0, points in stroke 1, ...],
+#    "d": base64(int16[dx0, dy0, dx1, dy1, ...])}
+#
+# Every point is stored relative to the one before it (the first to
+# (0, 0)), across stroke boundaries, so almost all deltas are small.
+#
+#   python stroke_program.py            # program vs PNG size per shape
+import io
+import sys
+import json
+import array
+import base64
+
+from paint_driver import CANVAS_W, CANVAS_H, use_input_backend, use_quality
+from input_sim import RecordingBackend
+from drawings import SHAPE_FUNCS, scene_objects, draw_on_canvas
+from raster import BRUSH_PX, rasterize
+
+VERSION = 1
+
+
+def record_drawing(label, quality=None):
+    """
+    Polylines of perform_drawing(label, quality) in canvas coordinates,
+    without Paint. `label` may be a scene, as for perform_drawing.
+    """
+    shape_key, objects = scene_objects(label)
+    rec = RecordingBackend(pause=0.0)
+    with use_input_backend(rec), use_quality(quality):
+        if not draw_on_canvas(shape_key, objects, CANVAS_W // 2, CANVAS_H // 2):
+            return []
+    return rec.polylines()
+
+
+def compact(polylines):
+    """
+    Drop repeated points and strokes that retrace one already drawn
+    (the *_thick helpers go over each outline several times).
+    """
+    out, seen = [], set()
+    for line in polylines:
+        pts = [tuple(line[0])]
+        for p in line[1:]:
+            if tuple(p) != pts[-1]:
+                pts.append(tuple(p))
+        key = tuple(pts)
+        if key in seen or key[::-1] in seen:
+            continue
+        seen.add(key)
+        out.append(pts)
+    return out
+
+
+def encode(polylines, width=CANVAS_W, height=CANVAS_H, brush=BRUSH_PX):
+    deltas = array.array("h")
+    px, py = 0, 0
+    for line in polylines:
+        for x, y in line:
+            deltas.append(x - px)
+            deltas.append(y - py)
+            px, py = x, y
+    if sys.byteorder == "big":
+        deltas.byteswap()
+    return {
+        "v": VERSION,
+        "w": width,
+        "h": height,
+        "brush": brush,
+        "n": [len(line) for line in polylines],
+        "d": base64.b64encode(deltas.tobytes()).decode("ascii"),
+    }
+
+
+def decode(prog):
+    deltas = array.array("h")
+    deltas.frombytes(base64.b64decode(prog["d"]))
+    if sys.byteorder == "big":
+        deltas.byteswap()
+    lines, i, x, y = [], 0, 0, 0
+    for n in prog["n"]:
+        line = []
+        for _ in range(n):
+            x += deltas[i]
+            y += deltas[i + 1]
+            i += 2
+            line.append((x, y))
+        lines.append(line)
+    return lines
+
+
+def program_for(label, quality=None):
+    """
+    Stroke program for a label or scene; None if nothing would be drawn.
+    """
+    lines = compact(record_drawing(label, quality))
+    return encode(lines) if lines else None
+
+
+def render_png(prog):
+    """
+    PNG bytes of a stroke program, as Paint would have saved it.
+    """
+    img = rasterize(decode(prog), (prog["w"], prog["h"]), width=prog.get("brush", BRUSH_PX))
+    buf = io.BytesIO()
+    img.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
+def main():
+    print(f"{'shape':<10}{'strokes':>8}{'points':>8}{'program_B':>11}{'png_B':>9}{'ratio':>8}")
+    for label in SHAPE_FUNCS:
+        prog = program_for(label)
+        size = len(json.dumps(prog, separators=(",", ":")))
+        png = len(render_png(prog))
+        print(f"{label:<10}{len(prog['n']):>8}{sum(prog['n']):>8}{size:>11}{png:>9}{png / size:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
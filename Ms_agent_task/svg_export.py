@@ -0,0 +1,196 @@
+# svg_export.py
+#
+# Minimal SVG for a drawing, built from the shape geometry rather than
+# traced from the PNG: strokes that continue one another are merged into
+# one polyline, collinear midpoints and retraced outlines are dropped,
+# and everything is a single <path> with integer relative coordinates.
+#
+#   python svg_export.py compare                # SVG vs PNG size per shape
+#   python svg_export.py labels --out svg/      # one SVG per known shape
+#   python svg_export.py history                # SVGs for existing chat drawings
+import os
+import sys
+import argparse
+
+from paint_driver import CANVAS_W, CANVAS_H
+from drawings import SHAPE_FUNCS, parse_scene_label
+from raster import BRUSH_PX
+from stroke_program import record_drawing, compact, encode, decode, render_png
+from history_store import HistoryStore, DEFAULT_ROOT
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _drop_collinear(line):
+    if len(line) < 3:
+        return line
+    out = [line[0]]
+    for i in range(1, len(line) - 1):
+        (x0, y0), (x1, y1), (x2, y2) = out[-1], line[i], line[i + 1]
+        cross = (x1 - x0) * (y2 - y1) - (y1 - y0) * (x2 - x1)
+        forward = (x1 - x0) * (x2 - x1) + (y1 - y0) * (y2 - y1) > 0
+        if cross == 0 and forward:
+            continue  # on the way from out[-1] to line[i + 1]
+        out.append(line[i])
+    out.append(line[-1])
+    return out
+
+
+def merge_polylines(polylines):
+    """
+    compact() + join strokes end-to-start (either direction) into longer
+    polylines + drop collinear midpoints.
+    """
+    chains = []
+    ends = {}  # endpoint -> chain index, for chains that can still grow
+    for line in compact(polylines):
+        line = list(line)
+        idx = ends.pop(line[0], None)
+        if idx is None and line[-1] in ends:
+            idx = ends.pop(line[-1])
+            line.reverse()
+        if idx is not None and chains[idx][-1] == line[0]:
+            chains[idx].extend(line[1:])
+        else:
+            idx = len(chains)
+            chains.append(line)
+        ends[chains[idx][-1]] = idx
+    return [_drop_collinear(c) for c in chains]
+
+
+def _nums(values):
+    # SVG needs no separator before a minus sign
+    out = str(values[0])
+    for v in values[1:]:
+        out += str(v) if v < 0 else f" {v}"
+    return out
+
+
+def path_data(polylines):
+    """
+    "M12 30l5-3 4 0M..." : absolute move, then relative line-tos.
+    """
+    parts = []
+    for line in polylines:
+        x, y = line[0]
+        parts.append("M" + _nums([x, y]))
+        rel = []
+        for nx, ny in line[1:]:
+            rel += [nx - x, ny - y]
+            x, y = nx, ny
+        # a lone point is a dot; round caps make it visible
+        parts.append("l" + _nums(rel) if rel else "h0")
+    return "".join(parts)
+
+
+def to_svg(polylines, width=CANVAS_W, height=CANVAS_H, brush=BRUSH_PX):
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}">'
+        f'<rect width="{width}" height="{height}" fill="#fff"/>'
+        f'<path d="{path_data(polylines)}" fill="none" stroke="#000" stroke-width="{brush}"'
+        f' stroke-linecap="round" stroke-linejoin="round"/></svg>'
+    )
+
+
+def svg_for(label):
+    """
+    SVG text for a label or scene (as for perform_drawing); None if
+    nothing would be drawn.
+    """
+    lines = merge_polylines(record_drawing(label))
+    return to_svg(lines) if lines else None
+
+
+def svg_from_program(prog):
+    return to_svg(merge_polylines(decode(prog)), prog["w"], prog["h"], prog.get("brush", BRUSH_PX))
+
+
+def write_svg(svg, path):
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(svg)
+    return path
+
+
+# --------------------------
+# CLI
+# --------------------------
+def cmd_compare(args):
+    print(f"{'shape':<10}{'paths':>6}{'points':>8}{'svg_B':>8}{'png_B':>9}{'ratio':>8}")
+    for label in SHAPE_FUNCS:
+        polylines = record_drawing(label)
+        lines = merge_polylines(polylines)
+        svg = to_svg(lines)
+        png = len(render_png(encode(compact(polylines))))
+        print(f"{label:<10}{len(lines):>6}{sum(len(l) for l in lines):>8}{len(svg):>8}"
+              f"{png:>9}{png / len(svg):>7.1f}x")
+    return 0
+
+
+def cmd_labels(args):
+    os.makedirs(args.out, exist_ok=True)
+    for label in SHAPE_FUNCS:
+        path = write_svg(svg_for(label), os.path.join(args.out, f"{label}.svg"))
+        print(f"{label:<10} {os.path.getsize(path):>6} B  {path}")
+    return 0
+
+
+def cmd_history(args):
+    """
+    Write <png>.svg next to every drawing in every session's history and
+    record it as svg_path; reports PNG vs SVG bytes on disk.
+    """
+    store = HistoryStore(args.history)
+    made = png_bytes = svg_bytes = 0
+    for sid in list(store.sessions()):
+        hist = store.load(sid)
+        n, n_svg, n_png = _backfill_session(hist)
+        made += n
+        svg_bytes += n_svg
+        png_bytes += n_png
+        if n and not args.dry_run:
+            store.rewrite(sid, hist)
+    print(f"{made} SVGs written, {svg_bytes} B total")
+    if png_bytes:
+        print(f"PNGs on disk for the same drawings: {png_bytes} B ({png_bytes / svg_bytes:.1f}x)")
+    return 0
+
+
+def _backfill_session(hist):
+    # -> (SVGs written, their bytes, bytes of the matching PNGs)
+    made = png_bytes = svg_bytes = 0
+    for entry in hist:
+        image_path = entry.get("image_path")
+        if not image_path or entry.get("predicted_label") in (None, "unknown"):
+            continue
+        svg_rel = os.path.splitext(image_path)[0] + ".svg"
+        if entry.get("strokes"):
+            svg = svg_from_program(entry["strokes"])
+        else:
+            svg = svg_for(parse_scene_label(entry["predicted_label"]))
+        if svg is None:
+            continue
+        write_svg(svg, os.path.join(BASE_DIR, svg_rel))
+        entry["svg_path"] = svg_rel
+        made += 1
+        svg_bytes += len(svg)
+        png_abs = os.path.join(BASE_DIR, image_path)
+        if os.path.isfile(png_abs):
+            png_bytes += os.path.getsize(png_abs)
+    return made, svg_bytes, png_bytes
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="SVG export of drawings.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("compare", help="SVG vs PNG size per shape")
+    p = sub.add_parser("labels", help="one SVG per known shape")
+    p.add_argument("--out", default=os.path.join(BASE_DIR, "assets", "shapes_svg"))
+    p = sub.add_parser("history", help="SVGs for every drawing in the chat history")
+    p.add_argument("--history", default=DEFAULT_ROOT, help="history store directory")
+    p.add_argument("--dry-run", action="store_true", help="write SVGs but leave the history file alone")
+    args = ap.parse_args(argv)
+    return {"compare": cmd_compare, "labels": cmd_labels, "history": cmd_history}[args.cmd](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
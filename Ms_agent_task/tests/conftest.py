@@ -0,0 +1,17 @@
+# tests/conftest.py
+#
+# The modules under test are imported from the app directory, with the
+# same environment the benchmarks use: no model download, no Paint, no
+# background threads, and history / drawings in a scratch directory.
+import os
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from benchmarks.common import offline_env  # noqa: E402
+
+offline_env()
+os.environ.setdefault("PAINT_BACKEND", "dryrun")
+os.environ.setdefault("PAINT_PREVIEW", "0")
@@ -0,0 +1,46 @@
+# tests/test_batch_render.py
+import os
+import json
+
+import batch_render
+from batch_render import render_batch
+
+SPEC = dict(batch_render.DEFAULT_SPEC, shapes=["tree", "star", "house"], scales=[0.5, 0.8],
+            count=2, jitter=20, size=[96, 96], seed=3)
+
+
+def _run(out, workers, chunk_size):
+    summary = render_batch(SPEC, str(out), workers=workers, chunk_size=chunk_size,
+                           sprites=True, quiet=True)
+    with open(out / "manifest.jsonl", encoding="utf-8") as f:
+        rows = sorted((json.loads(line) for line in f), key=lambda r: r["id"])
+    sheets = {name: (out / "sprites" / name).read_bytes()
+              for name in sorted(os.listdir(out / "sprites"))}
+    return summary, rows, sheets
+
+
+def test_sprites_do_not_depend_on_workers_or_chunks(tmp_path, monkeypatch):
+    # 12 jobs on 2x2 sheets: three full sheets, packed from several chunks
+    monkeypatch.setattr(batch_render, "SHEET_COLS", 2)
+    monkeypatch.setattr(batch_render, "SHEET_ROWS", 2)
+    one, rows1, sheets1 = _run(tmp_path / "a", workers=1, chunk_size=12)
+    many, rows3, sheets3 = _run(tmp_path / "b", workers=3, chunk_size=1)
+    assert many["chunks"] == 12 and one["chunks"] == 1
+    assert rows1 == rows3
+    assert sheets1 == sheets3
+    assert one["sprite_sheets"] == many["sprite_sheets"] == len(sheets1) == 3
+
+
+def test_sprite_slots_follow_job_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_render, "SHEET_COLS", 2)
+    monkeypatch.setattr(batch_render, "SHEET_ROWS", 3)
+    _, rows, sheets = _run(tmp_path, workers=2, chunk_size=5)
+    by_id = {r["id"]: r for r in rows}
+    t = batch_render.THUMB
+    for i, job in enumerate(batch_render.expand_jobs(SPEC)):
+        n, slot = divmod(i, 6)
+        sprite = by_id[job["id"]]["sprite"]
+        assert sprite["sheet"] == f"sprites/sheet_{n:04d}.png"
+        assert (sprite["x"], sprite["y"]) == ((slot % 2) * t, (slot // 2) * t)
+        assert sprite["w"] == sprite["h"] == 96  # already under THUMB px
+    assert list(sheets) == ["sheet_0000.png", "sheet_0001.png"]
@@ -0,0 +1,131 @@
+# tests/test_gallery.py
+import os
+import json
+
+import pytest
+from PIL import Image
+
+from gallery import GalleryIndex
+from stroke_program import encode
+
+
+@pytest.fixture
+def index(tmp_path):
+    return GalleryIndex(str(tmp_path))
+
+
+def _fill(index, labels):
+    index._append([{"name": f"{i:03d}.png", "label": label, "timestamp": f"2026-10-19T00:00:{i % 60:02d}"}
+                   for i, label in enumerate(labels)])
+
+
+def _names(page):
+    return [e["name"] for e in page["entries"]]
+
+
+def test_offsets_point_at_lines(index):
+    _fill(index, ["tree", "house+2 tree", "car"])
+    index.page()
+    with open(index.path, "rb") as f:
+        data = f.read()
+    starts = [0] + [i + 1 for i, b in enumerate(data) if b == ord("\n")][:-1]
+    assert list(index.offsets) == starts
+    assert {k: list(v) for k, v in index.labels.items()} == {"tree": [0, 1], "house": [1], "car": [2]}
+
+
+def test_pages_newest_first_with_cursor(index):
+    _fill(index, ["tree"] * 5)
+    first = index.page(limit=2)
+    assert _names(first) == ["004.png", "003.png"] and first["total"] == 5
+    second = index.page(first["next"], limit=2)
+    assert _names(second) == ["002.png", "001.png"]
+    last = index.page(second["next"], limit=2)
+    assert _names(last) == ["000.png"] and last["next"] is None
+    assert [e["seq"] for e in first["entries"]] == [4, 3]
+
+
+def test_label_pages(index):
+    _fill(index, ["tree", "car", "house+tree", "car", "tree"])
+    page = index.page(label="Tree", limit=2)
+    assert _names(page) == ["004.png", "002.png"] and page["total"] == 3
+    assert _names(index.page(page["next"], label="tree", limit=2)) == ["000.png"]
+    assert index.page(label="boat")["entries"] == []
+    # most drawn first
+    assert list(index.label_counts().items()) == [("tree", 3), ("car", 2), ("house", 1)]
+
+
+def test_catches_up_with_appends_and_skips_partial_lines(index):
+    _fill(index, ["tree"])
+    assert index.page()["total"] == 1
+    with open(index.path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"name": "late.png", "label": "car"}) + "\n")
+        f.write('{"name": "half')
+    page = index.page()
+    assert _names(page) == ["late.png", "000.png"]
+    with open(index.path, "a", encoding="utf-8") as f:
+        f.write('.png", "label": "star"}\n')
+    assert _names(index.page(limit=1)) == ["half.png"]
+
+
+def test_rebuilt_manifest_starts_over(index):
+    _fill(index, ["tree"] * 3)
+    assert index.page()["total"] == 3
+    os.remove(index.path)
+    _fill(index, ["car"])
+    page = index.page()
+    assert _names(page) == ["000.png"] and page["total"] == 1
+    assert index.label_counts() == {"car": 1}
+
+
+def test_record_once(index, tmp_path):
+    prog = encode([[(0, 0), (2000, 800)]])
+    png = str(tmp_path / "20261019_120000_tree.png")
+    entry = index.record(png, "tree", strokes=prog)
+    assert entry["thumb"] and os.path.isfile(os.path.join(index.thumbs, "20261019_120000_tree.png"))
+    assert (entry["width"], entry["height"]) == (2000, 800)
+    assert index.record(png, "tree", strokes=prog) is None
+    assert index.page()["total"] == 1
+    assert str(tmp_path / "20261019_120000_tree.png") in set(index.files())
+
+
+def _save(tmp_path, stem):
+    png = str(tmp_path / f"{stem}.png")
+    Image.new("RGB", (200, 80), "white").save(png)
+    return png
+
+
+def test_scan_merges_under_recorded_drawings(index, tmp_path):
+    _save(tmp_path, "20261018_090000_tree")
+    _save(tmp_path, "20261018_100000_house-tree")
+    # the app saved and recorded one before the startup scan got to run
+    index.record(_save(tmp_path, "20261019_120000_car"), "car")
+    assert index.ensure_manifest() == 2
+    assert _names(index.page()) == ["20261019_120000_car.png", "20261018_100000_house-tree.png",
+                                    "20261018_090000_tree.png"]
+    assert index.label_counts() == {"tree": 2, "car": 1, "house": 1}
+    # once: the marker stays, a later record is not rescanned
+    index.record(_save(tmp_path, "20261019_130000_star"), "star")
+    assert index.ensure_manifest() == 0
+    assert index.page()["total"] == 4
+
+
+def test_rebuild_counts_as_scanned(index, tmp_path):
+    _save(tmp_path, "20261018_090000_tree")
+    assert index.rebuild() == 1
+    assert index.ensure_manifest() == 0
+    assert _names(index.page()) == ["20261018_090000_tree.png"]
+
+
+def test_drawing_recorded_during_scan_is_listed_once(index, tmp_path, monkeypatch):
+    _save(tmp_path, "20261018_090000_tree")
+    png = _save(tmp_path, "20261019_120000_car")  # saved, not yet recorded
+    scan = index.scan
+
+    def scan_then_record(skip=()):
+        entries = scan(skip)
+        index.record(png, "car")
+        return entries
+
+    monkeypatch.setattr(index, "scan", scan_then_record)
+    assert index.ensure_manifest() == 1
+    assert _names(index.page()) == ["20261019_120000_car.png", "20261018_090000_tree.png"]
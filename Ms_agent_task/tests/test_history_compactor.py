@@ -0,0 +1,64 @@
+# tests/test_history_compactor.py
+import os
+
+import pytest
+
+from history_compactor import Compactor, RetentionPolicy, find_orphans
+from history_store import HistoryStore, new_session_id
+
+OLD = 1_000_000_000  # mtime well past the grace period
+
+
+@pytest.fixture
+def saved(tmp_path):
+    root = tmp_path / "saved_drawings"
+    root.mkdir()
+    for name in ("20261019_120000_tree.png", "20261019_120100_car.png", "draw-1.png"):
+        path = root / name
+        path.write_bytes(b"png")
+        os.utime(path, (OLD, OLD))
+    return root
+
+
+@pytest.fixture
+def store(tmp_path, saved):
+    store = HistoryStore(str(tmp_path / "history"))
+    store.append(new_session_id(), {"id": "1", "user_text": "tree",
+                                    "image_path": str(saved / "20261019_120000_tree.png")})
+    return store
+
+
+def _names(orphans):
+    return sorted(os.path.basename(o["path"]) for o in orphans)
+
+
+@pytest.mark.parametrize("legacy", ["", "  \r\n", None])
+def test_empty_or_missing_legacy_history(tmp_path, saved, store, legacy):
+    legacy_path = tmp_path / "chat_history.json"
+    if legacy is not None:
+        legacy_path.write_text(legacy, encoding="utf-8")
+    orphans = find_orphans(store, str(saved), legacy_path=str(legacy_path))
+    assert _names(orphans) == ["20261019_120100_car.png", "draw-1.png"]
+
+
+def test_legacy_history_references_drawings(tmp_path, saved, store):
+    legacy_path = tmp_path / "chat_history.json"
+    legacy_path.write_text('[{"image_path": "%s"}]' % (saved / "20261019_120100_car.png").as_posix(),
+                           encoding="utf-8")
+    assert _names(find_orphans(store, str(saved), legacy_path=str(legacy_path))) == ["draw-1.png"]
+
+
+@pytest.mark.parametrize("legacy", ["[{", '{"turns": []}'])
+def test_unreadable_legacy_history_refuses(tmp_path, saved, store, legacy):
+    legacy_path = tmp_path / "chat_history.json"
+    legacy_path.write_text(legacy, encoding="utf-8")
+    with pytest.raises(ValueError, match="import or remove it first"):
+        find_orphans(store, str(saved), legacy_path=str(legacy_path))
+
+
+def test_compactor_orphan_pass_with_empty_legacy(tmp_path, saved, store, monkeypatch):
+    legacy_path = tmp_path / "chat_history.json"
+    legacy_path.write_text("", encoding="utf-8")
+    monkeypatch.setattr("history_compactor.LEGACY_HISTORY", str(legacy_path))
+    report = Compactor(store, RetentionPolicy(1000, None), saved_root=str(saved)).run_once()
+    assert report["orphans"] == 2
@@ -0,0 +1,99 @@
+# tests/test_history_index.py
+import datetime
+
+import pytest
+
+from history_index import SessionIndex, entry_outcome, parse_query, tokens
+
+NOW = datetime.datetime(2026, 10, 19, 12, 0, 0)
+
+
+def test_parse_query_words_only():
+    assert parse_query("tall tree") == {"text": "tall tree"}
+    assert parse_query("") == {"text": ""}
+    assert parse_query(None) == {"text": ""}
+
+
+def test_parse_query_filters():
+    q = parse_query("tall tree label:house outcome:failed since:7d until:2026-10-18", now=NOW)
+    assert q == {
+        "text": "tall tree",
+        "label": "house",
+        "outcome": "failed",
+        "since": "2026-10-12T12:00:00",
+        # a whole day: until:2026-10-18 includes the 18th
+        "until": "2026-10-19T00:00:00",
+    }
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("12h", "2026-10-19T00:00:00"),
+    ("2w", "2026-10-05T12:00:00"),
+    ("2026-10-12", "2026-10-12T00:00:00"),
+    ("2026-10-12T08:30", "2026-10-12T08:30:00"),
+])
+def test_parse_query_since(value, expected):
+    assert parse_query(f"since:{value}", now=NOW)["since"] == expected
+
+
+def test_parse_query_until_with_time_is_exact():
+    assert parse_query("until:2026-10-18T08:00", now=NOW)["until"] == "2026-10-18T08:00:00"
+
+
+@pytest.mark.parametrize("q", ["outcome:exploded", "since:yesterday", "until:2026-13-01"])
+def test_parse_query_rejects(q):
+    with pytest.raises(ValueError):
+        parse_query(q, now=NOW)
+
+
+def test_tokens_fold_plurals():
+    assert tokens("Two TREES, bushes and skies") == ["two", "tree", "bush", "and", "sky"]
+    assert tokens("this glass bus was") == ["this", "glass", "bus", "was"]
+
+
+def test_entry_outcome_inferred():
+    assert entry_outcome({"outcome": "busy", "strokes": "x"}) == "busy"
+    assert entry_outcome({"strokes": {"n": []}}) == "drawn"
+    assert entry_outcome({"status_text": "I'm busy drawing"}) == "busy"
+    assert entry_outcome({"status_text": "I tried to draw a tree"}) == "failed"
+    assert entry_outcome({}) == "unknown"
+
+
+def _index():
+    idx = SessionIndex()
+    turns = [
+        ("a", "2026-10-10T09:00:00", "draw two trees", "2 tree", "drawn"),
+        ("b", "2026-10-12T09:00:00", "a house and a tree", "house+tree", "failed"),
+        ("c", "2026-10-14T09:00:00", "a red car", "car", "drawn"),
+        ("d", "2026-10-16T09:00:00", "tree please", "tree", "failed"),
+    ]
+    for entry_id, ts, text, label, outcome in turns:
+        idx.add({"id": entry_id, "timestamp": ts, "user_text": text,
+                 "predicted_label": label, "outcome": outcome})
+    return idx
+
+
+def _ids(result):
+    total, docs = result
+    return total, [d["id"] for d in docs]
+
+
+def test_search_words_newest_first():
+    idx = _index()
+    assert _ids(idx.search("tree")) == (3, ["d", "b", "a"])
+    assert _ids(idx.search("trees")) == (3, ["d", "b", "a"])
+    assert _ids(idx.search("house tree")) == (1, ["b"])
+    assert _ids(idx.search("boat")) == (0, [])
+
+
+def test_search_filters_and_time_range():
+    idx = _index()
+    assert _ids(idx.search(label="tree", outcome="failed")) == (2, ["d", "b"])
+    assert _ids(idx.search("tree", since="2026-10-11", until="2026-10-15")) == (1, ["b"])
+    assert _ids(idx.search(outcome="drawn", limit=1)) == (2, ["c"])
+
+
+def test_add_ignores_repeated_id():
+    idx = _index()
+    assert not idx.add({"id": "a", "timestamp": "2026-10-18T00:00:00", "user_text": "tree"})
+    assert idx.search("tree")[0] == 3
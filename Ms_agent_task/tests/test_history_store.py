@@ -0,0 +1,52 @@
+# tests/test_history_store.py
+import pytest
+
+from history_store import HistoryStore, main, new_session_id
+
+
+@pytest.fixture
+def root(tmp_path):
+    return str(tmp_path / "history")
+
+
+def _import(root, tmp_path, text, *extra):
+    legacy = tmp_path / "chat_history.json"
+    legacy.write_text(text, encoding="utf-8")
+    return main(["--root", root, "import", str(legacy), *extra])
+
+
+@pytest.mark.parametrize("text", ["", " \r\n"])
+def test_import_empty_file(root, tmp_path, capsys, text):
+    assert _import(root, tmp_path, text) == 0
+    assert capsys.readouterr().out.startswith("0 entries -> session ")
+
+
+def test_import_into_session(root, tmp_path):
+    sid = new_session_id()
+    assert _import(root, tmp_path, '[{"id": "a", "user_text": "tree"}, {"id": "b"}]', "--session", sid) == 0
+    assert [e["id"] for e in HistoryStore(root).load(sid)] == ["a", "b"]
+
+
+@pytest.mark.parametrize("sid", ["../../etc/x", "ABC", "0" * 31, ""])
+def test_import_rejects_bad_session_id(root, tmp_path, capsys, sid):
+    assert _import(root, tmp_path, '[{"id": "a"}]', "--session", sid) == 1
+    assert "invalid session id" in capsys.readouterr().out
+    assert list(HistoryStore(root).sessions()) == []
+
+
+@pytest.mark.parametrize("text", ["[{", '{"id": "a"}'])
+def test_import_rejects_bad_json(root, tmp_path, capsys, text):
+    assert _import(root, tmp_path, text) == 1
+    assert "not readable JSON" in capsys.readouterr().out
+
+
+def test_session_locks_are_dropped_when_unused(root):
+    store = HistoryStore(root)
+    for _ in range(50):
+        store.append(new_session_id(), {"role": "user", "text": "tree"})
+    assert len(store._locks) == 0
+    sid = new_session_id()
+    held = store.lock(sid)
+    assert store.lock(sid) is held and len(store._locks) == 1
+    del held
+    assert len(store._locks) == 0
@@ -0,0 +1,38 @@
+# tests/test_inference_server.py
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import predict
+import inference_server
+from inference_server import MicroBatcher
+
+
+@pytest.fixture
+def sidecar(monkeypatch):
+    batches = []
+
+    def classify_batch(texts):
+        batches.append(list(texts))
+        return [(t.split()[-1].rstrip("s"), "v1") for t in texts]
+
+    # a long window: a scene's clauses must not need one to share a batch
+    monkeypatch.setattr(inference_server, "_batcher", MicroBatcher(classify_batch, window_s=0.2))
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), inference_server._Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    monkeypatch.setattr(predict, "SIDECAR_URL", f"http://127.0.0.1:{httpd.server_port}")
+    monkeypatch.setattr(predict, "_sidecar_down_until", 0.0)
+    yield batches
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_scene_clauses_go_in_one_request(sidecar):
+    assert predict._classify_many(["a house", "two trees", "a star"]) == [
+        ("house", "v1"), ("tree", "v1"), ("star", "v1")]
+    assert sidecar == [["a house", "two trees", "a star"]]
+
+
+def test_single_text_reply_unchanged(sidecar):
+    assert predict._classify_via_sidecar("draw a tree") == ("tree", "v1")
@@ -0,0 +1,23 @@
+# tests/test_metrics.py
+from metrics import percentiles
+
+
+def test_percentiles_empty():
+    assert percentiles([]) == {}
+
+
+def test_percentiles_nearest_rank():
+    # ceil(p% of n)-th smallest: p50 of two samples is the first one
+    assert percentiles([0.002, 0.001], ps=(50, 100)) == {"p50_ms": 1.0, "p100_ms": 2.0, "mean_ms": 1.5}
+
+
+def test_percentiles_whole_ranks():
+    xs = [i / 1000.0 for i in range(1, 101)]
+    assert percentiles(xs) == {"p50_ms": 50.0, "p90_ms": 90.0, "p99_ms": 99.0, "mean_ms": 50.5}
+    # 7 * 100 / 100 must not round up to the 8th
+    assert percentiles([i / 1000.0 for i in range(1, 8)], ps=(100,))["p100_ms"] == 7.0
+
+
+def test_percentiles_between_ranks():
+    xs = [i / 1000.0 for i in range(1, 11)]
+    assert percentiles(xs, ps=(1, 15, 91)) == {"p1_ms": 1.0, "p15_ms": 2.0, "p91_ms": 10.0, "mean_ms": 5.5}
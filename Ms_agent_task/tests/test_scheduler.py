@@ -0,0 +1,176 @@
+# tests/test_scheduler.py
+import time
+import threading
+
+import pytest
+
+from scheduler import DrawScheduler, DrawingFailed, SchedulerBusy, SchedulerTimeout, job_key
+
+
+class FakeDraw:
+    """
+    A draw function that records what it drew and holds the first job
+    until release(), so the tests can fill the queue behind it.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.running = threading.Event()
+        self.gate = threading.Event()
+
+    def __call__(self, label, quality=None):
+        self.calls.append((label, quality))
+        self.running.set()
+        self.gate.wait(5)
+        return f"drew {label}"
+
+    def release(self):
+        self.gate.set()
+
+
+def _until(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def _submit_async(sched, results, label, **kw):
+    def run():
+        try:
+            results.append(sched.submit(label, **kw))
+        except Exception as e:
+            results.append(e)
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    return t
+
+
+@pytest.fixture
+def busy():
+    # one worker, held on a first "star" job
+    draw = FakeDraw()
+    sched = DrawScheduler(workers=1, max_queue=4, draw=draw, timeout=5.0)
+    first = _submit_async(sched, [], "star")
+    assert draw.running.wait(5)
+    yield sched, draw
+    draw.release()
+    first.join(5)
+
+
+def test_job_key_scene_vs_label():
+    assert job_key("Tree") == ("tree", None, None)
+    assert job_key([("tree", 1)], "draft") == ("tree", None, "draft")
+    assert job_key([("house", 1), ("tree", 2)]) == ("house-tree", ("house", "tree", "tree"), None)
+
+
+def test_identical_requests_are_merged(busy):
+    sched, draw = busy
+    results = []
+    threads = [_submit_async(sched, results, "tree") for _ in range(3)]
+    _until(lambda: sched.stats()["merged"] == 2)
+    assert sched.stats()["queued"] == 1
+    draw.release()
+    for t in threads:
+        t.join(5)
+    assert results == ["drew tree"] * 3
+    assert [label for label, _ in draw.calls] == ["star", "tree"]
+    assert sched.stats()["executed"] == 2
+
+
+def test_other_quality_is_another_job(busy):
+    sched, draw = busy
+    results = []
+    threads = [_submit_async(sched, results, "tree", quality=q) for q in ("full", "draft")]
+    _until(lambda: sched.stats()["queued"] == 2)
+    draw.release()
+    for t in threads:
+        t.join(5)
+    assert sorted(draw.calls[1:]) == [("tree", "draft"), ("tree", "full")]
+    assert sched.stats()["merged"] == 0
+
+
+def test_priority_order(busy):
+    sched, draw = busy
+    results, threads = [], []
+    for label, priority in (("car", "batch"), ("tree", "normal"), ("house", "interactive")):
+        threads.append(_submit_async(sched, results, label, priority=priority))
+        _until(lambda n=len(threads): sched.stats()["queued"] == n)
+    draw.release()
+    for t in threads:
+        t.join(5)
+    assert [label for label, _ in draw.calls] == ["star", "house", "tree", "car"]
+
+
+def test_merge_promotes_queued_job(busy):
+    sched, draw = busy
+    results, threads = [], []
+    threads.append(_submit_async(sched, results, "car", priority="batch"))
+    _until(lambda: sched.stats()["queued"] == 1)
+    threads.append(_submit_async(sched, results, "tree", priority="normal"))
+    _until(lambda: sched.stats()["queued"] == 2)
+    threads.append(_submit_async(sched, results, "car", priority="interactive"))
+    _until(lambda: sched.stats()["merged"] == 1)
+    draw.release()
+    for t in threads:
+        t.join(5)
+    assert [label for label, _ in draw.calls] == ["star", "car", "tree"]
+
+
+def test_full_queue_rejects(busy):
+    sched, draw = busy
+    threads = []
+    for label in ("car", "tree", "house", "flower"):
+        threads.append(_submit_async(sched, [], label))
+        _until(lambda n=len(threads): sched.stats()["queued"] == n)
+    with pytest.raises(SchedulerBusy):
+        sched.submit("train")
+    assert sched.stats()["rejected"] == 1
+    draw.release()
+    for t in threads:
+        t.join(5)
+
+
+def test_unknown_priority():
+    with pytest.raises(ValueError):
+        DrawScheduler(draw=FakeDraw()).submit("tree", priority="urgent")
+
+
+def test_timeout():
+    draw = FakeDraw()
+    sched = DrawScheduler(draw=draw, timeout=0.05)
+    try:
+        with pytest.raises(SchedulerTimeout):
+            sched.submit("tree")
+    finally:
+        draw.release()
+
+
+def test_drawing_error_is_raised():
+    def draw(label, quality=None):
+        raise OSError("paint crashed")
+
+    with pytest.raises(DrawingFailed, match="paint crashed") as info:
+        DrawScheduler(draw=draw).submit("tree")
+    assert isinstance(info.value.__cause__, OSError)
+
+
+def test_merged_waiters_get_their_own_exception(busy):
+    sched, draw = busy
+    boom = OSError("paint crashed")
+    draw.calls.clear()
+
+    def fail(label, quality=None):
+        draw.gate.wait(5)
+        raise boom
+
+    sched._draw = fail
+    results = []
+    threads = [_submit_async(sched, results, "tree") for _ in range(2)]
+    _until(lambda: sched.stats()["merged"] == 1)
+    draw.release()
+    for t in threads:
+        t.join(5)
+    assert [type(r) for r in results] == [DrawingFailed, DrawingFailed]
+    assert results[0] is not results[1]
+    assert results[0].__cause__ is boom and results[1].__cause__ is boom
@@ -0,0 +1,127 @@
+# tests/test_shape_registry.py
+import json
+import math
+
+import pytest
+
+from shape_registry import SHAPES_DIR, Shape, ShapeError, ShapeRegistry, _compile_expr, _ev, registry
+
+NAMES = {"S", "w", "a"}
+
+
+def _shape(strokes, **spec):
+    return Shape.from_dict({"name": "thing", "strokes": strokes, **spec})
+
+
+@pytest.mark.parametrize("src, env, expected", [
+    (12, {}, 12),
+    (2.5, {}, 2.5),
+    ("-(w // 2)", {"w": 7}, -3),
+    ("int(w * cos(radians(a)))", {"w": 10, "a": 60}, 5),
+    ("w if a > 0 else -w", {"w": 3, "a": -1}, -3),
+    ("S(w) + round(pi, 2)", {"S": lambda x: x * 2, "w": 4}, 11.14),
+    ("max(w, a) and abs(a)", {"w": 1, "a": -2}, 2),
+])
+def test_expressions(src, env, expected):
+    assert _ev(_compile_expr(src, NAMES, "test"), env) == expected
+
+
+@pytest.mark.parametrize("src", [
+    "__import__('os').system('true')",  # unknown name, string constant
+    "open('/etc/passwd')",
+    "().__class__.__bases__",           # tuple and attribute access
+    "w.real",
+    "(lambda: 1)()",
+    "[w for w in range(3)]",
+    "exec",                             # a builtin, not in _FUNCS
+    "eval('1')",
+    "cos(x=1)",                         # keywords
+    "'a' * 3",
+    "True + 1",
+    "w[0]",
+    "w := 3",
+    "getattr(w, 'real')",
+    "unknown + 1",
+    "1 +",                              # syntax error
+    None,
+    True,
+    [1, 2],
+])
+def test_unsafe_or_bad_expressions_are_rejected(src):
+    with pytest.raises(ShapeError):
+        _compile_expr(src, NAMES, "test")
+
+
+def test_error_names_where():
+    with pytest.raises(ShapeError, match=r"^thing: .*Attribute"):
+        _shape([{"line": ["w.real", 0, 1, 1]}], params={"w": 1})
+
+
+def test_moves_line_and_rect():
+    shape = _shape(
+        [{"line": [0, 0, "w", 0], "dur": 0.2},
+         {"rect": ["-half", "-half", "half", "half"]}],
+        params={"w": 10},
+        let={"half": "w // 2"},
+    )
+    assert list(shape.moves(100, 50, lambda x: x * 2)) == [
+        ("moveTo", 100, 50, 0), ("dragTo", 120, 50, 0.2),
+        ("moveTo", 90, 60, 0),
+        ("dragTo", 110, 60, 0.1), ("dragTo", 110, 40, 0.1), ("dragTo", 90, 40, 0.1), ("dragTo", 90, 60, 0.1),
+    ]
+
+
+def test_moves_loop_polyline_and_tiers():
+    shape = _shape(
+        [{"polyline": {"for": "i", "in": 3, "point": ["i * 10", 0]}, "close": True},
+         {"circle": [0, 0, 10], "steps": 8, "closed": False, "repeat": 3},
+         {"line": [0, 0, 1, 1], "extras": True}],
+    )
+    moves = list(shape.moves(0, 0, lambda x: x))
+    assert moves[:4] == [("moveTo", 0, 0, 0), ("dragTo", 10, 0, 0.1), ("dragTo", 20, 0, 0.1), ("dragTo", 0, 0, 0.1)]
+    assert len(moves) == 4 + 3 * 8 + 2
+    assert moves[4] == ("moveTo", 10, 0, 0)
+    lite = list(shape.moves(0, 0, lambda x: x, extras=False, steps=lambda n: n // 2, repeats=lambda n: 1))
+    assert len(lite) == 4 + 4
+    assert lite[5][1:3] == (int(10 * math.cos(math.pi / 2)), 10)
+
+
+@pytest.mark.parametrize("spec, message", [
+    ({"name": "Car", "strokes": [{"line": [0, 0, 1, 1]}]}, "name must be"),
+    ({"name": "car", "strokes": []}, "no strokes"),
+    ({"name": "car", "strokes": [{"line": [0, 0, 1]}]}, "list of 4"),
+    ({"name": "car", "strokes": [{"line": [0, 0, 1, 1], "rect": [0, 0, 1, 1]}]}, "exactly one"),
+    ({"name": "car", "strokes": [{"line": [0, 0, 1, 1], "colour": 1}]}, "unknown keys"),
+    ({"name": "car", "params": {"w": "10"}, "strokes": [{"line": [0, 0, 1, 1]}]}, "params.w"),
+    ({"name": "car", "wheels": 4, "strokes": [{"line": [0, 0, 1, 1]}]}, "unknown keys"),
+])
+def test_bad_definitions(spec, message):
+    with pytest.raises(ShapeError, match=message):
+        Shape.from_dict(spec)
+
+
+def test_registry_aliases_and_conflicts():
+    car = Shape.from_dict({"name": "car", "aliases": ["automobile"], "strokes": [{"line": [0, 0, 1, 1]}]})
+    reg = ShapeRegistry([car])
+    assert reg.aliases() == {"automobile": "car"}
+    assert reg.match_text("two automobiles and a tree") == "car"
+    with pytest.raises(ShapeError, match="already defined"):
+        reg.add(car)
+    with pytest.raises(ShapeError, match="already belongs"):
+        reg.add(Shape.from_dict({"name": "bus", "aliases": ["automobile"], "strokes": [{"line": [0, 0, 1, 1]}]}))
+    reg.add(Shape.from_dict({"name": "car", "strokes": [{"line": [0, 0, 2, 2]}]}), replace=True)
+    assert reg.aliases() == {}
+
+
+def test_load_later_directory_replaces(tmp_path):
+    (tmp_path / "tree.json").write_text(json.dumps({"name": "tree", "strokes": [{"line": [0, 0, 5, 5]}]}))
+    reg = ShapeRegistry.load([SHAPES_DIR, str(tmp_path)])
+    assert list(reg["tree"].moves(0, 0, lambda x: x)) == [("moveTo", 0, 0, 0), ("dragTo", 5, 5, 0.1)]
+    assert set(reg.names()) == set(registry.names())
+
+
+def test_built_in_shapes_compile_and_draw():
+    assert {"car", "flower", "house", "star", "train", "tree", "windmill"} <= set(registry.names())
+    for name, shape in registry.items():
+        moves = list(shape.moves(1000, 400, lambda x: int(round(x))))
+        assert moves and moves[0][0] == "moveTo", name
@@ -0,0 +1,47 @@
+# tests/test_speculate.py
+import pytest
+
+import paint_driver
+import speculate
+from speculate import Speculator
+
+
+@pytest.fixture
+def prewarms(monkeypatch):
+    calls = []
+    monkeypatch.setattr(speculate, "prewarm_paint", lambda: calls.append(1))
+    monkeypatch.setattr(speculate, "program_for", lambda scene, quality: None)
+    monkeypatch.setattr(speculate, "plan_quality", lambda scene: ("full", None))
+    return calls
+
+
+def _speculate(spec):
+    spec.classify = lambda text: ([("tree", 1)], "v1", 0.99)
+    result = spec._speculate("draw a tree")
+    for t in list(speculate.threading.enumerate()):
+        if t.name == "prewarm-paint":
+            t.join(5)
+    return result
+
+
+@pytest.mark.parametrize("env, sessions, expected", [
+    ("auto", False, 0),  # the shared desktop: Paint would take the focus
+    ("auto", True, 1),
+    ("1", False, 1),
+    ("0", True, 0),
+])
+def test_prewarm_setting(monkeypatch, prewarms, env, sessions, expected):
+    monkeypatch.setenv("PAINT_SPECULATE", "1")
+    monkeypatch.setenv("PAINT_SPECULATE_PREWARM", env)
+    monkeypatch.setattr(paint_driver, "_backend_factory", object() if sessions else None)
+    spec = Speculator.from_env()
+    assert spec.stats()["prewarm_enabled"] == bool(expected)
+    assert _speculate(spec).scene == [("tree", 1)]
+    assert len(prewarms) == expected
+
+
+def test_unconfident_text_is_not_prewarmed(prewarms):
+    spec = Speculator(prewarm=True)
+    spec.classify = lambda text: ([("tree", 1)], "v1", 0.3)
+    assert spec._speculate("tre").strokes is None
+    assert prewarms == []
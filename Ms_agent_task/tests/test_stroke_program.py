@@ -0,0 +1,44 @@
+# tests/test_stroke_program.py
+import io
+
+import pytest
+from PIL import Image
+
+from paint_driver import CANVAS_W, CANVAS_H
+from stroke_program import compact, encode, decode, program_for, record_drawing, render_png, VERSION
+
+
+def test_round_trip():
+    lines = [[(0, 0), (10, 5), (10, 5000)], [(1999, 799)], [(-3, 7), (0, 0)]]
+    prog = encode(lines)
+    assert prog["v"] == VERSION and (prog["w"], prog["h"]) == (CANVAS_W, CANVAS_H)
+    assert prog["n"] == [3, 1, 2]
+    assert decode(prog) == lines
+
+
+def test_round_trip_empty():
+    assert decode(encode([])) == []
+
+
+def test_compact_drops_repeats_and_retraced_strokes():
+    lines = [[(0, 0), (0, 0), (5, 5)], [(5, 5), (0, 0)], [(0, 0), (5, 5)], [(1, 1), (2, 2)]]
+    assert compact(lines) == [[(0, 0), (5, 5)], [(1, 1), (2, 2)]]
+
+
+@pytest.mark.parametrize("label", ["tree", "house", "car", [("house", 1), ("tree", 2)]])
+def test_program_for_shapes(label):
+    prog = program_for(label)
+    assert prog is not None
+    assert decode(prog) == compact(record_drawing(label))
+
+
+def test_program_for_unknown_shape():
+    assert program_for("no-such-shape") is None
+
+
+def test_render_png():
+    prog = encode([[(100, 100), (200, 100)]], width=400, height=300)
+    with Image.open(io.BytesIO(render_png(prog))) as img:
+        assert img.size == (400, 300)
+        assert img.convert("L").getpixel((150, 100)) < 128
+        assert img.convert("L").getpixel((150, 200)) > 128
@@ -0,0 +1,144 @@
+# tk_paint.py
+#
+# Minimal Paint stand-in for virtual X displays (see display_pool.py).
+# A borderless full-screen Tk window with a white CANVAS_W x CANVAS_H
+# canvas centered on the screen, exactly where paint_driver expects
+# Paint's canvas to be. Mouse drags with button 1 are drawn as strokes.
+# Like any Tk app it merges motion events that queue up before it gets
+# to them into the last one, so a client that sends a whole polyline at
+# once must pace it (xtest_backend's rate_hz) or get a straight chord.
+#
+# Everything Paint does through dialogs is a line on stdin instead, and
+# each command is acknowledged on stdout, so callers never have to
+# sleep and hope:
+#   new            -> clear the canvas           (ok)
+#   size W H       -> resize the canvas          (ok)
+#   save PATH      -> write the strokes as PNG   (ok PATH)
+#   strokes        -> stroke count               (ok N)
+#   close          -> clear the canvas           (ok)
+#   quit
+#
+#   DISPLAY=:99 python tk_paint.py
+import sys
+import queue
+import threading
+import tkinter as tk
+
+from PIL import Image, ImageDraw
+
+from paint_driver import CANVAS_W, CANVAS_H
+
+BRUSH_PX = 3
+
+
+class TkPaint:
+    def __init__(self, root, width=CANVAS_W, height=CANVAS_H):
+        self.root = root
+        self.sw, self.sh = root.winfo_screenwidth(), root.winfo_screenheight()
+        root.overrideredirect(True)
+        root.geometry(f"{self.sw}x{self.sh}+0+0")
+        root.configure(bg="#c0c0c0")
+
+        self.canvas = tk.Canvas(root, bg="white", highlightthickness=0, cursor="pencil")
+        self.strokes = []
+        self._stroke = None
+        self.resize(width, height)
+
+        self.canvas.bind("<ButtonPress-1>", self._down)
+        self.canvas.bind("<B1-Motion>", self._move)
+        self.canvas.bind("<ButtonRelease-1>", self._up)
+
+        self._commands = queue.Queue()
+        threading.Thread(target=self._read_stdin, daemon=True).start()
+        root.after(5, self._poll)
+
+    # ---------- drawing ----------
+    def _down(self, e):
+        self._stroke = [(e.x, e.y)]
+
+    def _move(self, e):
+        if self._stroke is None:
+            return
+        x0, y0 = self._stroke[-1]
+        self.canvas.create_line(x0, y0, e.x, e.y, width=BRUSH_PX, capstyle="round")
+        self._stroke.append((e.x, e.y))
+
+    def _up(self, e):
+        if self._stroke is not None:
+            self._move(e)
+            self.strokes.append(self._stroke)
+        self._stroke = None
+
+    # ---------- commands ----------
+    def resize(self, width, height):
+        self.width, self.height = width, height
+        # same centering as paint_driver._get_canvas_center
+        self.canvas.place(x=(self.sw - width) // 2, y=(self.sh - height) // 2,
+                          width=width, height=height)
+        self.clear()
+
+    def clear(self):
+        self.canvas.delete("all")
+        self.strokes = []
+        self._stroke = None
+
+    def save(self, path):
+        img = Image.new("RGB", (self.width, self.height), (255, 255, 255))
+        draw = ImageDraw.Draw(img)
+        for line in self.strokes:
+            pts = line if len(line) > 1 else line * 2
+            draw.line(pts, fill=(0, 0, 0), width=BRUSH_PX, joint="curve")
+        img.save(path)
+
+    def _read_stdin(self):
+        for line in sys.stdin:
+            self._commands.put(line.strip())
+        self._commands.put("quit")
+
+    def _poll(self):
+        while True:
+            try:
+                line = self._commands.get_nowait()
+            except queue.Empty:
+                break
+            # let pending pointer events land before acting on them
+            self.root.update()
+            self._handle(line)
+        self.root.after(5, self._poll)
+
+    def _handle(self, line):
+        cmd, _, arg = line.partition(" ")
+        try:
+            if cmd in ("new", "close"):
+                self.clear()
+                reply = "ok"
+            elif cmd == "size":
+                w, h = (int(v) for v in arg.split())
+                self.resize(w, h)
+                reply = "ok"
+            elif cmd == "save":
+                self.save(arg)
+                reply = f"ok {arg}"
+            elif cmd == "strokes":
+                reply = f"ok {len(self.strokes)}"
+            elif cmd == "quit":
+                self.root.destroy()
+                return
+            else:
+                reply = f"error unknown command {cmd!r}"
+        except Exception as e:
+            reply = f"error {e}"
+        print(reply, flush=True)
+
+
+def main():
+    root = tk.Tk()
+    root.title("Paint")
+    TkPaint(root)
+    root.update()
+    print("ready", flush=True)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# xdisplay.py
+#
+# Helpers for drawing on virtual X displays (Linux): start an Xvfb
+# server, and run tk_paint.py on it as a controllable Paint stand-in.
+import os
+import sys
+import time
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SCREEN = (2560, 1440)
+
+
+def start_xvfb(display_num, screen=DEFAULT_SCREEN, timeout=10.0):
+    """
+    Start `Xvfb :display_num` and wait until it accepts connections.
+    Returns the Popen; the caller terminates it.
+    """
+    w, h = screen
+    proc = subprocess.Popen(
+        ["Xvfb", f":{display_num}", "-screen", "0", f"{w}x{h}x24", "-nolisten", "tcp"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    sock = f"/tmp/.X11-unix/X{display_num}"
+    end = time.monotonic() + timeout
+    while not os.path.exists(sock):
+        if proc.poll() is not None:
+            raise RuntimeError(f"Xvfb :{display_num} exited with code {proc.returncode}")
+        if time.monotonic() > end:
+            proc.terminate()
+            raise RuntimeError(f"Xvfb :{display_num} did not start")
+        time.sleep(0.05)
+    return proc
+
+
+class PaintApp:
+    """
+    tk_paint.py on `display`, driven over its stdin/stdout protocol.
+    """
+
+    def __init__(self, display, timeout=30.0):
+        env = dict(os.environ, DISPLAY=display)
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.join(BASE_DIR, "tk_paint.py")],
+            cwd=BASE_DIR, env=env, text=True, bufsize=1,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        )
+        line = self.proc.stdout.readline().strip()
+        if line != "ready":
+            self.close()
+            raise RuntimeError(f"tk_paint on {display} failed to start: {line!r}")
+
+    def command(self, line):
+        self.proc.stdin.write(line + "\n")
+        self.proc.stdin.flush()
+        reply = self.proc.stdout.readline().strip()
+        if not reply.startswith("ok"):
+            raise RuntimeError(f"tk_paint: {line!r} -> {reply!r}")
+        return reply[2:].strip()
+
+    def close(self):
+        if self.proc.poll() is None:
+            try:
+                self.proc.stdin.write("quit\n")
+                self.proc.stdin.flush()
+                self.proc.wait(timeout=5)
+            except Exception:
+                self.proc.kill()
+
+
+class VirtualDisplay:
+    """
+    An Xvfb server plus a PaintApp on it; a context manager.
+    """
+
+    def __init__(self, display_num, screen=DEFAULT_SCREEN):
+        self.num = display_num
+        self.name = f":{display_num}"
+        self.screen = screen
+        self.xvfb = None
+        self.app = None
+
+    def __enter__(self):
+        self.xvfb = start_xvfb(self.num, self.screen)
+        try:
+            self.app = PaintApp(self.name)
+        except Exception:
+            self.xvfb.terminate()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        if self.app is not None:
+            self.app.close()
+        if self.xvfb is not None:
+            self.xvfb.terminate()
+            self.xvfb.wait(timeout=5)
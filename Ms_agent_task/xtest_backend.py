@@ -0,0 +1,305 @@
+# xtest_backend.py
+#
+# Batched X11 input backend (python-xlib + the XTEST extension). A drop-in
+# for pyautogui under paint_driver's drawing code (see _InputProxy):
+#   - no PAUSE after every call and no tween steps for dragTo(duration=)
+#   - moveTo starts a stroke, dragTo/dragRel only append points; the
+#     whole polyline goes out as one batch of motion + button events with
+#     a single round trip, when the stroke ends (next moveTo, key, sleep,
+#     phase change or flush())
+#   - optional fixed-rate pacing (rate_hz) for apps that sample the
+#     pointer instead of reading every event
+#
+#   python xtest_backend.py --selftest            # under a private Xvfb
+#   python xtest_backend.py --selftest --display :0 --shapes tree,star
+#   python xtest_backend.py --selftest --rate 0   # unpaced: expect chords
+#
+# The self-test draws each shape into tk_paint.py, reads the canvas back
+# from the X framebuffer and compares it with raster.py's rendering of
+# the same geometry.
+import os
+import sys
+import time
+import shutil
+import argparse
+
+from Xlib import X
+from Xlib import display as xdisplay
+from Xlib.ext import xtest
+
+_KEY_NAMES = {
+    "ctrl": "Control_L", "ctrlleft": "Control_L", "alt": "Alt_L", "altleft": "Alt_L",
+    "shift": "Shift_L", "shiftleft": "Shift_L", "win": "Super_L",
+    "enter": "Return", "return": "Return", "tab": "Tab", "esc": "Escape",
+    "escape": "Escape", "space": "space", "backspace": "BackSpace", "delete": "Delete",
+    "up": "Up", "down": "Down", "left": "Left", "right": "Right",
+}
+
+
+class XTestBackend:
+    """
+    pyautogui-compatible input through XTEST, one flush per stroke.
+    """
+    PAUSE = 0.0
+    FAILSAFE = False
+
+    def __init__(self, display=None, rate_hz=0.0):
+        self._d = xdisplay.Display(display)  # None -> $DISPLAY
+        if not self._d.has_extension("XTEST"):
+            raise RuntimeError("X server has no XTEST extension")
+        scr = self._d.screen()
+        self.screen = (scr.width_in_pixels, scr.height_in_pixels)
+        ptr = scr.root.query_pointer()
+        self.x, self.y = ptr.root_x, ptr.root_y
+        self.rate_hz = rate_hz
+
+        self._stroke = None
+        self.events = 0
+        self.flushes = 0
+
+    # ---------- sending ----------
+    def _fake(self, event_type, detail=0, x=0, y=0):
+        xtest.fake_input(self._d, event_type, detail, x=x, y=y)
+        self.events += 1
+
+    def flush(self):
+        """
+        Send the buffered stroke: move to its start, press, move through
+        every point, release, then one sync for the whole batch.
+        """
+        stroke, self._stroke = self._stroke, None
+        if not stroke:
+            return
+        interval = 1.0 / self.rate_hz if self.rate_hz > 0 else 0.0
+        next_t = time.perf_counter()
+
+        self._fake(X.MotionNotify, x=stroke[0][0], y=stroke[0][1])
+        if len(stroke) > 1:
+            self._fake(X.ButtonPress, 1)
+            for px, py in stroke[1:]:
+                if interval:
+                    # fixed rate: each event leaves on its own tick
+                    self._d.flush()
+                    next_t += interval
+                    delay = next_t - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                self._fake(X.MotionNotify, x=px, y=py)
+            self._fake(X.ButtonRelease, 1)
+        self._d.sync()
+        self.flushes += 1
+
+    def close(self):
+        self.flush()
+        self._d.close()
+
+    # ---------- pointer ----------
+    def size(self):
+        return self.screen
+
+    def position(self):
+        return self.x, self.y
+
+    @staticmethod
+    def _xy(x, y):
+        if isinstance(x, (tuple, list)):
+            return int(x[0]), int(x[1])
+        return int(x), int(y)
+
+    def moveTo(self, x=None, y=None, duration=0.0, **kwargs):
+        self.flush()
+        self.x, self.y = self._xy(x, y)
+        self._stroke = [(self.x, self.y)]
+
+    def dragTo(self, x=None, y=None, duration=0.0, button="left", **kwargs):
+        if self._stroke is None:
+            self._stroke = [(self.x, self.y)]
+        self.x, self.y = self._xy(x, y)
+        self._stroke.append((self.x, self.y))
+
+    def dragRel(self, xOffset=0, yOffset=0, duration=0.0, button="left", **kwargs):
+        self.dragTo(self.x + int(xOffset), self.y + int(yOffset))
+
+    # ---------- keyboard ----------
+    def _keycode(self, keysym):
+        code = self._d.keysym_to_keycode(keysym)
+        if not code:
+            raise ValueError(f"no keycode for keysym {keysym:#x}")
+        # shifted symbols ('A', ':', '_') sit in the keycode's second column
+        shift = self._d.keycode_to_keysym(code, 0) != keysym
+        return code, shift
+
+    def _key_keysym(self, name):
+        from Xlib import XK
+        name = _KEY_NAMES.get(name.lower(), name)
+        if len(name) == 1:
+            return ord(name)  # Latin-1 keysyms equal their code points
+        if name.lower().startswith("f") and name[1:].isdigit():
+            name = name.upper()
+        keysym = XK.string_to_keysym(name)
+        if not keysym:
+            raise ValueError(f"unknown key {name!r}")
+        return keysym
+
+    def _tap(self, keysym):
+        code, shift = self._keycode(keysym)
+        shift_code = self._d.keysym_to_keycode(_SHIFT_KEYSYM) if shift else 0
+        if shift_code:
+            self._fake(X.KeyPress, shift_code)
+        self._fake(X.KeyPress, code)
+        self._fake(X.KeyRelease, code)
+        if shift_code:
+            self._fake(X.KeyRelease, shift_code)
+
+    def hotkey(self, *keys, **kwargs):
+        self.flush()
+        codes = [self._keycode(self._key_keysym(k))[0] for k in keys]
+        for code in codes:
+            self._fake(X.KeyPress, code)
+        for code in reversed(codes):
+            self._fake(X.KeyRelease, code)
+        self._d.sync()
+
+    def press(self, key, presses=1, **kwargs):
+        self.flush()
+        keysym = self._key_keysym(key)
+        for _ in range(presses):
+            self._tap(keysym)
+        self._d.sync()
+
+    def typewrite(self, message, interval=0.0, **kwargs):
+        self.flush()
+        for ch in str(message):
+            self._tap(ord(ch) if ch != "\n" else self._key_keysym("enter"))
+            if interval:
+                self._d.sync()
+                time.sleep(interval)
+        self._d.sync()
+
+    write = typewrite
+
+    # ---------- timing / phases ----------
+    def sleep(self, seconds):
+        self.flush()
+        time.sleep(seconds)
+
+    def begin_phase(self, name):
+        self.flush()
+
+    def end_phase(self, name):
+        self.flush()
+
+
+_SHIFT_KEYSYM = 0xFFE1  # XK_Shift_L
+
+
+# --------------------------
+# Self-test under Xvfb
+# --------------------------
+def read_canvas(d, left, top, width, height):
+    """
+    The screen rectangle as a PIL image, straight from the framebuffer.
+    """
+    from PIL import Image
+
+    raw = d.screen().root.get_image(left, top, width, height, X.ZPixmap, 0xFFFFFFFF)
+    return Image.frombytes("RGB", (width, height), raw.data, "raw", "BGRX")
+
+
+def ink_match(actual, expected, tolerance_px=2):
+    """
+    (precision, recall) of dark pixels in `actual` against `expected`,
+    counting a pixel as matched within tolerance_px.
+    """
+    from PIL import ImageChops, ImageFilter
+
+    def ink(img):
+        return img.convert("L").point(lambda v: 255 if v < 128 else 0)
+
+    a, e = ink(actual), ink(expected)
+    grow = ImageFilter.MaxFilter(2 * tolerance_px + 1)
+    a_n = sum(a.histogram()[255:])
+    e_n = sum(e.histogram()[255:])
+    if not a_n or not e_n:
+        return 0.0, 0.0
+    hit_a = sum(ImageChops.multiply(a, e.filter(grow)).histogram()[255:])
+    hit_e = sum(ImageChops.multiply(e, a.filter(grow)).histogram()[255:])
+    return hit_a / a_n, hit_e / e_n
+
+
+def selftest(display, shapes, rate_hz=0.0, threshold=0.95):
+    from paint_driver import CANVAS_W, CANVAS_H, use_input_backend, get_scale_fn
+    from drawings import SHAPE_FUNCS
+    from layout import REF_SCALE
+    from raster import rasterize, record_shape
+    from input_sim import simulate_shape
+    from xdisplay import PaintApp
+
+    app = PaintApp(display)
+    backend = XTestBackend(display, rate_hz=rate_hz)
+    sw, sh = backend.size()
+    # same placement as paint_driver._get_canvas_center and tk_paint
+    left, top = (sw - CANVAS_W) // 2, (sh - CANVAS_H) // 2
+    cx, cy = left + CANVAS_W // 2, top + CANVAS_H // 2
+    ok = True
+    try:
+        print(f"{'shape':<10}{'events':>8}{'flushes':>9}{'xtest_s':>9}{'pyautogui_s':>13}"
+              f"{'precision':>11}{'recall':>8}")
+        for label in shapes:
+            app.command("new")
+            ev0, fl0 = backend.events, backend.flushes
+            t0 = time.perf_counter()
+            with use_input_backend(backend):
+                SHAPE_FUNCS[label](cx, cy, get_scale_fn())
+                backend.flush()
+            elapsed = time.perf_counter() - t0
+            app.command("strokes")  # round trip: tk_paint has drawn every event
+
+            actual = read_canvas(backend._d, left, top, CANVAS_W, CANVAS_H)
+            expected = rasterize(record_shape(label, cx, cy, REF_SCALE), (CANVAS_W, CANVAS_H),
+                                 origin=(left, top))
+            precision, recall = ink_match(actual, expected)
+            projected = simulate_shape(label, screen=(sw, sh)).summarize()["wall_s"]
+            passed = precision >= threshold and recall >= threshold
+            ok &= passed
+            print(f"{label:<10}{backend.events - ev0:>8}{backend.flushes - fl0:>9}"
+                  f"{elapsed:>9.3f}{projected:>13.2f}{precision:>11.3f}{recall:>8.3f}"
+                  f"  {'ok' if passed else 'MISMATCH'}")
+    finally:
+        backend.close()
+        app.close()
+    return ok
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="XTest input backend self-test.")
+    ap.add_argument("--selftest", action="store_true")
+    ap.add_argument("--display", help="existing X display (default: start a private Xvfb)")
+    ap.add_argument("--shapes", default="tree,house,windmill,train,star,flower")
+    # tk_paint merges motion events that queue up, so unpaced strokes
+    # would be drawn as chords; same default as display_pool
+    ap.add_argument("--rate", type=float, default=float(os.environ.get("PAINT_XTEST_RATE", "1000")),
+                    help="pace motion events at this rate (Hz, 0 = unpaced; default: $PAINT_XTEST_RATE or 1000)")
+    args = ap.parse_args(argv)
+    if not args.selftest:
+        ap.print_help()
+        return 0
+
+    shapes = [s.strip() for s in args.shapes.split(",") if s.strip()]
+    if args.display:
+        return 0 if selftest(args.display, shapes, args.rate) else 1
+
+    if shutil.which("Xvfb") is None:
+        print("Xvfb not found; install xvfb (and python3-tk), or pass --display.")
+        return 2
+    from xdisplay import start_xvfb
+    num = int(os.environ.get("PAINT_FIRST_DISPLAY", "90")) + 50
+    xvfb = start_xvfb(num)
+    try:
+        return 0 if selftest(f":{num}", shapes, args.rate) else 1
+    finally:
+        xvfb.terminate()
+
+
+if __name__ == "__main__":
+    sys.exit(main())